@@ -0,0 +1,391 @@
+# actor_learner.py
+"""
+Actor/learner training: K actor processes generate experience, one learner
+(the calling process) owns the Agent and does every Q update.
+
+Actors run Environment + Interpreter.transition with an epsilon-greedy Agent on
+a read-only policy snapshot (FrozenQTable, sorted keys + q). They send compact
+batches of transitions through a bounded multiprocessing.Queue:
+  keys int64, actions int8 (canonical frame), rewards float64 (the exact
+  Python floats of the serial path), next_keys int64, dones int8
+  -> 26 bytes per transition
+The queue holds at most `queue_size` batches: a full queue blocks the actors
+(backpressure) instead of piling up memory when the learner falls behind.
+
+The learner applies the batches by minibatches (Agent.learn_batch, vectorized
+one-step backups) and publishes a new snapshot (+ its step_count, for epsilon)
+every `refresh_every` transitions, on one size-1 queue per actor (an actor
+always picks up the latest one, never waits for it).
+
+Per-stage throughput (report()):
+  actors:    steps per CPU second of simulation, time blocked on a full queue
+  transport: transitions per CPU second of queue work: pickling + put in the
+             actors (process CPU minus simulation, the queue feeder thread
+             included) and get + unpickling in the learner; capacity = the
+             slower side. Also batches, MB, time the learner waited on an
+             empty queue
+  learner:   transitions per CPU second of updates, snapshot cost
+The limiting stage is the one with the lowest capacity. CPU time keeps the
+stage rates meaningful when processes share cores; wall-clock waits tell
+which side is starving.
+
+Usage:
+  python train.py --actors 4 [--batch 1024] [--refresh 50000] [--steps N]
+"""
+import math
+import multiprocessing as mp
+import queue
+import time
+from array import array
+from typing import Optional
+
+import numpy as np
+
+from agent import Agent
+from checkpoint import Checkpointer
+from environement import GREEN, RED, Environment
+from interpreter import Interpreter
+from metrics import MetricsWriter, TrainMetrics
+from qtable import N_ACTIONS, FrozenQTable
+from train import AGENT_ARGS, SAVE_STEPS, fmt_duration, save_path
+from utils import episode_seed
+
+# transition batch: (typecode array.array, dtype numpy) par colonne
+_COLUMNS = (("q", np.int64), ("b", np.int8), ("d", np.float64), ("q", np.int64), ("b", np.int8))
+
+
+def _empty_policy() -> FrozenQTable:
+    return FrozenQTable(np.empty(0, dtype=np.int64), np.empty((0, N_ACTIONS), dtype=np.float32))
+
+
+def _actor(
+    w: int,
+    steps: int,
+    seed: Optional[int],
+    board: dict,
+    agent_args: dict,
+    batch: int,
+    out_q,
+    policy_q,
+) -> None:
+    """
+    Joue `steps` steps avec le dernier snapshot reçu, envoie des batches
+    (w, colonnes, stats épisodes, temps cumulés) puis (w, None, ..., temps) à la fin.
+    temps = (CPU simulation, attente put, CPU du process).
+    """
+    p0 = time.process_time()
+    env = Environment(seed=seed, **board)
+    agent = Agent(seed=seed, **agent_args)
+    agent.registre = _empty_policy()  # table vide = tout à 0 (comme un Agent neuf)
+    inter = Interpreter(env, use_mirror=agent.use_mirror)
+
+    sim_s = put_s = 0.0
+    key, rot_k, mirror = inter.observe_key()
+    done_steps = 0
+    while done_steps < steps:
+        try:
+            keys, q, step_count = policy_q.get_nowait()
+            agent.registre = FrozenQTable(keys, q)
+            agent.step_count = step_count
+        except queue.Empty:
+            pass
+
+        t0 = time.thread_time()
+        cols = tuple(array(code) for code, _ in _COLUMNS)
+        k_col, a_col, r_col, nk_col, d_col = cols
+        r_sum = 0.0
+        deaths = green = red = len_sum = 0
+        for _ in range(min(batch, steps - done_steps)):
+            action_int = agent.register_key(key, rot_k, mirror)
+            reward, done, next_key, next_rot_k, next_mirror = inter.transition(action_int)
+
+            k_col.append(key)
+            a_col.append(agent.lastChoice_can)
+            r_col.append(reward)
+            nk_col.append(next_key)
+            d_col.append(done)
+
+            r_sum += reward
+            code = inter.last_code
+            if code == GREEN:
+                green += 1
+            elif code == RED:
+                red += 1
+            len_sum += env.snake_length
+
+            if done:
+                deaths += 1
+                inter.reset_game()
+                key, rot_k, mirror = inter.observe_key()
+            else:
+                key, rot_k, mirror = next_key, next_rot_k, next_mirror
+        done_steps += len(k_col)
+        sim_s += time.thread_time() - t0
+
+        t0 = time.perf_counter()
+        times = (sim_s, put_s, time.process_time() - p0)
+        out_q.put((w, cols, (r_sum, deaths, green, red, len_sum), times))
+        put_s += time.perf_counter() - t0
+
+    out_q.put((w, None, None, (sim_s, put_s, time.process_time() - p0)))
+
+
+class ActorLearner:
+    """
+    Learner + K actors. run() entraîne self.agent sur total_steps transitions
+    (réparties entre les actors), report() donne le débit de chaque étage.
+    """
+
+    def __init__(
+        self,
+        actors: int = 4,
+        seed: Optional[int] = None,
+        batch: int = 1_024,
+        queue_size: Optional[int] = None,  # batches en vol (défaut: 2 par actor)
+        refresh_every: int = 50_000,  # transitions apprises entre deux snapshots
+        minibatch: int = 128,  # taille des backups vectorisés du learner
+        agent_args: Optional[dict] = None,
+        **board,
+    ):
+        self.actors = actors
+        self.seed = seed
+        self.batch = batch
+        self.queue_size = queue_size or 2 * actors
+        self.refresh_every = refresh_every
+        self.minibatch = minibatch
+        self.agent_args = AGENT_ARGS if agent_args is None else agent_args
+        self.board = board
+        self.agent = Agent(seed=seed, **self.agent_args)
+        self.agent._check_batch()  # learner="q" sans planner, avant de lancer les actors
+
+        # stats par étage
+        self.wall_s = 0.0
+        self.learned = 0
+        self.learn_s = 0.0  # CPU learner (backups)
+        self.snap_s = 0.0  # CPU learner (snapshots)
+        self.snapshots = 0
+        self.get_wait_s = 0.0  # learner bloqué sur queue vide
+        self.get_cpu_s = 0.0  # CPU learner dans get (réception + unpickle)
+        self.batches = 0
+        self.nbytes = 0
+        self.actor_steps = [0] * actors
+        # (CPU simulation, attente put, CPU process: simulation + envoi + snapshots reçus)
+        self.actor_times = [(0.0, 0.0, 0.0)] * actors
+
+    def _publish(self, policy_qs) -> None:
+        """Snapshot trié de la table -> chaque actor (remplace un snapshot pas encore lu)."""
+        t0 = time.thread_time()
+        keys, q = self.agent.registre.arrays()
+        order = np.argsort(keys)
+        snap = (keys[order], q[order], self.agent.step_count)
+        for pq in policy_qs:
+            try:
+                pq.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                pq.put_nowait(snap)
+            except queue.Full:  # ancien snapshot encore en transit: l'actor l'aura
+                pass
+        self.snap_s += time.thread_time() - t0
+        self.snapshots += 1
+
+    def _learn(self, cols) -> int:
+        t0 = time.thread_time()
+        keys, actions, rewards, next_keys, dones = (
+            np.frombuffer(col, dtype=dt) for col, (_, dt) in zip(cols, _COLUMNS)
+        )
+        n = len(keys)
+        mb = self.minibatch
+        for s in range(0, n, mb):
+            self.agent.learn_batch(
+                keys[s : s + mb],
+                actions[s : s + mb].astype(np.int64),
+                rewards[s : s + mb],
+                next_keys[s : s + mb],
+                dones[s : s + mb].astype(bool),
+            )
+        self.learn_s += time.thread_time() - t0
+        self.learned += n
+        self.batches += 1
+        self.nbytes += sum(len(col) * col.itemsize for col in cols)
+        return n
+
+    def run(
+        self,
+        total_steps: int,
+        log_every: int = 100_000,
+        save: bool = True,
+        verbose: bool = True,
+        metrics: Optional[MetricsWriter] = None,
+        metrics_every: int = 10_000,
+    ) -> list:
+        """
+        Entraîne sur total_steps transitions. Sauvegarde aux SAVE_STEPS comme train.py.
+        metrics: une row (metrics.TrainMetrics) tous les metrics_every steps appris,
+        depuis les stats envoyées par les actors avec leurs batches.
+        Returns l'historique [(transitions apprises, avgLen, steps/s)] par fenêtre de log.
+        """
+        K = self.actors
+        ctx = mp.get_context()
+        out_q = ctx.Queue(maxsize=self.queue_size)
+        policy_qs = [ctx.Queue(maxsize=1) for _ in range(K)]
+        procs = []
+        for w in range(K):
+            n = total_steps // K + (w < total_steps % K)
+            self.actor_steps[w] = n
+            w_seed = None if self.seed is None else episode_seed(self.seed, w)
+            procs.append(
+                ctx.Process(
+                    target=_actor,
+                    args=(w, n, w_seed, self.board, self.agent_args, self.batch, out_q, policy_qs[w]),
+                    daemon=True,
+                )
+            )
+
+        agent = self.agent
+        ckpt = Checkpointer() if save else None
+        pending = sorted(s for s in SAVE_STEPS if s <= total_steps)
+        history = []
+        window = [0.0, 0, 0, 0, 0, 0]  # steps, r_sum, deaths, green, red, len_sum
+        totals = [0.0, 0, 0, 0, 0]  # cumulés depuis le début (metrics)
+        run_metrics = TrainMetrics(metrics_every)
+        next_row = metrics_every
+        next_refresh = self.refresh_every
+        start = time.perf_counter()
+        finished = 0
+        try:
+            for p in procs:
+                p.start()
+            while finished < K:
+                t0 = time.perf_counter()
+                c0 = time.thread_time()
+                try:
+                    w, cols, ep, times = out_q.get(timeout=1.0)
+                except queue.Empty:
+                    self.get_wait_s += time.perf_counter() - t0
+                    self.get_cpu_s += time.thread_time() - c0
+                    dead = [w for w, p in enumerate(procs) if p.exitcode not in (None, 0)]
+                    if dead:
+                        raise RuntimeError(f"actor_learner: actors {dead} failed")
+                    continue
+                self.get_cpu_s += time.thread_time() - c0
+                self.get_wait_s += time.perf_counter() - t0
+                self.actor_times[w] = times
+                if cols is None:
+                    finished += 1
+                    continue
+
+                n = self._learn(cols)
+                window[0] += n
+                for j, v in enumerate(ep, 1):
+                    window[j] += v
+                    totals[j - 1] += v
+
+                if metrics is not None and (
+                    self.learned >= next_row or self.learned == total_steps
+                ):
+                    metrics.write(
+                        run_metrics.row(
+                            self.learned,
+                            tuple(totals),
+                            agent.epsilon(),
+                            len(agent.registre),
+                            time.perf_counter() - start,
+                        )
+                    )
+                    next_row = (self.learned // metrics_every + 1) * metrics_every
+
+                if self.learned >= next_refresh:
+                    self._publish(policy_qs)
+                    next_refresh += self.refresh_every
+
+                if window[0] >= log_every or self.learned == total_steps:
+                    elapsed = time.perf_counter() - start
+                    speed = self.learned / elapsed if elapsed > 0 else 0.0
+                    steps, r_sum, deaths, green, red, len_sum = window
+                    history.append((self.learned, len_sum / steps, speed))
+                    if verbose:
+                        eta = (total_steps - self.learned) / speed if speed > 0 else 0.0
+                        print(
+                            f"step={self.learned} eps={agent.epsilon():.4f} "
+                            f"states={len(agent.registre)} actors={K} "
+                            f"avgR={r_sum / steps:.3f} deaths={deaths} green={green} "
+                            f"red={red} avgLen={len_sum / steps:.2f} "
+                            f"| elapsed={fmt_duration(elapsed)} speed={speed:.1f} steps/s "
+                            f"eta={fmt_duration(eta)}"
+                        )
+                    window = [0.0, 0, 0, 0, 0, 0]
+
+                while pending and self.learned >= pending[0]:
+                    p = save_path(pending.pop(0))
+                    if ckpt is not None:
+                        ckpt.submit(p, *agent.snapshot())
+                        if verbose:
+                            print(f"[SAVE] {p} (states={len(agent.registre)})")
+        finally:
+            for p in procs:
+                if p.is_alive() and finished < K:
+                    p.terminate()
+                p.join()
+            # débloque les threads d'envoi des snapshots jamais lus
+            for pq in policy_qs:
+                while True:
+                    try:
+                        pq.get(timeout=0.1)
+                    except queue.Empty:
+                        break
+            if ckpt is not None:
+                ckpt.close()
+        self.wall_s += time.perf_counter() - start
+        if verbose:
+            print(self.report())
+        return history
+
+    def report(self) -> str:
+        """Débit par étage (actors / transport / learner) et l'étage limitant."""
+        wall = max(self.wall_s, 1e-9)
+        sim = [t[0] for t in self.actor_times]
+        put_wait = sum(t[1] for t in self.actor_times)
+        send = [t[2] - t[0] for t in self.actor_times]  # CPU actor hors simulation
+        per_actor = sum(n / s for n, s in zip(self.actor_steps, sim) if s > 0) / max(1, self.actors)
+        learner = self.learned / self.learn_s if self.learn_s > 0 else math.inf
+        # capacités (steps/s, sans attente): actors = K x leur débit CPU,
+        # transport = le côté le plus lent (envois en parallèle, réception par le learner)
+        actor_cap = per_actor * self.actors
+        send_cap = sum(n / s for n, s in zip(self.actor_steps, send) if s > 0) or math.inf
+        recv_cap = self.learned / self.get_cpu_s if self.get_cpu_s > 0 else math.inf
+        transport_cap = min(send_cap, recv_cap)
+        caps = {"actors": actor_cap, "transport": transport_cap, "learner": learner}
+        limiting = min(caps, key=caps.get)
+        return (
+            f"[actors]    {self.actors} x {per_actor:,.0f} steps/cpu-s "
+            f"(capacity {actor_cap:,.0f} steps/s) "
+            f"blocked on full queue {put_wait / self.actors / wall:.0%} of wall\n"
+            f"[transport] capacity {transport_cap:,.0f} steps/s "
+            f"(send {send_cap:,.0f}, receive {recv_cap:,.0f}) "
+            f"{self.batches} batches {self.nbytes / 1e6:.1f}MB "
+            f"({self.nbytes / 1e6 / wall:.1f}MB/s) learner waiting on queue "
+            f"{self.get_wait_s / wall:.0%} of wall\n"
+            f"[learner]   {learner:,.0f} transitions/cpu-s "
+            f"({self.learn_s / wall:.0%} of wall) snapshots={self.snapshots} "
+            f"({self.snap_s / wall:.0%} of wall)\n"
+            f"[overall]   {self.learned / wall:,.0f} steps/s, limiting stage: {limiting}"
+        )
+
+
+def train_actor_learner(
+    total_steps: int = 10_000_000,
+    actors: int = 4,
+    seed: Optional[int] = None,
+    metrics: Optional[MetricsWriter] = None,
+    metrics_every: int = 10_000,
+    **options,
+) -> Agent:
+    """
+    train.train() en actor/learner; options = kwargs de ActorLearner (batch, refresh_every...).
+    metrics: MetricsWriter des rows (ActorLearner.run).
+    """
+    al = ActorLearner(actors, seed, **options)
+    al.run(total_steps, metrics=metrics, metrics_every=metrics_every)
+    return al.agent
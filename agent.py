@@ -3,7 +3,14 @@ from pathlib import Path
 from typing import Tuple, Optional
 import random
 from array import array
-from collections import defaultdict
+
+import numpy as np
+
+import checkpoint
+from qtable import FrozenQTable, QTable
+from planner import PrioritizedSweeping
+from replay import ReplayBuffer
+from traces import EligibilityTrace, NStepBuffer
 
 # -------- Types (same observation format as Interpreter.get_state) --------
 DirFeat = Tuple[int, int, int, int]  # (wall, green, red, body)
@@ -92,13 +99,12 @@ def _pack_state_16_base5(state_urdl: StateType) -> int:
     return key
 
 
-def _canonical_pack_key(
+def _canonical_pack_key_loop(
     state_urdl: StateType, use_mirror: bool = False
 ) -> tuple[int, tuple[int, bool]]:
     """
-    Returns:
-      - best_key: packed int of the canonicalized state
-      - best_params: (rot_k, mirror) that produced that canonical form
+    Reference implementation (8 transformed tuples, packed one by one).
+    Kept to check _canonical_pack_key against it (see bench.py canon).
     """
     best_key: Optional[int] = None
     best_params: tuple[int, bool] = (0, False)
@@ -116,6 +122,163 @@ def _canonical_pack_key(
     return best_key, best_params
 
 
+# -------- Lookup-table canonicalization --------
+# One direction (wall, green, red, body) packs into a single base-625 digit
+# d = w + 5g + 25r + 125b, and the 16-feature key is d0 + d1*625 + d2*625^2 + d3*625^3
+# (U, R, D, L), i.e. exactly _pack_state_16_base5.
+DIGIT_BASE = BASE**4  # 625
+_D1 = DIGIT_BASE
+_D2 = DIGIT_BASE**2
+_D3 = DIGIT_BASE**3
+
+# The 8 symmetries in the SAME order as _canonical_pack_key_loop (ties keep the first):
+# TRANSFORMS[t] = (dir_map new->old, rot_k, mirror), dir_map = mirror o rotation.
+TRANSFORMS = tuple(
+    (
+        tuple(
+            MIRROR_DIR[ROT_DIR[rot_k][n]] if mirror else ROT_DIR[rot_k][n]
+            for n in range(4)
+        ),
+        rot_k,
+        mirror,
+    )
+    for mirror in (False, True)
+    for rot_k in range(4)
+)
+TRANSFORM_PARAMS = tuple((rot_k, mirror) for _, rot_k, mirror in TRANSFORMS)
+
+# CANON_TO_ENV[t][a_can] = env action (same as _canon_to_env_action)
+CANON_TO_ENV = tuple(dir_map for dir_map, _, _ in TRANSFORMS)
+
+# SAFE_CAN[t][env_mask] = allowed canonical actions, env_mask bit d = env dir d safe
+# (no wall/body at distance 1). Empty mask -> all actions (forced move).
+SAFE_CAN = tuple(
+    tuple(
+        tuple(a for a in range(4) if env_mask >> dir_map[a] & 1) or (0, 1, 2, 3)
+        for env_mask in range(16)
+    )
+    for dir_map, _, _ in TRANSFORMS
+)
+# same as a 4-bit canonical mask: SAFE_CAN_MASK[t][env_mask] (bit a = a allowed)
+SAFE_CAN_MASK = tuple(
+    tuple(sum(1 << a for a in allowed) for allowed in per_mask) for per_mask in SAFE_CAN
+)
+
+
+# SAFE_DIGIT[d] = 1 if the direction digit d = w + 5g + 25r + 125b has neither wall nor
+# body at distance 1; ALLOWED_CAN[mask] = canonical actions of a 4-bit safe mask (none -> all)
+SAFE_DIGIT = tuple(int(d % 5 != 1 and d // 125 != 1) for d in range(DIGIT_BASE))
+ALLOWED_CAN = tuple(
+    tuple(a for a in range(4) if mask >> a & 1) or (0, 1, 2, 3) for mask in range(16)
+)
+
+
+def _safe_can_mask(key: int) -> int:
+    """
+    Safe CANONICAL actions of a packed canonical key (bit a = canonical direction a).
+    Same as SAFE_CAN[t][_safe_mask(state)]: the canonical digit a is the env digit dir_map[a].
+    """
+    return (
+        SAFE_DIGIT[key % _D1]
+        | SAFE_DIGIT[key // _D1 % _D1] << 1
+        | SAFE_DIGIT[key // _D2 % _D1] << 2
+        | SAFE_DIGIT[key // _D3] << 3
+    )
+
+
+def _dir_digit(dirfeat: DirFeat) -> int:
+    w, g, r, b = dirfeat
+    return w + 5 * g + 25 * r + 125 * b
+
+
+def _safe_mask(state_urdl: StateType) -> int:
+    """Bit d set if env direction d has neither wall nor body at distance 1."""
+    mask = 0
+    for d in range(4):
+        w, _, _, b = state_urdl[d]
+        if w != 1 and b != 1:
+            mask |= 1 << d
+    return mask
+
+
+def _canonical_from_digits(
+    d0: int, d1: int, d2: int, d3: int, use_mirror: bool = False
+) -> tuple[int, int]:
+    """
+    Canonical key from the 4 direction digits (env frame URDL).
+    Returns (key, t) with t the index in TRANSFORMS.
+    Each line below is d[dir_map[0]] + d[dir_map[1]]*625 + ... for TRANSFORMS[t].
+    """
+    keys = [
+        d0 + d1 * _D1 + d2 * _D2 + d3 * _D3,  # rot 0
+        d3 + d0 * _D1 + d1 * _D2 + d2 * _D3,  # rot 1
+        d2 + d3 * _D1 + d0 * _D2 + d1 * _D3,  # rot 2
+        d1 + d2 * _D1 + d3 * _D2 + d0 * _D3,  # rot 3
+    ]
+    if use_mirror:
+        keys += (
+            d0 + d3 * _D1 + d2 * _D2 + d1 * _D3,  # mirror, rot 0
+            d1 + d0 * _D1 + d3 * _D2 + d2 * _D3,  # mirror, rot 1
+            d2 + d1 * _D1 + d0 * _D2 + d3 * _D3,  # mirror, rot 2
+            d3 + d2 * _D1 + d1 * _D2 + d0 * _D3,  # mirror, rot 3
+        )
+    best = min(keys)
+    return best, keys.index(best)
+
+
+def _canonicalize(state_urdl: StateType, use_mirror: bool = False) -> tuple[int, int]:
+    """(canonical key, transform index t) for an env-frame state."""
+    up, right, down, left = state_urdl
+    return _canonical_from_digits(
+        up[0] + 5 * up[1] + 25 * up[2] + 125 * up[3],
+        right[0] + 5 * right[1] + 25 * right[2] + 125 * right[3],
+        down[0] + 5 * down[1] + 25 * down[2] + 125 * down[3],
+        left[0] + 5 * left[1] + 25 * left[2] + 125 * left[3],
+        use_mirror,
+    )
+
+
+def _canonical_pack_key(
+    state_urdl: StateType, use_mirror: bool = False
+) -> tuple[int, tuple[int, bool]]:
+    """
+    Returns:
+      - best_key: packed int of the canonicalized state
+      - best_params: (rot_k, mirror) that produced that canonical form
+    Bit-identical to _canonical_pack_key_loop (same keys, same tie-breaking).
+    """
+    key, t = _canonicalize(state_urdl, use_mirror)
+    return key, TRANSFORM_PARAMS[t]
+
+
+# -------- Vectorized canonicalization (batches of states) --------
+_DIGIT_W = np.array([1, 5, 25, 125], dtype=np.int64)
+_KEY_W = np.array([1, _D1, _D2, _D3], dtype=np.int64)
+_TRANSFORM_MAPS = np.array(CANON_TO_ENV, dtype=np.int64)  # (8, 4) new -> old
+
+
+def _canonicalize_batch(
+    states: np.ndarray, use_mirror: bool = False
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    states: (N, 4, 4) bins, env frame URDL x (wall, green, red, body).
+    Returns (keys int64 (N,), t (N,)), same keys/ties as _canonicalize.
+    """
+    digits = states @ _DIGIT_W  # (N, 4)
+    maps = _TRANSFORM_MAPS if use_mirror else _TRANSFORM_MAPS[:4]
+    all_keys = digits[:, maps] @ _KEY_W  # (N, T)
+    t = all_keys.argmin(axis=1)  # argmin keeps the first minimum, like the loop
+    return all_keys[np.arange(len(t)), t], t
+
+
+def _allowed_can_batch(states: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """(N, 4) bool: allowed CANONICAL actions (all of them if none is safe)."""
+    safe_env = (states[:, :, 0] != 1) & (states[:, :, 3] != 1)
+    allowed = np.take_along_axis(safe_env, _TRANSFORM_MAPS[t], axis=1)
+    allowed[~allowed.any(axis=1)] = True
+    return allowed
+
+
 class Agent:
     def __init__(
         self,
@@ -126,12 +289,38 @@ class Agent:
         eps_decay_steps: int = 200_000,
         seed: Optional[int] = None,
         use_mirror: bool = True,  # rotations only by default; set True to enable reflections too
+        max_states: Optional[int] = None,  # bounded memory: evict beyond this many keys
+        evict: str = "visits",  # "visits" (least visited) or "lru" (least recently updated)
+        q_dtype: str = "float32",  # "float32", "float16" or "int8" (scaled by q_scale)
+        q_scale: float = 1.0,
+        learner: str = "q",  # "q" (one-step), "nstep" or "qlambda" (Watkins Q(lambda))
+        n_step: int = 4,  # learner="nstep": length of the return
+        lam: float = 0.8,  # learner="qlambda": trace decay lambda
+        trace_len: int = 16,  # learner="qlambda": max pairs kept in the trace
+        replay_size: int = 0,  # experience replay ring buffer size (0 = off)
+        replay_ratio: float = 1.0,  # replayed backups per real step
+        replay_batch: int = 256,  # minibatch size (one vectorized pass per minibatch)
+        plan_steps: int = 0,  # Dyna-Q: simulated backups per real step (0 = off)
+        plan_theta: float = 1e-3,  # prioritized sweeping: min Bellman error queued
+        plan_alpha: float = 1.0,  # step size of the simulated backups
+        rng: Optional[random.Random] = None,  # own stream (default: random.Random(seed)); `random` = old global mode
     ):
-        # Q-table: key(int) -> mutable array('f',4)
-        self.registre = defaultdict(lambda: array("f", [0.0, 0.0, 0.0, 0.0]))
+        if learner not in ("q", "nstep", "qlambda"):
+            raise ValueError(f"Unknown learner: {learner} (q/nstep/qlambda)")
+
+        # Q-table: key(int) -> 4 Q-values (open addressing, see qtable.py)
+        self._table_options = dict(
+            max_entries=max_states,
+            evict=evict,
+            q_dtype=q_dtype,
+            q_scale=q_scale,
+            seed=seed,
+        )
+        self.registre = QTable(**self._table_options)
 
         self.lastKey: Optional[int] = None
         self.lastChoice_can: int = 0
+        self.lastExplore = False
 
         self.alpha = alpha
         self.gamma = gamma
@@ -143,8 +332,32 @@ class Agent:
 
         self.use_mirror = use_mirror
 
-        if seed is not None:
-            random.seed(seed)
+        # multi-step learners (traces.py), cut on exploratory actions and on done
+        self.learner = learner
+        self.nstep = NStepBuffer(n_step, gamma) if learner == "nstep" else None
+        self.trace = (
+            EligibilityTrace(trace_len, gamma, lam) if learner == "qlambda" else None
+        )
+
+        # experience replay (replay.py): extra one-step backups from past transitions
+        self.replay = ReplayBuffer(replay_size, seed) if replay_size > 0 else None
+        self.replay_ratio = replay_ratio
+        self.replay_batch = replay_batch
+        self._replay_credit = 0.0
+
+        # Dyna-Q planning (planner.py): learned model + prioritized sweeping
+        self.plan_steps = plan_steps
+        self.planner = (
+            PrioritizedSweeping(gamma, plan_theta, plan_alpha) if plan_steps > 0 else None
+        )
+
+        # batch API state (register_batch -> update_batch)
+        self.np_rng = np.random.default_rng(seed)
+        self.lastKeys: Optional[np.ndarray] = None
+        self.lastChoices_can: Optional[np.ndarray] = None
+
+        # scalar API randomness (exploration, tie-break): per-agent stream
+        self.rng = rng if rng is not None else random.Random(seed)
 
     def epsilon(self) -> float:
         t = min(1.0, self.step_count / self.eps_decay_steps)
@@ -159,39 +372,51 @@ class Agent:
           - choose action in canonical frame
           - map back to env frame before returning
         """
-        key, (rot_k, mirror) = _canonical_pack_key(
-            state_env, use_mirror=self.use_mirror
-        )
-        state_can = _transform_state(state_env, rot_k, mirror)
+        key, t = _canonicalize(state_env, self.use_mirror)
+        # allowed_actions in CANONICAL frame (important!), from the env-frame safe mask
+        return self._choose(key, t, SAFE_CAN[t][_safe_mask(state_env)])
+
+    def register_key(self, key: int, rot_k: int, mirror: bool) -> int:
+        """
+        register() for a state already packed+canonicalized (Interpreter.transition /
+        observe_key). The safe actions are read from the key digits.
+        """
+        return self._choose(key, rot_k + 4 * mirror, ALLOWED_CAN[_safe_can_mask(key)])
 
+    def _choose(self, key: int, t: int, allowed_can: tuple) -> int:
+        """Epsilon-greedy among allowed_can (canonical frame); returns the ENV action."""
         self.lastKey = key  # store packed canonical key
 
         eps = self.epsilon()
 
-        # allowed_actions computed in CANONICAL frame (important!)
-        safe_actions = []
-        for a_can, dirfeat in enumerate(state_can):
-            wall_bin, green_bin, red_bin, body_bin = dirfeat
-            if wall_bin == 1 or body_bin == 1:
-                continue
-            safe_actions.append(a_can)
-
-        allowed_can = safe_actions if safe_actions else [0, 1, 2, 3]
-
         # epsilon-greedy in canonical frame
-        if random.random() < eps:
-            a_can = random.choice(allowed_can)
+        rng = self.rng
+        self.lastExplore = rng.random() < eps
+        if self.lastExplore:
+            a_can = rng.choice(allowed_can)
+            if self.learner != "q":
+                self._cut_traces(key)
         else:
-            q = self.registre[key]
+            # unseen key = all zeros (no insert: only changeLast inserts)
+            i = self.registre.find(key)
+            q = self.registre.values(i) if i >= 0 else (0.0, 0.0, 0.0, 0.0)
             best_v = max(q[a] for a in allowed_can)
             best_actions = [a for a in allowed_can if q[a] == best_v]
-            a_can = random.choice(best_actions)
+            a_can = rng.choice(best_actions)
 
         self.lastChoice_can = a_can
 
         # map canonical action back to env action (Option A, direct mapping)
-        a_env = _canon_to_env_action(a_can, rot_k, mirror)
-        return a_env
+        return CANON_TO_ENV[t][a_can]
+
+    def _cut_traces(self, key: int) -> None:
+        """Exploratory action from `key`: the multi-step return stops here."""
+        if self.nstep is not None:
+            i = self.registre.find(key)
+            bootstrap = self.registre.max_value(i) if i >= 0 else 0.0
+            self.nstep.flush(self.registre, self.alpha, bootstrap)
+        if self.trace is not None:
+            self.trace.clear()
 
     def changeLast(self, reward: float, next_state_env: StateType, done: bool) -> None:
         """
@@ -200,34 +425,144 @@ class Agent:
         """
         if self.lastKey is None:
             return
+        self.update_key(reward, _canonicalize(next_state_env, self.use_mirror)[0], done)
 
-        next_key, _ = _canonical_pack_key(next_state_env, use_mirror=self.use_mirror)
-
-        q = self.registre[self.lastKey]
-        a = self.lastChoice_can
-        q_sa = q[a]
+    def update_key(self, reward: float, next_key: int, done: bool) -> None:
+        """changeLast() with the next state already packed+canonicalized."""
+        if self.lastKey is None:
+            return
 
+        table = self.registre
         if done:
-            target = reward
+            next_max = 0.0
         else:
-            target = reward + self.gamma * max(self.registre[next_key])
+            # lookup only: an unseen next state counts as 0 and is NOT inserted
+            j = table.find(next_key)
+            next_max = table.max_value(j) if j >= 0 else 0.0
 
-        q[a] = q_sa + self.alpha * (target - q_sa)
+        a = self.lastChoice_can
+        if self.nstep is not None:
+            if self.nstep.push(self.lastKey, a, reward):
+                self.nstep.backup_oldest(table, self.alpha, next_max)
+            if done:
+                self.nstep.flush(table, self.alpha, 0.0)
+        else:
+            i = table.slot(self.lastKey)
+            q_sa = table.value(i, a)
+            target = reward + self.gamma * next_max
+            if self.trace is None:
+                table.set_value(i, a, q_sa + self.alpha * (target - q_sa))
+            else:
+                self.trace.push(table, self.lastKey, a, i)
+                self.trace.backup(table, self.alpha, target - q_sa)
+                if done:
+                    self.trace.clear()
         self.step_count += 1
 
+        if self.replay is not None:
+            self.replay.push(self.lastKey, a, reward, next_key, done)
+            self._replay(1)
+
+        if self.planner is not None:
+            row = self.planner.observe(self.lastKey, a, reward, next_key, done)
+            self.planner.real_backup(table, row)
+            self.planner.plan(table, self.plan_steps)
+
+    def _check_batch(self) -> None:
+        """The batch API only does one-step backups (+ replay): refuse what it would skip."""
+        if self.learner != "q":
+            raise ValueError(
+                f"learner={self.learner!r} is not supported by the batch API (learner='q' only)"
+            )
+        if self.planner is not None:
+            raise ValueError("plan_steps > 0 is not supported by the batch API")
+
+    def _backup_batch(self, keys, actions, rewards, next_keys, dones) -> None:
+        """Vectorized one-step backups (repeated pairs: see update_batch)."""
+        table = self.registre
+        next_max = table.values_many(next_keys).max(axis=1)
+        targets = rewards + self.gamma * np.where(dones, 0.0, next_max)
+        table.backup_many(table.slot_many(keys), actions, targets, self.alpha)
+
+    def _replay(self, n_real: int) -> None:
+        """replay_ratio backups per real step, by minibatches of replay_batch."""
+        if len(self.replay) < self.replay_batch:
+            return
+        self._replay_credit += self.replay_ratio * n_real
+        while self._replay_credit >= self.replay_batch:
+            self._backup_batch(*self.replay.sample(self.replay_batch))
+            self._replay_credit -= self.replay_batch
+
+    # ---------- BATCH API (N games per call) ----------
+    def register_batch(self, states_env) -> np.ndarray:
+        """
+        Vectorized register(): states_env is (N, 4, 4) (or a list of N states).
+        Returns N env-frame actions (int64). Same epsilon / safe-action rules.
+        """
+        states = np.asarray(states_env, dtype=np.int64).reshape(-1, 4, 4)
+        n = len(states)
+        keys, t = _canonicalize_batch(states, self.use_mirror)
+        allowed = _allowed_can_batch(states, t)
+
+        q = self.registre.values_many(keys)
+        best = np.where(allowed, q, -np.inf)
+        best = best == best.max(axis=1, keepdims=True)
+
+        explore = self.np_rng.random(n) < self.epsilon()
+        candidates = np.where(explore[:, None], allowed, best)
+        # uniform pick among candidates: random score > 0 on candidates only
+        a_can = np.argmax((self.np_rng.random((n, 4)) + 1.0) * candidates, axis=1)
+
+        self.lastKeys = keys
+        self.lastChoices_can = a_can
+        return _TRANSFORM_MAPS[t, a_can]
+
+    def update_batch(self, rewards, next_states_env, dones) -> None:
+        """
+        Vectorized changeLast() for the N transitions of the last register_batch.
+
+        Repeated (key, action) pairs inside a batch: every target is computed from
+        the Q-table as it was before the batch, and each pair moves ONCE toward
+        the mean of its targets (one alpha-step per pair, not one per copy).
+        """
+        self._check_batch()
+        if self.lastKeys is None:
+            return
+
+        rewards = np.asarray(rewards, dtype=np.float64)
+        dones = np.asarray(dones, dtype=bool)
+        next_states = np.asarray(next_states_env, dtype=np.int64).reshape(-1, 4, 4)
+        next_keys, _ = _canonicalize_batch(next_states, self.use_mirror)
+
+        self._backup_batch(self.lastKeys, self.lastChoices_can, rewards, next_keys, dones)
+        self.step_count += len(rewards)
+
+        if self.replay is not None:
+            self.replay.push_many(
+                self.lastKeys, self.lastChoices_can, rewards, next_keys, dones
+            )
+            self._replay(len(rewards))
+
+    def learn_batch(self, keys, actions, rewards, next_keys, dones) -> None:
+        """
+        update_batch() for transitions collected elsewhere (actor_learner.py):
+        packed canonical keys, canonical actions. Same rule for repeated pairs.
+        """
+        self._check_batch()
+        rewards = np.asarray(rewards, dtype=np.float64)
+        self._backup_batch(keys, actions, rewards, next_keys, dones)
+        self.step_count += len(rewards)
+
+        if self.replay is not None:
+            self.replay.push_many(keys, actions, rewards, next_keys, dones)
+            self._replay(len(rewards))
+
     def getRegistre(self):
         return self.registre
 
     # ---------- SAVE / LOAD ----------
-    def save(self, path: str | Path) -> None:
-        path = Path(path)
-        path.parent.mkdir(parents=True, exist_ok=True)
-
-        # defaultdict(lambda: ...) not safely picklable due to lambda -> save as plain dict
-        registre_plain = {k: v for k, v in self.registre.items()}
-
-        payload = {
-            "registre": registre_plain,
+    def _meta(self) -> dict:
+        return {
             "alpha": self.alpha,
             "gamma": self.gamma,
             "eps_start": self.eps_start,
@@ -236,23 +571,65 @@ class Agent:
             "step_count": self.step_count,
             "use_mirror": self.use_mirror,
         }
-        with path.open("wb") as f:
-            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
 
-    def load(self, path: str | Path, strict: bool = False) -> None:
+    def snapshot(self, delta: bool = False) -> tuple[np.ndarray, np.ndarray, dict]:
+        """
+        Cheap copy (keys, q, meta) for a background write (checkpoint.Checkpointer).
+        delta=True: only entries changed since the previous snapshot.
+        Either way the dirty log restarts from here.
+        """
+        if delta:
+            keys, q = self.registre.take_dirty()
+        else:
+            keys, q = self.registre.arrays()
+            self.registre.clear_dirty()
+        return keys, q, self._meta()
+
+    def save(self, path: str | Path) -> None:
+        """
+        .pkl -> legacy pickle (plain dict key -> array('f', 4)),
+        anything else -> binary checkpoint (checkpoint.py, mmap-able).
+        """
         path = Path(path)
-        with path.open("rb") as f:
-            payload = pickle.load(f)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        keys, q = self.registre.arrays()
+        if path.suffix != ".pkl":
+            checkpoint.write_model(path, keys, q, self._meta())
+            return
 
-        loaded = payload["registre"]
+        registre_plain = {
+            k: array("f", row) for k, row in zip(keys.tolist(), q.tolist())
+        }
+        payload = {"registre": registre_plain, **self._meta()}
+        with path.open("wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
 
-        # rebuild defaultdict factory
-        self.registre = defaultdict(lambda: array("f", [0.0, 0.0, 0.0, 0.0]))
-        for k, v in loaded.items():
-            if isinstance(v, array):
-                self.registre[k] = v
+    def load(self, path: str | Path, strict: bool = False, readonly: bool = False) -> None:
+        """
+        Loads a binary checkpoint or a legacy pickle.
+        readonly=True (binary only): the table is a zero-copy np.memmap view
+        (FrozenQTable) -> instant start for evaluation, no training on it.
+        """
+        path = Path(path)
+        if checkpoint.is_model_file(path):
+            payload, keys, q = checkpoint.read_model(path, mmap=readonly)
+            if payload["delta"]:
+                raise ValueError(f"{path} is a delta checkpoint: compact it first")
+            if readonly:
+                self.registre = FrozenQTable(keys, q)
             else:
-                self.registre[k] = array("f", v)
+                self.registre = QTable.from_arrays(keys, q, **self._table_options)
+        else:
+            with path.open("rb") as f:
+                payload = pickle.load(f)
+
+            loaded = payload["registre"]
+            keys = np.fromiter(loaded.keys(), dtype=np.int64, count=len(loaded))
+            q = np.array([list(v) for v in loaded.values()], dtype=np.float32)
+            self.registre = QTable.from_arrays(
+                keys, q.reshape(-1, 4), **self._table_options
+            )
 
         self.step_count = payload.get("step_count", 0)
         self.use_mirror = payload.get("use_mirror", True)
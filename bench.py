@@ -0,0 +1,866 @@
+# bench.py
+"""
+Micro/macro benchmarks.
+
+Usage:
+  python bench.py train [steps]
+  python bench.py canon [n_states]
+  python bench.py batch [steps] [n_envs]
+  python bench.py memcap [steps] [max_states]
+  python bench.py policy [episodes]
+  python bench.py learners [target_avg_len] [max_steps]
+  python bench.py replay [target_avg_len] [max_steps]
+  python bench.py planner [target_avg_len] [max_steps]
+  python bench.py vecenv [steps] [n_envs]
+  python bench.py bitboard [steps]
+  python bench.py spawn [episodes]
+  python bench.py snapshot [n]
+  python bench.py scale [steps]
+  python bench.py rays [n]
+  python bench.py transition [steps]
+  python bench.py hogwild [steps] [episodes]
+  python bench.py actors [steps] [episodes]
+"""
+import copy
+import random
+import sys
+import time
+from array import array
+from collections import defaultdict
+
+from bitboard_environment import BitboardEnvironment
+from environement import BODY, EMPTY, WALL, Environment
+from hogwild import free_threaded, train_hogwild
+from interpreter import Interpreter
+from actor_learner import ActorLearner
+from agent import (
+    Agent,
+    _canonical_pack_key,
+    _canonical_pack_key_loop,
+    _canon_to_env_action,
+    _transform_state,
+)
+from policy import compile_policy
+from tile import Tile
+from train import AGENT_ARGS
+from utils import intDir
+from vec_environment import VecEnvironment
+
+
+class _DictRegistry:
+    """
+    Ancien registre (defaultdict key -> array('f', 4)) derrière l'API de slots
+    de QTable qu'utilise Agent: le slot d'une clé est la clé elle-même.
+    """
+
+    def __init__(self):
+        self.d = defaultdict(lambda: array("f", [0.0, 0.0, 0.0, 0.0]))
+
+    def find(self, key: int) -> int:
+        return key if key in self.d else -1
+
+    def slot(self, key: int) -> int:
+        self.d[key]
+        return key
+
+    def values(self, slot: int) -> list:
+        return self.d[slot].tolist()
+
+    def value(self, slot: int, action: int) -> float:
+        return self.d[slot][action]
+
+    def max_value(self, slot: int) -> float:
+        return max(self.d[slot])
+
+    def set_value(self, slot: int, action: int, value: float) -> None:
+        self.d[slot][action] = value
+
+    def __len__(self) -> int:
+        return len(self.d)
+
+    def nbytes(self) -> int:
+        total = sys.getsizeof(self.d)
+        for k, v in self.d.items():
+            total += sys.getsizeof(k) + sys.getsizeof(v)
+        return total
+
+
+def bench_train(steps: int = 300_000, seed: int = 0) -> None:
+    """Même boucle, même seed: QTable vs ancien registre dict (steps/s + mémoire)."""
+    results = {}
+    for name in ("dict", "qtable"):
+        agent = Agent(eps_start=0.2, eps_end=0.02, eps_decay_steps=2_000_000, seed=seed)
+        if name == "dict":
+            agent.registre = _DictRegistry()
+        speed, _ = _train_loop(agent, steps, seed=seed)
+        n = len(agent.registre)
+        nbytes = agent.registre.nbytes()
+        results[name] = speed
+        print(
+            f"[train] {name:<6} steps={steps} speed={speed:.1f} steps/s "
+            f"states={n} mem={nbytes / 1e6:.2f}MB ({nbytes / n:.1f} B/state)"
+        )
+    print(f"[train] qtable/dict speed ratio=x{results['qtable'] / results['dict']:.2f}")
+
+
+def _random_state(rng: random.Random):
+    # bins tirés dans 0..4; on force des symétries de temps en temps (égalités)
+    dirs = [tuple(rng.randrange(5) for _ in range(4)) for _ in range(4)]
+    if rng.random() < 0.25:
+        dirs[2] = dirs[0]
+    if rng.random() < 0.25:
+        dirs[3] = dirs[1]
+    return tuple(dirs)
+
+
+def bench_canon(n_states: int = 200_000, seed: int = 0) -> None:
+    """_canonical_pack_key (tables) vs _canonical_pack_key_loop: égalité + vitesse."""
+    rng = random.Random(seed)
+    states = [_random_state(rng) for _ in range(n_states)]
+
+    for use_mirror in (False, True):
+        for s in states:
+            a = _canonical_pack_key(s, use_mirror)
+            b = _canonical_pack_key_loop(s, use_mirror)
+            if a != b:
+                raise AssertionError(f"mismatch {s} mirror={use_mirror}: {a} != {b}")
+
+        timings = {}
+        for name, fn in (
+            ("loop", _canonical_pack_key_loop),
+            ("table", _canonical_pack_key),
+        ):
+            start = time.perf_counter()
+            for s in states:
+                fn(s, use_mirror)
+            timings[name] = time.perf_counter() - start
+        print(
+            f"[canon] mirror={use_mirror} n={n_states} identical "
+            f"loop={timings['loop'] / n_states * 1e6:.2f}us "
+            f"table={timings['table'] / n_states * 1e6:.2f}us "
+            f"speedup=x{timings['loop'] / timings['table']:.1f}"
+        )
+
+
+def bench_batch(steps: int = 200_000, n_envs: int = 32, seed: int = 0) -> None:
+    """N parties pilotées par register_batch/update_batch vs la boucle scalaire."""
+    envs = [Environment(seed=seed + k) for k in range(n_envs)]
+    inters = [Interpreter(env) for env in envs]
+    agent = Agent(eps_start=0.2, eps_end=0.02, eps_decay_steps=2_000_000, seed=seed)
+
+    states = [inter.get_state() for inter in inters]
+    rewards = [0.0] * n_envs
+    dones = [False] * n_envs
+    agent_time = 0.0
+    start = time.perf_counter()
+    for _ in range(steps // n_envs):
+        t0 = time.perf_counter()
+        actions = agent.register_batch(states).tolist()
+        agent_time += time.perf_counter() - t0
+
+        for j, inter in enumerate(inters):
+            rewards[j], dones[j] = inter.apply_dir(intDir(actions[j]))
+            states[j] = inter.get_state()
+
+        t0 = time.perf_counter()
+        agent.update_batch(rewards, states, dones)
+        agent_time += time.perf_counter() - t0
+
+        for j, inter in enumerate(inters):
+            if dones[j]:
+                inter.reset_game()
+                states[j] = inter.get_state()
+    elapsed = time.perf_counter() - start
+    done_steps = (steps // n_envs) * n_envs
+    print(
+        f"[batch] n_envs={n_envs} steps={done_steps} "
+        f"speed={done_steps / elapsed:.1f} steps/s "
+        f"agent={agent_time / done_steps * 1e6:.2f}us/step "
+        f"states={len(agent.registre)}"
+    )
+
+    env = Environment(seed=seed)
+    inter = Interpreter(env)
+    agent = Agent(eps_start=0.2, eps_end=0.02, eps_decay_steps=2_000_000, seed=seed)
+    state = inter.get_state()
+    agent_time = 0.0
+    start = time.perf_counter()
+    for _ in range(done_steps):
+        t0 = time.perf_counter()
+        action_int = agent.register(state)
+        agent_time += time.perf_counter() - t0
+        reward, done = inter.apply_dir(intDir(action_int))
+        next_state = inter.get_state()
+        t0 = time.perf_counter()
+        agent.changeLast(reward, next_state, done)
+        agent_time += time.perf_counter() - t0
+        if done:
+            inter.reset_game()
+            state = inter.get_state()
+        else:
+            state = next_state
+    elapsed = time.perf_counter() - start
+    print(
+        f"[batch] scalar steps={done_steps} "
+        f"speed={done_steps / elapsed:.1f} steps/s "
+        f"agent={agent_time / done_steps * 1e6:.2f}us/step "
+        f"states={len(agent.registre)}"
+    )
+
+
+def _train_loop(
+    agent: Agent, steps: int, window: int = 50_000, seed: int = 0
+) -> tuple[float, float]:
+    """Boucle de train.py. Returns (steps/s, avgLen sur les `window` derniers steps)."""
+    env = Environment(seed=seed)
+    inter = Interpreter(env, use_mirror=agent.use_mirror)
+    key, rot_k, mirror = inter.observe_key()
+    len_sum = 0
+    start = time.perf_counter()
+    for i in range(steps):
+        action_int = agent.register_key(key, rot_k, mirror)
+        reward, done, next_key, next_rot_k, next_mirror = inter.transition(action_int)
+        agent.update_key(reward, next_key, done)
+        if i >= steps - window:
+            len_sum += env.snake_length
+        if done:
+            inter.reset_game()
+            key, rot_k, mirror = inter.observe_key()
+        else:
+            key, rot_k, mirror = next_key, next_rot_k, next_mirror
+    return steps / (time.perf_counter() - start), len_sum / min(window, steps)
+
+
+def bench_memcap(steps: int = 300_000, max_states: int = 4_000, seed: int = 0) -> None:
+    """Table bornée (éviction) et stockage quantifié vs table libre float32."""
+    configs = [
+        ("float32", {}),
+        ("float16", {"q_dtype": "float16"}),
+        ("int8", {"q_dtype": "int8"}),
+        (f"cap={max_states} visits", {"max_states": max_states}),
+        (f"cap={max_states} lru", {"max_states": max_states, "evict": "lru"}),
+        (
+            f"cap={max_states} lru int8",
+            {"max_states": max_states, "evict": "lru", "q_dtype": "int8"},
+        ),
+    ]
+    for name, options in configs:
+        agent = Agent(
+            eps_start=0.2, eps_end=0.02, eps_decay_steps=2_000_000, seed=seed, **options
+        )
+        speed, avg_len = _train_loop(agent, steps, seed=seed)
+        table = agent.registre
+        print(
+            f"[memcap] {name:<22} speed={speed:.1f} steps/s avgLen={avg_len:.2f} "
+            f"states={len(table)} evicted={table.evicted} "
+            f"mem={table.nbytes() / 1e6:.2f}MB"
+        )
+
+
+MODEL = "train/10000000-v6.pkl"
+
+
+def _greedy_q(agent: Agent, state_env, rng=random) -> int:
+    """Ancien évaluateur de play_1000.py (lecture Q + max + liste d'égalités)."""
+    key, (rot_k, mirror) = _canonical_pack_key(state_env, use_mirror=agent.use_mirror)
+    state_can = _transform_state(state_env, rot_k, mirror)
+    values = agent.registre.get(key)
+    if values is None:
+        return 0
+    allowed_can = [
+        a for a, (w, _, _, b) in enumerate(state_can) if w != 1 and b != 1
+    ] or [0, 1, 2, 3]
+    best_v = max(values[a] for a in allowed_can)
+    best = [a for a in allowed_can if values[a] == best_v]
+    return _canon_to_env_action(rng.choice(best), rot_k, mirror)
+
+
+def _eval_episodes(act, episodes: int, seed: int, max_steps: int = 10_000) -> list:
+    env = Environment(seed=seed)
+    inter = Interpreter(env)
+    lengths = []
+    for _ in range(episodes):
+        env.reset_game()
+        for _ in range(max_steps):
+            _, done = inter.apply_dir(intDir(act(inter.get_state(), env.rng)))
+            if done:
+                break
+        lengths.append(len(env.snake))
+    return lengths
+
+
+def bench_policy(episodes: int = 200, seed: int = 0) -> None:
+    """Évaluation greedy: lecture Q-table vs CompiledPolicy (mêmes épisodes)."""
+    agent = Agent(eps_start=0.0, eps_end=0.0, eps_decay_steps=1)
+    agent.load(MODEL)
+
+    start = time.perf_counter()
+    policy = compile_policy(agent.registre, agent.use_mirror)
+    compile_s = time.perf_counter() - start
+
+    results = {}
+    for name, act in (
+        ("qtable", lambda s, rng: _greedy_q(agent, s, rng)),
+        ("compiled", lambda s, rng: policy.act(s, rng=rng)),
+    ):
+        start = time.perf_counter()
+        lengths = _eval_episodes(act, episodes, seed)
+        results[name] = (time.perf_counter() - start, lengths)
+
+    if results["qtable"][1] != results["compiled"][1]:
+        raise AssertionError("compiled policy diverges from the Q-table evaluator")
+    t_q, t_c = results["qtable"][0], results["compiled"][0]
+    print(f"[policy] {MODEL} compile={compile_s * 1e3:.1f}ms identical episodes")
+    print(
+        f"[policy] qtable={episodes / t_q:.1f} ep/s compiled={episodes / t_c:.1f} ep/s "
+        f"speedup=x{t_q / t_c:.2f}"
+    )
+
+    # décision seule (sans simulation), sur des états réels
+    states = []
+    _eval_episodes(lambda s, rng: states.append(s) or policy.act(s, rng=rng), 20, seed + 1)
+    for name, act in (
+        ("qtable", lambda s: _greedy_q(agent, s)),
+        ("compiled", policy.act),
+    ):
+        start = time.perf_counter()
+        for s in states:
+            act(s)
+        per = (time.perf_counter() - start) / len(states)
+        print(f"[policy] decision {name}={per * 1e6:.2f}us ({len(states)} states)")
+
+
+def _steps_to_target(
+    agent: Agent, target_len: float, max_steps: int, window: int = 20_000, seed: int = 0
+) -> tuple[int, float, float]:
+    """Train until avgLen over the last `window` steps >= target. Returns (steps, seconds, avgLen)."""
+    env = Environment(seed=seed)
+    inter = Interpreter(env, use_mirror=agent.use_mirror)
+    key, rot_k, mirror = inter.observe_key()
+    lens = [0] * window
+    len_sum = 0
+    avg_len = 0.0
+    start = time.perf_counter()
+    for i in range(1, max_steps + 1):
+        action_int = agent.register_key(key, rot_k, mirror)
+        reward, done, next_key, next_rot_k, next_mirror = inter.transition(action_int)
+        agent.update_key(reward, next_key, done)
+
+        n = env.snake_length
+        len_sum += n - lens[i % window]
+        lens[i % window] = n
+        if i >= window and i % 5_000 == 0:
+            avg_len = len_sum / window
+            if avg_len >= target_len:
+                break
+
+        if done:
+            inter.reset_game()
+            key, rot_k, mirror = inter.observe_key()
+        else:
+            key, rot_k, mirror = next_key, next_rot_k, next_mirror
+    return i, time.perf_counter() - start, avg_len
+
+
+def bench_learners(target_len: float = 11.0, max_steps: int = 2_000_000, seed: int = 0):
+    """Wall-clock to reach a target avgLen: one-step Q vs n-step vs Q(lambda)."""
+    configs = [
+        ("q", {}),
+        ("nstep n=3", {"learner": "nstep", "n_step": 3}),
+        ("nstep n=6", {"learner": "nstep", "n_step": 6}),
+        ("qlambda l=0.8", {"learner": "qlambda", "lam": 0.8}),
+        ("qlambda l=0.5", {"learner": "qlambda", "lam": 0.5}),
+    ]
+    for name, options in configs:
+        agent = Agent(
+            eps_start=0.2, eps_end=0.02, eps_decay_steps=2_000_000, seed=seed, **options
+        )
+        steps, seconds, avg_len = _steps_to_target(agent, target_len, max_steps, seed=seed)
+        reached = "reached" if avg_len >= target_len else "NOT reached"
+        print(
+            f"[learners] {name:<14} target={target_len} {reached} steps={steps} "
+            f"time={seconds:.1f}s speed={steps / seconds:.0f} steps/s avgLen={avg_len:.2f}"
+        )
+
+
+def bench_replay(target_len: float = 12.5, max_steps: int = 2_000_000, seed: int = 0):
+    """Env steps / wall-clock to reach a target avgLen with experience replay."""
+    configs = [("no replay", {})] + [
+        (f"replay ratio={r}", {"replay_size": 200_000, "replay_ratio": r})
+        for r in (1, 4, 16)
+    ]
+    for name, options in configs:
+        agent = Agent(
+            eps_start=0.2, eps_end=0.02, eps_decay_steps=2_000_000, seed=seed, **options
+        )
+        steps, seconds, avg_len = _steps_to_target(agent, target_len, max_steps, seed=seed)
+        reached = "reached" if avg_len >= target_len else "NOT reached"
+        print(
+            f"[replay] {name:<18} target={target_len} {reached} env_steps={steps} "
+            f"time={seconds:.1f}s speed={steps / seconds:.0f} steps/s avgLen={avg_len:.2f}"
+        )
+
+
+def bench_planner(target_len: float = 12.5, max_steps: int = 2_000_000, seed: int = 0):
+    """Env steps / wall-clock to reach a target avgLen with Dyna-Q prioritized sweeping."""
+    for plan_steps in (0, 5, 20):
+        agent = Agent(
+            eps_start=0.2,
+            eps_end=0.02,
+            eps_decay_steps=2_000_000,
+            seed=seed,
+            plan_steps=plan_steps,
+        )
+        steps, seconds, avg_len = _steps_to_target(agent, target_len, max_steps, seed=seed)
+        reached = "reached" if avg_len >= target_len else "NOT reached"
+        model = len(agent.planner) if agent.planner is not None else 0
+        print(
+            f"[planner] plan_steps={plan_steps:<3} target={target_len} {reached} "
+            f"env_steps={steps} time={seconds:.1f}s speed={steps / seconds:.0f} steps/s "
+            f"avgLen={avg_len:.2f} model_rows={model}"
+        )
+
+
+def bench_vecenv(steps: int = 1_000_000, n_envs: int = 1024, seed: int = 0) -> None:
+    """VecEnvironment (env only, then with register_batch/update_batch) vs Environment+Interpreter."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    env = Environment(seed=seed)
+    inter = Interpreter(env)
+    n_scalar = min(steps, 200_000)
+    start = time.perf_counter()
+    for _ in range(n_scalar):
+        _, done = inter.apply_dir(intDir(env.rng.randrange(4)))
+        inter.get_state()
+        if done:
+            inter.reset_game()
+    elapsed = time.perf_counter() - start
+    print(f"[vecenv] scalar          env steps/s={n_scalar / elapsed:,.0f}")
+
+    for n in sorted({1, 64, n_envs}):
+        venv = VecEnvironment(n, seed=seed)
+        actions = rng.integers(0, 4, size=(min(20_000, max(1, steps // n)), n))
+        start = time.perf_counter()
+        for a in actions:
+            venv.step(a)
+        elapsed = time.perf_counter() - start
+        print(f"[vecenv] n_envs={n:<6}   env steps/s={actions.size / elapsed:,.0f}")
+
+    venv = VecEnvironment(n_envs, seed=seed)
+    agent = Agent(eps_start=0.2, eps_end=0.02, eps_decay_steps=2_000_000, seed=seed)
+    obs = venv.observe()
+    n_iter = max(1, steps // n_envs)
+    start = time.perf_counter()
+    for _ in range(n_iter):
+        obs, rewards, dones = venv.step(agent.register_batch(obs))
+        agent.update_batch(rewards, obs, dones)
+    elapsed = time.perf_counter() - start
+    print(
+        f"[vecenv] n_envs={n_envs:<6}   train steps/s={n_iter * n_envs / elapsed:,.0f} "
+        f"states={len(agent.registre)} avgLen={venv.length.mean():.2f}"
+    )
+
+
+def bench_bitboard(steps: int = 300_000, seed: int = 0) -> None:
+    """Environment vs BitboardEnvironment: step + get_state, v6 policy + 2% random (long snakes)."""
+    agent = Agent()
+    agent.load(MODEL, readonly=True)
+    policy = compile_policy(agent.registre, agent.use_mirror)
+
+    for env_cls in (Environment, BitboardEnvironment):
+        rng = random.Random(seed)
+        inter = Interpreter(env_cls(seed=seed))
+        state = inter.get_state()
+        t_step = t_state = 0.0
+        len_sum = 0
+        for _ in range(steps):
+            # a few random moves: the greedy policy alone can cycle forever
+            a = rng.randrange(4) if rng.random() < 0.02 else policy.act(state, rng=rng)
+            t0 = time.perf_counter()
+            _, done = inter.apply_dir(intDir(a))
+            t1 = time.perf_counter()
+            state = inter.get_state()
+            t_state += time.perf_counter() - t1
+            t_step += t1 - t0
+            len_sum += inter.env.snake_length
+            if done:
+                inter.reset_game()
+                state = inter.get_state()
+        print(
+            f"[bitboard] {env_cls.__name__:<20} steps/s={steps / (t_step + t_state):,.0f} "
+            f"apply_dir={t_step / steps * 1e6:.2f}us get_state={t_state / steps * 1e6:.2f}us "
+            f"avgLen={len_sum / steps:.2f}"
+        )
+
+
+class _SetFreeTilesEnvironment(Environment):
+    """Free cells as a plain set + random.choice(tuple(...)) (previous version, for comparison)."""
+
+    def _occupy(self, p):
+        self._free_set.discard(p)
+
+    def _free(self, p):
+        self._free_set.add(p)
+
+    def _random_free_cell(self):
+        if not self._free_set:
+            return -1
+        return self.rng.choice(tuple(self._free_set))
+
+    def _rebuild_free_tiles(self):
+        self._free_set = {p for p, code in enumerate(self._occ) if code == EMPTY}
+
+
+def bench_spawn(episodes: int = 200, seed: int = 0) -> None:
+    """Spawn-heavy episodes (1 green per 5 cells, reset + 200 safe random moves), 10x10 and 100x100."""
+    for size in (10, 100):
+        n_green = size * size // 5
+        for base in (_SetFreeTilesEnvironment, Environment):
+            env = base(height=size, width=size, n_green=n_green, seed=seed)
+            n_episodes = max(1, episodes // (10 if size > 10 else 1))
+            eaten = steps = 0
+            start = time.perf_counter()
+            for _ in range(n_episodes):
+                env.reset_game()
+                for _ in range(200):
+                    h = env.head_index()
+                    hx, hy = h % size, h // size
+                    moves = [
+                        (dx, dy)
+                        for dx, dy in ((0, -1), (1, 0), (0, 1), (-1, 0))
+                        if env.in_bounds(hx + dx, hy + dy)
+                        and env.occupancy[h + dy * size + dx] != BODY
+                    ]
+                    if not moves:
+                        break
+                    tile = env.step(env.rng.choice(moves))
+                    steps += 1
+                    eaten += tile == Tile.GREEN
+                    if tile in (Tile.WALL, Tile.BODY):
+                        break
+            elapsed = time.perf_counter() - start
+            spawns = eaten + n_episodes * (n_green + env.N_RED)
+            print(
+                f"[spawn] {size}x{size} {base.__name__:<26} episodes={n_episodes} "
+                f"spawns={spawns} steps={steps} time={elapsed:.2f}s "
+                f"({elapsed / n_episodes * 1e3:.2f}ms/episode)"
+            )
+
+
+def bench_snapshot(n: int = 20_000, seed: int = 0) -> None:
+    """snapshot()/restore() vs copy.deepcopy, puis rollouts de 4 x 20 pas depuis une même position."""
+    for size in (10, 100):
+        for base in (Environment, BitboardEnvironment):
+            env = base(height=size, width=size, seed=seed)
+            for _ in range(50):
+                env.move(env.rng.randrange(4))
+            reps = max(1, n // (10 if size > 10 else 1))
+
+            start = time.perf_counter()
+            for _ in range(reps):
+                snap = env.snapshot()
+            t_snap = (time.perf_counter() - start) / reps
+            start = time.perf_counter()
+            for _ in range(reps):
+                env.restore(snap)
+            t_restore = (time.perf_counter() - start) / reps
+            start = time.perf_counter()
+            for _ in range(reps // 10 or 1):
+                copy.deepcopy(env)
+            t_deep = (time.perf_counter() - start) / (reps // 10 or 1)
+
+            # rollouts: 4 branches de 20 actions aléatoires, retour à la position de départ
+            roll = max(1, reps // 100)
+            rng = random.Random(seed)
+            start = time.perf_counter()
+            for _ in range(roll):
+                snap = env.snapshot()
+                for _ in range(4):
+                    for _ in range(20):
+                        if env.move(rng.randrange(4)) in (WALL, BODY):
+                            break
+                    env.restore(snap)
+            t_roll_snap = (time.perf_counter() - start) / roll
+            start = time.perf_counter()
+            for _ in range(roll):
+                for _ in range(4):
+                    sim = copy.deepcopy(env)
+                    for _ in range(20):
+                        if sim.move(rng.randrange(4)) in (WALL, BODY):
+                            break
+            t_roll_deep = (time.perf_counter() - start) / roll
+
+            print(
+                f"[snapshot] {size}x{size} {base.__name__:<20} bytes={len(snap)} "
+                f"snapshot={t_snap * 1e6:.1f}us restore={t_restore * 1e6:.1f}us "
+                f"deepcopy={t_deep * 1e6:.1f}us | rollout 4x20: "
+                f"snapshot={t_roll_snap * 1e6:.0f}us deepcopy={t_roll_deep * 1e6:.0f}us"
+            )
+
+
+def bench_scale(steps: int = 20_000, seed: int = 0) -> None:
+    """Environment + Interpreter (step + get_state, random safe moves): 10x10 -> 200x200, 1 -> 100 greens."""
+    import tracemalloc
+
+    for size in (10, 20, 50, 100, 200):
+        for n_green in (1, 10, 100):
+            if 2 * (n_green + 1 + 3) > size * size:
+                continue
+            tracemalloc.start()
+            env = Environment(height=size, width=size, n_green=n_green, seed=seed)
+            inter = Interpreter(env)
+            mem = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            rng = random.Random(seed)
+            state = inter.get_state()
+            t_reset = 0.0
+            resets = len_sum = 0
+            start = time.perf_counter()
+            for _ in range(steps):
+                safe = [a for a in range(4) if state[a][0] != 1 and state[a][3] != 1]
+                _, done = inter.apply_dir(intDir(rng.choice(safe) if safe else 0))
+                len_sum += env.snake_length
+                if done:
+                    t0 = time.perf_counter()
+                    inter.reset_game()
+                    t_reset += time.perf_counter() - t0
+                    resets += 1
+                state = inter.get_state()
+            elapsed = time.perf_counter() - start
+            print(
+                f"[scale] {size:>3}x{size:<3} greens={n_green:<3} "
+                f"speed={steps / elapsed:,.0f} steps/s "
+                f"step={(elapsed - t_reset) / steps * 1e6:.1f}us "
+                f"reset={t_reset / max(1, resets) * 1e3:.2f}ms x{resets} "
+                f"avgLen={len_sum / steps:.1f} mem={mem / 1e3:.0f}KB"
+            )
+
+
+def bench_rays(n: int = 20_000, seed: int = 0) -> None:
+    """get_state: marche case par case (_ray_features) vs index ligne/colonne, 10x10 -> 200x200."""
+    dirs = ((0, -1), (1, 0), (0, 1), (-1, 0))
+    for size in (10, 50, 200):
+        env = Environment(height=size, width=size, n_green=max(2, size // 5), seed=seed)
+        inter = Interpreter(env)
+        # états réels: quelques moves aléatoires entre deux mesures
+        states = []
+        for _ in range(200):
+            for _ in range(5):
+                if env.move(env.rng.randrange(4)) in (WALL, BODY):
+                    env.reset_game()
+            states.append(env.snapshot(with_rng=False))
+        reps = max(1, n // len(states))
+        t_walk = t_index = 0.0
+        for snap in states:
+            env.restore(snap)
+            start = time.perf_counter()
+            for _ in range(reps):
+                walk = tuple(inter._ray_features(dx, dy) for dx, dy in dirs)
+            t_walk += time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(reps):
+                indexed = inter.get_state()
+            t_index += time.perf_counter() - start
+            if walk != indexed:
+                raise AssertionError("indexed rays differ from the walk")
+        total = reps * len(states)
+        print(
+            f"[rays] {size:>3}x{size:<3} walk={t_walk / total * 1e6:.2f}us "
+            f"indexed={t_index / total * 1e6:.2f}us speedup=x{t_walk / t_index:.1f}"
+        )
+
+
+def bench_transition(steps: int = 200_000, seed: int = 0) -> None:
+    """Boucle de train.py: tuples (apply_dir + get_state + canonicalize) vs Interpreter.transition."""
+    pc = time.perf_counter
+    start = pc()
+    for _ in range(steps):
+        pc()
+    timer = (pc() - start) / steps  # coût d'un perf_counter(), retiré de chaque mesure
+
+    def new_agent():
+        return Agent(eps_start=0.2, eps_end=0.02, eps_decay_steps=2_000_000, seed=seed)
+
+    # --- avant: tuples d'état, agent.register / changeLast canonicalisent ---
+    env = Environment(seed=seed)
+    inter = Interpreter(env)
+    agent = new_agent()
+    parts = dict.fromkeys(("register", "intDir", "apply_dir", "get_state", "changeLast"), 0.0)
+    state = inter.get_state()
+    for _ in range(steps):
+        t0 = pc()
+        a = agent.register(state)
+        t1 = pc()
+        direction = intDir(a)
+        t2 = pc()
+        reward, done = inter.apply_dir(direction)
+        t3 = pc()
+        next_state = inter.get_state()
+        t4 = pc()
+        agent.changeLast(reward, next_state, done)
+        t5 = pc()
+        parts["register"] += t1 - t0
+        parts["intDir"] += t2 - t1
+        parts["apply_dir"] += t3 - t2
+        parts["get_state"] += t4 - t3
+        parts["changeLast"] += t5 - t4
+        if done:
+            inter.reset_game()
+            state = inter.get_state()
+        else:
+            state = next_state
+    before = parts
+
+    # --- après: clé packée canonique de bout en bout ---
+    env = Environment(seed=seed)
+    agent = new_agent()
+    inter = Interpreter(env, use_mirror=agent.use_mirror)
+    parts = dict.fromkeys(("register_key", "transition", "update_key"), 0.0)
+    key, rot_k, mirror = inter.observe_key()
+    for _ in range(steps):
+        t0 = pc()
+        a = agent.register_key(key, rot_k, mirror)
+        t1 = pc()
+        reward, done, next_key, next_rot_k, next_mirror = inter.transition(a)
+        t2 = pc()
+        agent.update_key(reward, next_key, done)
+        t3 = pc()
+        parts["register_key"] += t1 - t0
+        parts["transition"] += t2 - t1
+        parts["update_key"] += t3 - t2
+        if done:
+            inter.reset_game()
+            key, rot_k, mirror = inter.observe_key()
+        else:
+            key, rot_k, mirror = next_key, next_rot_k, next_mirror
+    after = parts
+
+    for name, parts in (("before", before), ("after", after)):
+        cost = {k: max(0.0, v / steps - timer) for k, v in parts.items()}
+        detail = " ".join(f"{k}={v * 1e6:.2f}us" for k, v in cost.items())
+        print(f"[transition] {name:<6} {detail} total={sum(cost.values()) * 1e6:.2f}us/step")
+
+    # bout en bout, sans instrumentation (= bench.py train)
+    for name in ("before", "after"):
+        env = Environment(seed=seed)
+        agent = new_agent()
+        inter = Interpreter(env, use_mirror=agent.use_mirror)
+        start = pc()
+        if name == "before":
+            state = inter.get_state()
+            for _ in range(steps):
+                reward, done = inter.apply_dir(intDir(agent.register(state)))
+                next_state = inter.get_state()
+                agent.changeLast(reward, next_state, done)
+                if done:
+                    inter.reset_game()
+                    state = inter.get_state()
+                else:
+                    state = next_state
+        else:
+            key, rot_k, mirror = inter.observe_key()
+            for _ in range(steps):
+                reward, done, next_key, next_rot_k, next_mirror = inter.transition(
+                    agent.register_key(key, rot_k, mirror)
+                )
+                agent.update_key(reward, next_key, done)
+                if done:
+                    inter.reset_game()
+                    key, rot_k, mirror = inter.observe_key()
+                else:
+                    key, rot_k, mirror = next_key, next_rot_k, next_mirror
+        elapsed = pc() - start
+        print(
+            f"[transition] {name:<6} end-to-end speed={steps / elapsed:,.0f} steps/s "
+            f"states={len(agent.registre)}"
+        )
+
+
+def bench_hogwild(steps: int = 2_000_000, episodes: int = 200, seed: int = 0) -> None:
+    """
+    Hogwild (hogwild.py) à 1/4/16/32 workers vs boucle série, même budget de steps:
+    steps/s agrégé, courbe avgLen (8 fenêtres) et évaluation greedy de la table finale.
+    Process puis threads (threads: seulement sur un build free-threaded, sinon
+    train_hogwild retombe sur 1 thread et la ligne est sautée).
+    """
+    def evaluate(agent: Agent) -> float:
+        policy = compile_policy(agent.registre, agent.use_mirror)
+        lengths = _eval_episodes(lambda s, rng: policy.act(s, rng=rng), episodes, seed)
+        return sum(lengths) / len(lengths)
+
+    agent = Agent(seed=seed, **AGENT_ARGS)
+    speed, avg_len = _train_loop(agent, steps, window=steps // 8, seed=seed)
+    print(
+        f"[hogwild] serial     speed={speed:,.0f} steps/s last avgLen={avg_len:.2f} "
+        f"states={len(agent.registre)} greedy={evaluate(agent):.2f}"
+    )
+    print(f"[hogwild] free-threaded={free_threaded()}")
+    for threads in (False, True):
+        mode = "threads" if threads else "workers"
+        for workers in (1, 4, 16, 32):
+            if threads and workers > 1 and not free_threaded():
+                continue
+            start = time.perf_counter()
+            agent, history = train_hogwild(
+                steps,
+                workers,
+                seed,
+                log_every=steps // 8,
+                save=False,
+                verbose=False,
+                threads=threads,
+            )
+            elapsed = time.perf_counter() - start
+            curve = " ".join(f"{avg:.2f}" for _, avg, _ in history)
+            print(
+                f"[hogwild] {mode}={workers:<3} speed={steps / elapsed:,.0f} steps/s "
+                f"curve=[{curve}] states={len(agent.registre)} greedy={evaluate(agent):.2f}"
+            )
+
+
+def bench_actors(steps: int = 2_000_000, episodes: int = 200, seed: int = 0) -> None:
+    """
+    Actor/learner (actor_learner.py): débit par étage selon le nombre d'actors et
+    la cadence de refresh, courbe avgLen et évaluation greedy (comparer à hogwild).
+    """
+    for actors, refresh in ((1, 50_000), (4, 50_000), (4, 10_000), (4, 200_000), (16, 50_000)):
+        al = ActorLearner(actors, seed, refresh_every=refresh)
+        history = al.run(steps, log_every=steps // 8, save=False, verbose=False)
+        policy = compile_policy(al.agent.registre, al.agent.use_mirror)
+        lengths = _eval_episodes(lambda s, rng: policy.act(s, rng=rng), episodes, seed)
+        curve = " ".join(f"{avg:.2f}" for _, avg, _ in history)
+        print(
+            f"[actors] actors={actors} refresh={refresh} curve=[{curve}] "
+            f"states={len(al.agent.registre)} greedy={sum(lengths) / len(lengths):.2f}"
+        )
+        print(al.report())
+
+
+BENCHES = {
+    "train": bench_train,
+    "canon": bench_canon,
+    "batch": bench_batch,
+    "memcap": bench_memcap,
+    "policy": bench_policy,
+    "learners": bench_learners,
+    "replay": bench_replay,
+    "planner": bench_planner,
+    "vecenv": bench_vecenv,
+    "bitboard": bench_bitboard,
+    "spawn": bench_spawn,
+    "snapshot": bench_snapshot,
+    "scale": bench_scale,
+    "rays": bench_rays,
+    "transition": bench_transition,
+    "hogwild": bench_hogwild,
+    "actors": bench_actors,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHES:
+        print(f"Usage: python bench.py [{'|'.join(BENCHES)}] [args...]")
+        sys.exit(1)
+    BENCHES[sys.argv[1]](*(float(a) if "." in a else int(a) for a in sys.argv[2:]))
@@ -0,0 +1,432 @@
+# bitboard_environment.py
+"""
+Environment backed by bitboards: one Python int per layer, bit (y*W + x).
+
+Same rules and interface as Environment (step / reset_game / get_board /
+draw_board, snake deque of (x, y) with the head first), but walls, body,
+green and red are masks: collision and apple checks are `bit & mask`, free
+cells are `~(walls | body | green | red)`, and ray_state() computes the
+Interpreter features with precomputed ray masks (nearest hit = lowest or
+highest set bit) instead of walking cell by cell.
+
+snake_set / green_apples / red_apples / freeTiles stay readable as sets
+(decoded from the masks) for code that inspects them, and occupancy /
+row_bits / col_bits are rebuilt from the masks on each read (copies): the
+grid, free pool and line index of Environment are not kept here. Apple spawns draw
+from the same free cells uniformly but consume `random` differently than
+Environment (rejection sampling), so seeded games diverge after the first spawn.
+Randomness comes from self.rng (seed= / rng= as in Environment).
+"""
+import random
+import struct
+from array import array
+from collections import deque
+from typing import Optional, Set, Tuple
+
+from environement import (
+    BODY,
+    GREEN,
+    RED,
+    TILE_TO_CODE,
+    WALL,
+    Environment,
+    _ints,
+    _pack_rng,
+    _unpack_rng,
+)
+from interpreter import Interpreter
+from tile import Tile
+
+Pos = Tuple[int, int]
+
+# URDL, same as utils.intDir / Interpreter.get_state
+_DIRS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+# snapshot(): W, H, snake length, dx, dy, with_rng
+_SNAP_HEAD = struct.Struct("<6i")
+
+
+def _bits_to_cells(mask: int, width: int) -> Set[Pos]:
+    cells = set()
+    while mask:
+        low = mask & -mask
+        i = low.bit_length() - 1
+        cells.add((i % width, i // width))
+        mask ^= low
+    return cells
+
+
+class BitboardEnvironment(Environment):
+    # deque of (x, y), head first: a plain attribute here (Environment.snake is a view)
+    snake = None
+
+    def __init__(
+        self,
+        height: int = 10,
+        width: int = 10,
+        n_green: int = 2,
+        n_red: int = 1,
+        snake_start_len: int = 3,
+        seed: Optional[int] = None,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        # board size is needed by the precomputed rays before Environment.__init__
+        H, W = self.HEIGHT, self.WIDTH = height, width
+        self.FULL = (1 << (W * H)) - 1
+
+        # rays[d][i]: mask of the cells strictly after i in direction d (up to the border)
+        # border[d][i]: distance from i to the border in direction d
+        self.rays = [[0] * (W * H) for _ in range(4)]
+        self.border = [[0] * (W * H) for _ in range(4)]
+        for d, (dx, dy) in enumerate(_DIRS):
+            for y in range(H):
+                for x in range(W):
+                    mask, k = 0, 1
+                    while self.in_bounds(x + dx * k, y + dy * k):
+                        mask |= 1 << ((y + dy * k) * W + x + dx * k)
+                        k += 1
+                    self.rays[d][y * W + x] = mask
+                    self.border[d][y * W + x] = k
+        # index step along each direction: nearest hit = lowest bit if step > 0
+        self.ray_step = (-W, 1, W, -1)
+        self.bins = [Interpreter._bin_dist(d) for d in range(max(W, H) + 1)]
+
+        self.wall_bits = 0
+        self.body_bits = 0
+        self.green_bits = 0
+        self.red_bits = 0
+        super().__init__(height, width, n_green, n_red, snake_start_len, seed, rng)
+        # état d'Environment jamais mis à jour ici: on le retire (les vues sont plus bas)
+        self._occ = self._free_cells = self._free_index = None
+        self._rows = self._cols = None
+
+    # ----------------------------
+    # Sets view (decoded from the masks)
+    # ----------------------------
+    @property
+    def walls(self) -> Set[Pos]:
+        return _bits_to_cells(self.wall_bits, self.WIDTH)
+
+    @walls.setter
+    def walls(self, cells) -> None:
+        self.wall_bits = self._cells_to_bits(cells)
+
+    @property
+    def snake_set(self) -> Set[Pos]:
+        return _bits_to_cells(self.body_bits, self.WIDTH)
+
+    @snake_set.setter
+    def snake_set(self, cells) -> None:
+        self.body_bits = self._cells_to_bits(cells)
+
+    @property
+    def green_apples(self) -> Set[Pos]:
+        return _bits_to_cells(self.green_bits, self.WIDTH)
+
+    @green_apples.setter
+    def green_apples(self, cells) -> None:
+        self.green_bits = self._cells_to_bits(cells)
+
+    @property
+    def red_apples(self) -> Set[Pos]:
+        return _bits_to_cells(self.red_bits, self.WIDTH)
+
+    @red_apples.setter
+    def red_apples(self, cells) -> None:
+        self.red_bits = self._cells_to_bits(cells)
+
+    @property
+    def snake_length(self) -> int:
+        return len(self.snake)
+
+    def head_index(self) -> int:
+        if not self.snake:
+            return -1
+        hx, hy = self.snake[0]
+        return hy * self.WIDTH + hx
+
+    def _code_masks(self):
+        return (
+            (BODY, self.body_bits),
+            (GREEN, self.green_bits),
+            (RED, self.red_bits),
+            (WALL, self.wall_bits),
+        )
+
+    @property
+    def occupancy(self) -> bytearray:
+        """Environment.occupancy recalculée depuis les masques (copie)."""
+        occ = bytearray(self.WIDTH * self.HEIGHT)
+        for code, mask in self._code_masks():
+            while mask:
+                low = mask & -mask
+                occ[low.bit_length() - 1] = code
+                mask ^= low
+        return occ
+
+    @property
+    def row_bits(self):
+        """Environment.row_bits recalculé depuis les masques (copie)."""
+        W, line = self.WIDTH, (1 << self.WIDTH) - 1
+        rows = [[0] * self.HEIGHT for _ in range(5)]
+        for code, mask in self._code_masks():
+            rows[code] = [mask >> (y * W) & line for y in range(self.HEIGHT)]
+        return rows
+
+    @property
+    def col_bits(self):
+        """Environment.col_bits recalculé depuis les masques (copie)."""
+        W = self.WIDTH
+        cols = [[0] * W for _ in range(5)]
+        for code, mask in self._code_masks():
+            col = cols[code]
+            while mask:
+                low = mask & -mask
+                y, x = divmod(low.bit_length() - 1, W)
+                col[x] |= 1 << y
+                mask ^= low
+        return cols
+
+    @property
+    def free_bits(self) -> int:
+        return ~(self.wall_bits | self.body_bits | self.green_bits | self.red_bits) & self.FULL
+
+    @property
+    def freeTiles(self) -> Set[Pos]:
+        return _bits_to_cells(self.free_bits, self.WIDTH)
+
+    @freeTiles.setter
+    def freeTiles(self, cells) -> None:
+        pass  # derived from the other masks
+
+    def _cells_to_bits(self, cells) -> int:
+        mask = 0
+        for x, y in cells:
+            mask |= 1 << (y * self.WIDTH + x)
+        return mask
+
+    # ----------------------------
+    # Free cells
+    # ----------------------------
+    def _occupy(self, pos: Pos) -> None:
+        pass  # a cell is free iff it is in no mask
+
+    def _free(self, pos: Pos) -> None:
+        pass
+
+    def _rebuild_free_tiles(self) -> None:
+        pass
+
+    def free_count(self) -> int:
+        return self.free_bits.bit_count()
+
+    def _random_free_index(self) -> int:
+        """Uniform free cell index, or -1 if the board is full."""
+        free = self.free_bits
+        n = free.bit_count()
+        if n == 0:
+            return -1
+        if 4 * n >= self.FULL.bit_length():
+            # rejection sampling: at least 1/4 of the board is free
+            size = self.FULL.bit_length()
+            while True:
+                i = self.rng.randrange(size)
+                if free >> i & 1:
+                    return i
+        # crowded board: n-th set bit
+        for _ in range(self.rng.randrange(n)):
+            free &= free - 1
+        return (free & -free).bit_length() - 1
+
+    def _random_free_tile(self):
+        i = self._random_free_index()
+        if i < 0:
+            return None
+        return (i % self.WIDTH, i // self.WIDTH)
+
+    def _spawn_green(self):
+        i = self._random_free_index()
+        if i >= 0:
+            self.green_bits |= 1 << i
+
+    def _spawn_red(self):
+        i = self._random_free_index()
+        if i >= 0:
+            self.red_bits |= 1 << i
+
+    # ----------------------------
+    # Game init
+    # ----------------------------
+    def reset_game(self, seed: Optional[int] = None):
+        if seed is not None:
+            self.rng.seed(seed)
+        self.wall_bits = self._cells_to_bits(self._make_border_walls())
+        self.green_bits = 0
+        self.red_bits = 0
+        self.snake = deque()
+        self.body_bits = 0
+
+        snake = self._place_snake_random()
+        while len(snake) < 2:
+            snake = self._place_snake_random()
+
+        self.snake = snake
+        self.body_bits = self._cells_to_bits(snake)
+
+        for _ in range(self.N_GREEN):
+            self._spawn_green()
+        for _ in range(self.N_RED):
+            self._spawn_red()
+
+        hx, hy = self.snake[0]
+        nx, ny = self.snake[1]
+        self.direction = (hx - nx, hy - ny)
+
+    # ----------------------------
+    # Step (same rules as Environment.step)
+    # ----------------------------
+    def move(self, action: int) -> int:
+        tile = self.step(_DIRS[action])
+        return WALL if tile is False else TILE_TO_CODE[tile]
+
+    def step(self, direction):
+        self.direction = direction
+        if not self.snake:
+            return False
+
+        W = self.WIDTH
+        hx, hy = self.snake[0]
+        dx, dy = direction
+        nx, ny = hx + dx, hy + dy
+        if not (0 <= nx < W and 0 <= ny < self.HEIGHT):
+            return Tile.WALL
+        next_pos = (nx, ny)
+        bit = 1 << (ny * W + nx)
+        if bit & self.wall_bits:
+            return Tile.WALL
+
+        ate_green = bit & self.green_bits
+        ate_red = bit & self.red_bits
+
+        # body: only the tail cell freed by this move is allowed (apples are never on the body)
+        if bit & self.body_bits and next_pos != self.snake[-1]:
+            return Tile.BODY
+
+        self.snake.appendleft(next_pos)
+        self.body_bits |= bit
+        newTile = Tile.EMPTY
+
+        if ate_green:
+            self.green_bits ^= bit
+            self._spawn_green()
+            newTile = Tile.GREEN
+        else:
+            tx, ty = self.snake.pop()
+            if (tx, ty) != next_pos:
+                self.body_bits ^= 1 << (ty * W + tx)
+
+        if ate_red:
+            self.red_bits ^= bit
+            self._spawn_red()
+            newTile = Tile.RED
+
+            if self.snake:
+                tx, ty = self.snake.pop()
+                if (tx, ty) != next_pos:
+                    self.body_bits ^= 1 << (ty * W + tx)
+
+            if len(self.snake) == 0:
+                return Tile.WALL
+
+        return newTile
+
+    # ----------------------------
+    # Snapshot / restore (same contract as Environment.snapshot)
+    # ----------------------------
+    def snapshot(self, with_rng: bool = True) -> bytes:
+        """Masks + snake (head first) + direction (+ self.rng state) as immutable bytes."""
+        W = self.WIDTH
+        nbytes = (W * self.HEIGHT + 7) // 8
+        dx, dy = self.direction
+        parts = [_SNAP_HEAD.pack(W, self.HEIGHT, len(self.snake), dx, dy, with_rng)]
+        for mask in (self.wall_bits, self.body_bits, self.green_bits, self.red_bits):
+            parts.append(mask.to_bytes(nbytes, "little"))
+        parts.append(array("i", [y * W + x for x, y in self.snake]).tobytes())
+        if with_rng:
+            parts.append(_pack_rng(self.rng))
+        return b"".join(parts)
+
+    def restore(self, snap: bytes) -> None:
+        W, H, length, dx, dy, with_rng = _SNAP_HEAD.unpack_from(snap)
+        if (W, H) != (self.WIDTH, self.HEIGHT):
+            raise ValueError(f"snapshot {W}x{H} != board {self.WIDTH}x{self.HEIGHT}")
+        buf = memoryview(snap)
+        nbytes = (W * H + 7) // 8
+        o = _SNAP_HEAD.size
+        masks = []
+        for _ in range(4):
+            masks.append(int.from_bytes(buf[o : o + nbytes], "little"))
+            o += nbytes
+        self.wall_bits, self.body_bits, self.green_bits, self.red_bits = masks
+        self.snake = deque((p % W, p // W) for p in _ints(buf[o : o + 4 * length]))
+        o += 4 * length
+        self.direction = (dx, dy)
+        if with_rng:
+            _unpack_rng(self.rng, buf[o:])
+
+    # ----------------------------
+    # Observation (Interpreter.get_state via masks)
+    # ----------------------------
+    def closest_green_dist(self):
+        """interpreter.closest_green_dist sur le masque green (None si pas de green)."""
+        greens = self.green_bits
+        if not greens or not self.snake:
+            return None
+        W = self.WIDTH
+        hx, hy = self.snake[0]
+        best = None
+        while greens:
+            low = greens & -greens
+            i = low.bit_length() - 1
+            d = abs(i % W - hx) + abs(i // W - hy)
+            if best is None or d < best:
+                best = d
+            greens ^= low
+        return best
+
+    def ray_state(self):
+        """Interpreter.get_state computed on the masks (URDL x wall/green/red/body bins)."""
+        if not self.snake:
+            return ((4, 0, 0, 0),) * 4
+
+        hx, hy = self.snake[0]
+        i = hy * self.WIDTH + hx
+        bins = self.bins
+        state = []
+        for d in range(4):
+            ray = self.rays[d][i]
+            step = self.ray_step[d]
+
+            wall = self.border[d][i]
+            hit = ray & self.wall_bits
+            if hit:
+                # inner walls: only the cells before the first one are visible
+                wall = self._nearest(hit, i, step)
+                j = i + step * wall
+                ray &= (1 << j) - 1 if step > 0 else ~((1 << (j + 1)) - 1)
+
+            feats = [bins[wall]]
+            for mask in (self.green_bits, self.red_bits, self.body_bits):
+                hit = ray & mask
+                feats.append(bins[self._nearest(hit, i, step)] if hit else 0)
+            state.append(tuple(feats))
+        return tuple(state)
+
+    @staticmethod
+    def _nearest(hit: int, i: int, step: int) -> int:
+        """Distance from i to the nearest set bit of `hit` along `step`."""
+        if step > 0:
+            j = (hit & -hit).bit_length() - 1
+        else:
+            j = hit.bit_length() - 1
+        return (j - i) // step
@@ -0,0 +1,273 @@
+# checkpoint.py
+"""
+Binary Q-table checkpoints (.qbin), readable through np.memmap without copy.
+
+Layout (little-endian):
+  [0:128)  header: magic, version, n, hyperparams, step_count, use_mirror, delta
+  [128:..) keys: int64[n], sorted ascending
+  [..:..)  q:    float32[n, 4]
+
+A delta file has the same layout but only holds the entries that changed since
+the previous checkpoint; compact() folds a base file and its deltas back into
+one full model. A delta row of NaN is a tombstone: the key was evicted from a
+bounded table (QTable max_entries) and is dropped from the compacted model.
+
+Training state (dump_state / write_state / read_state, train.py --resume) is a separate
+file: STATE_MAGIC + pickle of the live objects (Agent with its Q-table, RNGs
+and buffers, Interpreter + Environment, loop counters). Only meant to resume
+the same code, not as a model format.
+
+Usage:
+  python checkpoint.py convert train/10000000-v6.pkl [more.pkl ...]
+  python checkpoint.py compact out.qbin base.qbin delta1.qbin [delta2.qbin ...]
+"""
+import os
+import pickle
+import queue
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+MAGIC = b"L2SQ"
+VERSION = 1
+EXT = "qbin"
+
+# magic, version, n, alpha, gamma, eps_start, eps_end, eps_decay_steps, step_count,
+# use_mirror, delta (delta was added later in the padding: old files read as full)
+_HEADER = struct.Struct("<4sIQddddQQ??")
+HEADER_SIZE = 128
+
+STATE_MAGIC = b"L2SS"
+STATE_VERSION = 1
+
+META_FIELDS = (
+    "alpha",
+    "gamma",
+    "eps_start",
+    "eps_end",
+    "eps_decay_steps",
+    "step_count",
+    "use_mirror",
+    "delta",
+)
+
+
+def is_model_file(path: str | Path) -> bool:
+    with Path(path).open("rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_model(
+    path: str | Path, keys: np.ndarray, q: np.ndarray, meta: dict, delta: bool = False
+) -> None:
+    """Écrit (keys, q) triés + meta. Écriture atomique (tmp puis rename)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    order = np.argsort(keys, kind="stable")
+    keys = np.ascontiguousarray(keys[order], dtype="<i8")
+    q = np.ascontiguousarray(q[order], dtype="<f4")
+
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        len(keys),
+        meta["alpha"],
+        meta["gamma"],
+        meta["eps_start"],
+        meta["eps_end"],
+        meta["eps_decay_steps"],
+        meta["step_count"],
+        meta["use_mirror"],
+        delta,
+    )
+
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        keys.tofile(f)
+        q.tofile(f)
+    os.replace(tmp, path)
+
+
+def read_header(path: str | Path) -> Tuple[int, dict]:
+    with Path(path).open("rb") as f:
+        raw = f.read(HEADER_SIZE)
+    magic, version, n, *values = _HEADER.unpack_from(raw)
+    if magic != MAGIC:
+        raise ValueError(f"Pas un checkpoint {EXT}: {path}")
+    if version != VERSION:
+        raise ValueError(f"Version {version} non supportée: {path}")
+    return n, dict(zip(META_FIELDS, values))
+
+
+def read_model(path: str | Path, mmap: bool = True) -> Tuple[dict, np.ndarray, np.ndarray]:
+    """
+    Returns (meta, keys, q).
+    mmap=True: read-only np.memmap views (zero-copy, shared page cache);
+    mmap=False: arrays read into memory.
+    """
+    n, meta = read_header(path)
+    if mmap:
+        if n == 0:
+            return meta, np.empty(0, "<i8"), np.empty((0, 4), "<f4")
+        keys = np.memmap(path, dtype="<i8", mode="r", offset=HEADER_SIZE, shape=(n,))
+        q = np.memmap(
+            path, dtype="<f4", mode="r", offset=HEADER_SIZE + 8 * n, shape=(n, 4)
+        )
+        return meta, keys, q
+
+    with Path(path).open("rb") as f:
+        f.seek(HEADER_SIZE)
+        keys = np.fromfile(f, dtype="<i8", count=n)
+        q = np.fromfile(f, dtype="<f4", count=4 * n).reshape(n, 4)
+    return meta, keys, q
+
+
+def dump_state(state: dict) -> bytes:
+    """État complet d'entraînement sérialisé (copie figée, à écrire par write_state_bytes)."""
+    return (
+        STATE_MAGIC
+        + struct.pack("<I", STATE_VERSION)
+        + pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    )
+
+
+def write_state_bytes(path: str | Path, data: bytes) -> None:
+    """Écrit un état de dump_state(). Écriture atomique (tmp puis rename)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def write_state(path: str | Path, state: dict) -> None:
+    """État complet d'entraînement (pickle). Écriture atomique (tmp puis rename)."""
+    write_state_bytes(path, dump_state(state))
+
+
+def read_state(path: str | Path) -> dict:
+    with Path(path).open("rb") as f:
+        head = f.read(len(STATE_MAGIC) + 4)
+        if head[: len(STATE_MAGIC)] != STATE_MAGIC:
+            raise ValueError(f"Pas un état d'entraînement: {path}")
+        (version,) = struct.unpack("<I", head[len(STATE_MAGIC) :])
+        if version != STATE_VERSION:
+            raise ValueError(f"Version d'état {version} non supportée: {path}")
+        return pickle.load(f)
+
+
+def convert_pickle(src: str | Path, dst: str | Path | None = None) -> Path:
+    """Legacy pickle checkpoint (Agent.save .pkl) -> .qbin."""
+    src = Path(src)
+    dst = Path(dst) if dst is not None else src.with_suffix(f".{EXT}")
+    with src.open("rb") as f:
+        payload = pickle.load(f)
+
+    registre = payload["registre"]
+    keys = np.fromiter(registre.keys(), dtype=np.int64, count=len(registre))
+    q = np.array([list(v) for v in registre.values()], dtype=np.float32)
+    meta = {
+        "alpha": payload.get("alpha", 0.2),
+        "gamma": payload.get("gamma", 0.9),
+        "eps_start": payload.get("eps_start", 0.2),
+        "eps_end": payload.get("eps_end", 0.0),
+        "eps_decay_steps": payload.get("eps_decay_steps", 200_000),
+        "step_count": payload.get("step_count", 0),
+        "use_mirror": payload.get("use_mirror", True),
+    }
+    write_model(dst, keys, q.reshape(-1, 4), meta)
+    return dst
+
+
+def compact(dst: str | Path, base: str | Path, deltas: list) -> Path:
+    """base (full) + deltas (in save order) -> one full model at dst."""
+    meta, keys, q = read_model(base, mmap=False)
+    if meta["delta"]:
+        raise ValueError(f"La base doit être un checkpoint complet: {base}")
+
+    all_keys = [keys]
+    all_q = [q]
+    for d in deltas:
+        meta, keys, q = read_model(d, mmap=False)
+        if not meta["delta"]:
+            raise ValueError(f"Pas un delta: {d}")
+        all_keys.append(keys)
+        all_q.append(q)
+
+    keys = np.concatenate(all_keys)
+    q = np.concatenate(all_q)
+    # last write wins: first occurrence in reversed order
+    _, first = np.unique(keys[::-1], return_index=True)
+    pick = len(keys) - 1 - first
+    pick = pick[~np.isnan(q[pick]).any(axis=1)]  # tombstones (clés évincées)
+    write_model(dst, keys[pick], q[pick], meta)
+    return Path(dst)
+
+
+class Checkpointer:
+    """
+    Background checkpoint writer: the training loop only takes a snapshot
+    (Agent.snapshot) and submits it; a thread does the sort + write.
+    Training states too (submit_state, bytes of dump_state).
+    At most `max_pending` snapshots wait in memory (submit blocks beyond).
+    """
+
+    def __init__(self, max_pending: int = 2):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.error: Exception | None = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self, path: str | Path, keys: np.ndarray, q: np.ndarray, meta: dict, delta: bool = False
+    ) -> None:
+        self._put(write_model, (path, keys, q, meta, delta))
+
+    def submit_state(self, path: str | Path, data: bytes) -> None:
+        """Training state already serialized by dump_state (consistent copy)."""
+        self._put(write_state_bytes, (path, data))
+
+    def _put(self, write, args: tuple) -> None:
+        if self.error is not None:
+            raise self.error
+        self._queue.put((write, args))
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            write, args = job
+            try:
+                write(*args)
+            except Exception as e:  # reported on next submit/close
+                self.error = e
+
+    def close(self) -> None:
+        """Waits for pending writes."""
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "convert":
+        for src in sys.argv[2:]:
+            dst = convert_pickle(src)
+            n, _ = read_header(dst)
+            print(f"[CONVERT] {src} -> {dst} (states={n})")
+    elif len(sys.argv) >= 4 and sys.argv[1] == "compact":
+        dst = compact(sys.argv[2], sys.argv[3], sys.argv[4:])
+        n, meta = read_header(dst)
+        print(f"[COMPACT] {dst} (states={n} step={meta['step_count']})")
+    else:
+        print("Usage: python checkpoint.py convert train/10000000-v6.pkl [...]")
+        print("       python checkpoint.py compact out.qbin base.qbin delta.qbin [...]")
+        sys.exit(1)
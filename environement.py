@@ -1,61 +1,386 @@
 import random
+import struct
 from tile import Tile
 import pygame
+from array import array
 from collections import deque
-from typing import List, Optional, Tuple
+from itertools import accumulate, compress
+from operator import sub
+from typing import List, Optional, Set, Tuple
 
 Pos = Tuple[int, int]
 
+# Codes d'occupation (bytearray, une case = un octet) et résultats de move()
+EMPTY, BODY, GREEN, RED, WALL = 0, 1, 2, 3, 4
+CODE_TO_TILE = (Tile.EMPTY, Tile.BODY, Tile.GREEN, Tile.RED, Tile.WALL)
+TILE_TO_CODE = {tile: code for code, tile in enumerate(CODE_TO_TILE)}
+
+# bytearray.translate: 1 pour une case occupée, 0 pour EMPTY (et l'inverse)
+_IS_TAKEN = bytes([0] + [1] * 255)
+_IS_FREE = bytes([1] + [0] * 255)
+
+# action int (utils.intDir) -> (dx, dy)
+ACTION_DX = (0, 1, 0, -1)
+ACTION_DY = (-1, 0, 1, 0)
+
+# snapshot(): en-tête W, H, len, n_free, n_greens, n_reds, n_walls, dx, dy, avec RNG
+_SNAP_HEAD = struct.Struct("<10i")
+# état du RNG (random.getstate()): version, gauss_next présent, gauss_next, puis 625 uint32
+_RNG_HEAD = struct.Struct("<i?d")
+
+
+def _pack_rng(rng) -> bytes:
+    version, internal, gauss = rng.getstate()
+    return _RNG_HEAD.pack(version, gauss is not None, gauss or 0.0) + array("I", internal).tobytes()
+
+
+def _unpack_rng(rng, buf) -> None:
+    version, has_gauss, gauss = _RNG_HEAD.unpack_from(buf)
+    internal = array("I")
+    internal.frombytes(buf[_RNG_HEAD.size:])
+    rng.setstate((version, tuple(internal), gauss if has_gauss else None))
+
+
+def _ints(buf) -> List[int]:
+    a = array("i")
+    a.frombytes(buf)
+    return a.tolist()
+
+
+def _longest_line(height: int, width: int, walls) -> int:
+    """Plus longue suite de cases sans mur sur une ligne ou une colonne."""
+    best = 0
+    lines = [[(x, y) for x in range(width)] for y in range(height)]
+    lines += [[(x, y) for y in range(height)] for x in range(width)]
+    for line in lines:
+        run = 0
+        for cell in line:
+            run = 0 if cell in walls else run + 1
+            best = max(best, run)
+    return best
+
+
+def check_board(
+    height: int, width: int, n_green: int, n_red: int, snake_start_len: int, walls=()
+) -> None:
+    """
+    ValueError si le plateau ne permet pas de lancer une partie (sinon reset_game
+    boucle sans fin). Le serpent part en ligne droite entre les murs (walls:
+    cases (x, y)), avec au moins un segment de corps (direction initiale):
+    snake_start_len=1 n'est pas supporté.
+    """
+    if height < 1 or width < 1:
+        raise ValueError(f"plateau {width}x{height}: dimensions >= 1")
+    walls = set(walls)
+    longest = _longest_line(height, width, walls) if walls else max(height, width)
+    if not 2 <= snake_start_len <= longest:
+        raise ValueError(
+            f"snake_start_len={snake_start_len}: entre 2 et {longest} "
+            f"(plus longue ligne sans mur)"
+        )
+    if n_green < 0 or n_red < 0:
+        raise ValueError(f"nombres de pommes >= 0 (green={n_green}, red={n_red})")
+    free = height * width - len(walls)
+    if n_green + n_red + snake_start_len > free:
+        raise ValueError(
+            f"green={n_green} + red={n_red} + snake_start_len={snake_start_len} "
+            f"> {free} cases libres"
+        )
+
 
 class Environment:
-    HEIGHT, WIDTH = 10, 10
     LINE = 2
     SQUARE = 50
 
-    N_GREEN = 2
-    N_RED = 1
-
-    SNAKE_START_LEN = 3
-
-    # set de toutes les tileules possibles (constant)
-
-    def __init__(self) -> None:
+    # Config par instance (HEIGHT, WIDTH, N_GREEN, N_RED, SNAKE_START_LEN), cf. __init__.
+    # Etat compact, sans dict par instance. Positions = entiers p = y*W + x.
+    #   _occ        bytearray[W*H]: EMPTY/BODY/GREEN/RED/WALL
+    #   _body       array d'int circulaire, tête en _body[_head], queue en _body[(_head+_len-1) % taille]
+    #   _greens/_reds  positions des pommes
+    #   _free_cells/_free_index/_n_free  pool des cases libres (swap-remove)
+    #   _rows/_cols  index par code (GREEN/RED/BODY/WALL): _rows[code][y] = bits x des
+    #                cases de ce code sur la ligne y, _cols[code][x] = bits y (rayons en O(1))
+    # rng: flux aléatoire propre à l'instance (random.Random ou équivalent):
+    # deux parties côte à côte (ou dans des workers) ne se perturbent pas.
+    __slots__ = (
+        "HEIGHT",
+        "WIDTH",
+        "N_GREEN",
+        "N_RED",
+        "SNAKE_START_LEN",
+        "ALL_TILES",
+        "_heads",
+        "_heads_walls",
+        "_pool_cells",
+        "_pool_index",
+        "_pool_walls",
+        "rng",
+        "direction",
+        "_occ",
+        "_body",
+        "_head",
+        "_len",
+        "_greens",
+        "_reds",
+        "_walls",
+        "_free_cells",
+        "_free_index",
+        "_n_free",
+        "_rows",
+        "_cols",
+    )
+
+    def __init__(
+        self,
+        height: int = 10,
+        width: int = 10,
+        n_green: int = 2,
+        n_red: int = 1,
+        snake_start_len: int = 3,
+        seed: Optional[int] = None,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        """
+        seed: graine du flux de l'instance. rng: flux fourni (prioritaire), par ex.
+        random.Random partagé, ou le module random lui-même (ancien mode global).
+        """
+        self.HEIGHT, self.WIDTH = height, width
+        check_board(height, width, n_green, n_red, snake_start_len, self._make_border_walls())
+        self.N_GREEN, self.N_RED = n_green, n_red
+        self.SNAKE_START_LEN = snake_start_len
+        self.rng = rng if rng is not None else random.Random()
+        if seed is not None:
+            self.rng.seed(seed)
+        n = self.HEIGHT * self.WIDTH
         self.ALL_TILES = {
             (x, y) for y in range(self.HEIGHT) for x in range(self.WIDTH)
         }  # state
-        self.snake = deque()
-        self.snake_set = set()
-        self.walls = set()
-        self.green_apples = set()
-        self.red_apples = set()
         self.direction = (1, 0)
+        # cases possibles pour la tête (hors murs), recalculées quand les murs changent
+        self._heads: Tuple[Pos, ...] = ()
+        self._heads_walls: Optional[Set[Pos]] = None
+        # pool des cases libres du plateau sans serpent ni pommes (idem, par murs)
+        self._pool_cells = array("i")
+        self._pool_index = array("i")
+        self._pool_walls: Optional[List[int]] = None
+
+        self._occ = bytearray(n)
+        # +1: la tête entre avant que la queue sorte (serpent plein + move sur la queue)
+        self._body = array("i", bytes(4 * (n + 1)))
+        self._head = 0
+        self._len = 0
+        self._greens: List[int] = []
+        self._reds: List[int] = []
+        self._walls: List[int] = []
 
         # free tiles = tout ce qui n'est pas occupé (mis à jour partout)
-        self.freeTiles = set(self.ALL_TILES)
+        # pool indexé: tableau dense + pos -> index (swap-remove), tout en O(1)
+        self._free_cells = array("i", bytes(4 * n))
+        self._free_index = array("i", [-1]) * n
+        self._n_free = 0
+
+        # index ligne/colonne (entrée EMPTY inutilisée)
+        self._rows = [[0] * height for _ in range(5)]
+        self._cols = [[0] * width for _ in range(5)]
 
         self.reset_game()
 
+    # ----------------------------
+    # Vues (copies) dans l'ancien format (x, y): affichage, outils, tests
+    # ----------------------------
+    def _pos(self, p: int) -> Pos:
+        return (p % self.WIDTH, p // self.WIDTH)
+
+    @property
+    def snake(self) -> deque:
+        """Serpent tête en premier, en (x, y)."""
+        size = len(self._body)
+        return deque(
+            self._pos(self._body[(self._head + k) % size]) for k in range(self._len)
+        )
+
+    @property
+    def snake_set(self) -> Set[Pos]:
+        # depuis la grille: après une mort par red à longueur 0, la tête reste BODY (comme avant)
+        return {self._pos(p) for p, code in enumerate(self._occ) if code == BODY}
+
+    @property
+    def green_apples(self) -> Set[Pos]:
+        return {self._pos(p) for p in self._greens}
+
+    @property
+    def red_apples(self) -> Set[Pos]:
+        return {self._pos(p) for p in self._reds}
+
+    @property
+    def walls(self) -> Set[Pos]:
+        return {self._pos(p) for p in self._walls}
+
+    @property
+    def freeTiles(self) -> Set[Pos]:
+        """Vue (copie) des cases libres."""
+        return {self._pos(self._free_cells[i]) for i in range(self._n_free)}
+
+    @property
+    def snake_length(self) -> int:
+        return self._len
+
+    @property
+    def occupancy(self) -> bytearray:
+        """Grille y*W + x -> EMPTY/BODY/GREEN/RED/WALL (lecture seule: ne pas modifier)."""
+        return self._occ
+
+    @property
+    def row_bits(self) -> List[List[int]]:
+        """row_bits[code][y]: bit x levé si la case (x, y) est code (GREEN/RED/BODY/WALL). Lecture seule."""
+        return self._rows
+
+    @property
+    def col_bits(self) -> List[List[int]]:
+        """col_bits[code][x]: bit y levé si la case (x, y) est code. Lecture seule."""
+        return self._cols
+
+    def head_index(self) -> int:
+        """Position de la tête (y*W + x), -1 si pas de serpent."""
+        return self._body[self._head] if self._len else -1
+
+    def closest_green_dist(self) -> Optional[int]:
+        if not self._greens or not self._len:
+            return None
+        W = self.WIDTH
+        h = self._body[self._head]
+        hx, hy = h % W, h // W
+        return min(abs(hx - g % W) + abs(hy - g // W) for g in self._greens)
+
     # ----------------------------
     # Low-level helpers (évite forbidden partout)
     # ----------------------------
-    def _occupy(self, pos: tuple[int, int]) -> None:
-        """Marque une case comme occupée (donc plus libre)."""
-        self.freeTiles.discard(pos)
+    def _occupy(self, p: int) -> None:
+        """Marque une case comme occupée (donc plus libre). O(1): swap avec la dernière."""
+        i = self._free_index[p]
+        if i < 0:
+            return
+        self._n_free -= 1
+        last = self._free_cells[self._n_free]
+        self._free_cells[i] = last
+        self._free_index[last] = i
+        self._free_index[p] = -1
+
+    def _index_add(self, p: int, code: int) -> None:
+        y, x = divmod(p, self.WIDTH)
+        self._rows[code][y] |= 1 << x
+        self._cols[code][x] |= 1 << y
+
+    def _rebuild_index(self) -> None:
+        """Index ligne/colonne depuis murs, pommes et serpent (O(objets), pas O(W*H))."""
+        for lines in self._rows + self._cols:
+            lines[:] = [0] * len(lines)
+        for p in self._walls:
+            self._index_add(p, WALL)
+        for p in self._greens:
+            self._index_add(p, GREEN)
+        for p in self._reds:
+            self._index_add(p, RED)
+        size = len(self._body)
+        for k in range(self._len):
+            self._index_add(self._body[(self._head + k) % size], BODY)
+
+    def _free(self, p: int) -> None:
+        """Marque une case comme libre. O(1)."""
+        if self._free_index[p] >= 0:
+            return
+        self._free_index[p] = self._n_free
+        self._free_cells[self._n_free] = p
+        self._n_free += 1
 
-    def _free(self, pos: tuple[int, int]) -> None:
-        """Marque une case comme libre."""
-        self.freeTiles.add(pos)
+    def _random_free_cell(self) -> int:
+        """Pioche une case libre au hasard (-1 si aucune). O(1), sans copie."""
+        if not self._n_free:
+            return -1
+        # randrange(n) consomme le RNG comme random.choice sur n éléments
+        return self._free_cells[self.rng.randrange(self._n_free)]
 
     def _random_free_tile(self):
         """Pioche une case libre au hasard (ou None si aucune)."""
-        if not self.freeTiles:
-            return None
-        # random.choice sur tuple/list
-        return random.choice(tuple(self.freeTiles))
+        p = self._random_free_cell()
+        return None if p < 0 else self._pos(p)
+
+    def free_count(self) -> int:
+        return self._n_free
 
     def in_bounds(self, x, y):
         return 0 <= x < self.WIDTH and 0 <= y < self.HEIGHT
 
+    # ----------------------------
+    # Snapshot / restore (rollouts, recherche, replay seeking)
+    # ----------------------------
+    def snapshot(self, with_rng: bool = True) -> bytes:
+        """
+        Etat complet en bytes immuables: grille, serpent (tête -> queue), pommes,
+        murs, pool des cases libres (son ordre décide des spawns) et direction.
+        with_rng: ajoute l'état de self.rng => restore() puis les mêmes
+        actions rejouent exactement la même suite (mêmes spawns).
+        """
+        body = self._body
+        size = len(body)
+        end = self._head + self._len
+        if end <= size:
+            snake = body[self._head:end].tobytes()
+        else:
+            snake = body[self._head:].tobytes() + body[: end - size].tobytes()
+        dx, dy = self.direction
+        parts = [
+            _SNAP_HEAD.pack(
+                self.WIDTH, self.HEIGHT, self._len, self._n_free,
+                len(self._greens), len(self._reds), len(self._walls),
+                dx, dy, with_rng,
+            ),
+            bytes(self._occ),
+            snake,
+            array("i", self._greens).tobytes(),
+            array("i", self._reds).tobytes(),
+            array("i", self._walls).tobytes(),
+            self._free_cells[: self._n_free].tobytes(),
+            self._free_index.tobytes(),
+        ]
+        if with_rng:
+            parts.append(_pack_rng(self.rng))
+        return b"".join(parts)
+
+    def restore(self, snap: bytes) -> None:
+        """Recharge un état pris par snapshot() (même taille de plateau). Copies mémoire, pas de recalcul."""
+        W, H, length, n_free, n_greens, n_reds, n_walls, dx, dy, with_rng = (
+            _SNAP_HEAD.unpack_from(snap)
+        )
+        if (W, H) != (self.WIDTH, self.HEIGHT):
+            raise ValueError(f"snapshot {W}x{H} != plateau {self.WIDTH}x{self.HEIGHT}")
+        buf = memoryview(snap)
+        n = W * H
+        o = _SNAP_HEAD.size
+
+        self._occ[:] = buf[o : o + n]
+        o += n
+        # serpent linéarisé: tête en _body[0]
+        memoryview(self._body).cast("B")[: 4 * length] = buf[o : o + 4 * length]
+        o += 4 * length
+        self._head = 0
+        self._len = length
+        self._greens[:] = _ints(buf[o : o + 4 * n_greens])
+        o += 4 * n_greens
+        self._reds[:] = _ints(buf[o : o + 4 * n_reds])
+        o += 4 * n_reds
+        self._walls = _ints(buf[o : o + 4 * n_walls])
+        o += 4 * n_walls
+        memoryview(self._free_cells).cast("B")[: 4 * n_free] = buf[o : o + 4 * n_free]
+        o += 4 * n_free
+        self._n_free = n_free
+        memoryview(self._free_index).cast("B")[:] = buf[o : o + 4 * n]
+        o += 4 * n
+        self.direction = (dx, dy)
+        self._rebuild_index()
+        if with_rng:
+            _unpack_rng(self.rng, buf[o:])
+
     def get_board(self) -> List[List[Tile]]:
         """
         Renvoie une grille HEIGHT x WIDTH de Tile.
@@ -99,20 +424,25 @@ class Environment:
         screen.fill((0, 0, 0))
 
         head = self.snake[0] if self.snake else None
+        # vues calculées une fois par frame (pas par case)
+        walls = self.walls
+        green_apples = self.green_apples
+        red_apples = self.red_apples
+        snake_set = self.snake_set
 
         for y in range(self.HEIGHT):
             for x in range(self.WIDTH):
                 tile = (x, y)
 
-                if tile in self.walls:
+                if tile in walls:
                     color = Tile.WALL.color
-                elif tile in self.green_apples:
+                elif tile in green_apples:
                     color = Tile.GREEN.color
-                elif tile in self.red_apples:
+                elif tile in red_apples:
                     color = Tile.RED.color
                 elif tile == head:
                     color = Tile.HEAD.color
-                elif tile in self.snake_set:
+                elif tile in snake_set:
                     color = Tile.BODY.color
                 else:
                     color = Tile.EMPTY.color
@@ -136,31 +466,61 @@ class Environment:
         return walls
 
     def _rebuild_free_tiles(self):
-        """Recalcule freeTiles à partir des sets (utile au reset)."""
-        occupied = self.walls | self.snake_set | self.green_apples | self.red_apples
-        self.freeTiles = set(self.ALL_TILES - occupied)
+        """
+        Recalcule le pool de cases libres à partir de la grille (utile au reset):
+        cases EMPTY en ordre croissant, comme des _free() successifs, mais sans
+        boucle Python par case (O(W*H) en C, O(cases occupées) en Python).
+        """
+        occ = self._occ
+        n = len(occ)
+        taken = occ.translate(_IS_TAKEN)
+        cells = array("i", compress(range(n), occ.translate(_IS_FREE)))
+        self._free_cells[: len(cells)] = cells
+        self._n_free = len(cells)
+        # index de la case libre p = p - nombre de cases occupées avant p
+        index = array("i", map(sub, range(n), accumulate(taken)))
+        for p in compress(range(n), taken):
+            index[p] = -1
+        self._free_index[:] = index
+
+    def _reset_free_tiles(self):
+        """Pool du plateau sans serpent ni pommes: calculé une fois par jeu de murs, puis copié."""
+        if self._pool_walls != self._walls:
+            self._rebuild_free_tiles()
+            self._pool_cells = self._free_cells[: self._n_free]
+            self._pool_index = array("i", self._free_index)
+            self._pool_walls = list(self._walls)
+            return
+        n = len(self._pool_cells)
+        self._free_cells[:n] = self._pool_cells
+        self._free_index[:] = self._pool_index
+        self._n_free = n
 
     def _place_snake_random(self):
         """Place un snake de longueur SNAKE_START_LEN en ligne droite (sans utiliser forbidden)."""
         snake = deque()
-
-        # pour placer la tête, on évite seulement les murs
-        free_no_walls = self.ALL_TILES - self.walls
-        if not free_no_walls:
+        walls = self.walls
+
+        # pour placer la tête, on évite seulement les murs. Les murs sont fixes:
+        # tuple (O(W*H)) calculé une fois, même ordre => même tirage de rng.choice
+        if walls != self._heads_walls:
+            self._heads = tuple(self.ALL_TILES - walls)
+            self._heads_walls = walls
+        if not self._heads:
             return snake
 
-        head = random.choice(tuple(free_no_walls))
+        head = self.rng.choice(self._heads)
         hx, hy = head
 
         directions = [(1, 0), (-1, 0), (0, 1), (0, -1)]
-        random.shuffle(directions)
+        self.rng.shuffle(directions)
 
         for dx, dy in directions:
             candidate = [(hx, hy)]
             ok = True
             for k in range(1, self.SNAKE_START_LEN):
                 xk, yk = hx - dx * k, hy - dy * k
-                if not self.in_bounds(xk, yk) or (xk, yk) in self.walls:
+                if not self.in_bounds(xk, yk) or (xk, yk) in walls:
                     ok = False
                     break
                 candidate.append((xk, yk))
@@ -177,42 +537,55 @@ class Environment:
         snake.append((hx, hy))
         return snake
 
-    def _spawn_green(self):
-        tile = self._random_free_tile()
-        if tile is None:
+    def _spawn(self, apples: List[int], code: int) -> None:
+        p = self._random_free_cell()
+        if p < 0:
             return
-        self.green_apples.add(tile)
-        self._occupy(tile)
+        apples.append(p)
+        self._occ[p] = code
+        self._occupy(p)
+        self._index_add(p, code)
+
+    def _spawn_green(self):
+        self._spawn(self._greens, GREEN)
 
     def _spawn_red(self):
-        tile = self._random_free_tile()
-        if tile is None:
-            return
-        self.red_apples.add(tile)
-        self._occupy(tile)
+        self._spawn(self._reds, RED)
 
-    def reset_game(self):
+    def reset_game(self, seed: Optional[int] = None):
+        """Nouvelle partie; seed: re-graine self.rng (graine par épisode, cf. utils.episode_seed)."""
+        if seed is not None:
+            self.rng.seed(seed)
         # reset structures
-        self.walls = set(self._make_border_walls())
-        self.green_apples = set()
-        self.red_apples = set()
-        self.snake = deque()
-        self.snake_set = set()
-
-        # freeTiles = tout, puis on occupe murs
-        self.freeTiles = set(self.ALL_TILES)
-        for w in self.walls:
-            self._occupy(w)
+        W = self.WIDTH
+        occ = self._occ
+        occ[:] = bytes(len(occ))
+        for lines in self._rows + self._cols:
+            lines[:] = [0] * len(lines)
+        self._walls = [y * W + x for x, y in self._make_border_walls() if self.in_bounds(x, y)]
+        for p in self._walls:
+            occ[p] = WALL
+            self._index_add(p, WALL)
+        self._greens.clear()
+        self._reds.clear()
+        self._head = 0
+        self._len = 0
+
+        # freeTiles = tout sauf les murs
+        self._reset_free_tiles()
 
         # place snake
         snake = self._place_snake_random()
         while len(snake) < 2:
             snake = self._place_snake_random()
 
-        self.snake = snake
-        self.snake_set = set(self.snake)
-        for p in self.snake_set:
+        for k, (x, y) in enumerate(snake):
+            p = y * W + x
+            self._body[k] = p
+            occ[p] = BODY
             self._occupy(p)
+            self._index_add(p, BODY)
+        self._len = len(snake)
 
         # spawn initial apples
         for _ in range(self.N_GREEN):
@@ -221,93 +594,155 @@ class Environment:
             self._spawn_red()
 
         # direction initiale cohérente avec le corps
-        hx, hy = self.snake[0]
-        nx, ny = self.snake[1]
+        hx, hy = snake[0]
+        nx, ny = snake[1]
         init_dir = (hx - nx, hy - ny)
         if init_dir in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
             self.direction = init_dir
         else:
-            self.direction = random.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
+            self.direction = self.rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
 
     # ----------------------------
-    # Step (deque + snake_set + freeTiles)
+    # Step (positions int + grille d'occupation, aucune allocation)
     # ----------------------------
 
     def step(self, direction):
         """
-        Retourne True si vivant, False si mort (collision).
+        Retourne la Tile atteinte (WALL/BODY = mort), False si pas de serpent.
         Règles:
         - green: grandit (+1)
         - red: rétrécit (-1 en plus du mouvement)
         """
         self.direction = direction
-        if not self.snake:
+        if not self._len:
             return False
+        return CODE_TO_TILE[self._move(direction[0], direction[1])]
+
+    def move(self, action: int) -> int:
+        """step() avec une action int (0..3, utils.intDir); renvoie le code EMPTY/GREEN/RED/WALL/BODY."""
+        if not self._len:
+            return WALL
+        return self._move(ACTION_DX[action], ACTION_DY[action])
+
+    def _move(self, dx: int, dy: int) -> int:
+        W = self.WIDTH
+        body = self._body
+        size = len(body)
+        head = self._head
 
-        hx, hy = self.snake[0]
-        dx, dy = direction
-        nx, ny = hx + dx, hy + dy
-        next_pos = (nx, ny)
+        h = body[head]
+        nx = h % W + dx
+        ny = h // W + dy
 
         # collision bounds / walls
-        if not self.in_bounds(nx, ny) or next_pos in self.walls:
-            return Tile.WALL
-
-        ate_green = next_pos in self.green_apples
-        ate_red = next_pos in self.red_apples
-
-        # Combien de segments de queue vont disparaître CE tour ?
-        # - si green: 0 (on grandit, pas de pop)
-        # - sinon: 1 (mouvement normal)
-        # - si red en plus (et pas green): +1 (rétrécit)
-        remove_count = 0 if ate_green else 1
-        if ate_red and not ate_green:
-            remove_count += 1
-
-        # Positions "autorisées" dans le corps : les dernières cases qui vont être supprimées
-        removable = set()
-        if remove_count > 0:
-            k = min(remove_count, len(self.snake))
-            removable = set(list(self.snake)[-k:])
-
-        # collision snake : OK si on va sur une case qui est en train d'être libérée
-        if next_pos in self.snake_set and next_pos not in removable:
-            return Tile.BODY
+        if not (0 <= nx < W and 0 <= ny < self.HEIGHT):
+            return WALL
+        p = ny * W + nx
+        occ = self._occ
+        code = occ[p]
+        if code == WALL:
+            return WALL
+
+        # collision snake : OK seulement sur la queue qui est libérée ce tour
+        # (green: pas de pop, mais une pomme n'est jamais sur le corps)
+        if code == BODY and p != body[(head + self._len - 1) % size]:
+            return BODY
 
         # --- move head in ---
-        self.snake.appendleft(next_pos)
-        self.snake_set.add(next_pos)
-        self._occupy(next_pos)
-        newTile = Tile.EMPTY
+        head = (head - 1) % size
+        body[head] = p
+        self._head = head
+        self._len += 1
+        occ[p] = BODY
+        self._occupy(p)
+        bx, by = 1 << nx, 1 << ny
+        rows, cols = self._rows, self._cols
+        rows[BODY][ny] |= bx
+        cols[BODY][nx] |= by
 
         # --- handle green / normal move ---
-        if ate_green:
-            self.green_apples.remove(next_pos)
+        if code == GREEN:
+            rows[GREEN][ny] &= ~bx
+            cols[GREEN][nx] &= ~by
+            self._greens.remove(p)
             self._spawn_green()
-            newTile = Tile.GREEN
-            # pas de pop => grandit
-        else:
-            tail_pos = self.snake.pop()
-            # IMPORTANT: si on a avancé sur la queue, tail_pos == next_pos => NE PAS retirer du set / NE PAS libérer
-            if tail_pos != next_pos:
-                self.snake_set.remove(tail_pos)
-                self._free(tail_pos)
+            return GREEN  # pas de pop => grandit
+
+        self._pop_tail(p)
 
         # --- handle red ---
-        if ate_red:
-            self.red_apples.remove(next_pos)
+        if code == RED:
+            rows[RED][ny] &= ~bx
+            cols[RED][nx] &= ~by
+            self._reds.remove(p)
             self._spawn_red()
-            newTile = Tile.RED
+            # shrink: pop 1 de plus
+            self._pop_tail(p)
+            if self._len == 0:
+                return WALL
+            return RED
+
+        return EMPTY
+
+    def _pop_tail(self, head_pos: int) -> None:
+        self._len -= 1
+        tail = self._body[(self._head + self._len) % len(self._body)]
+        # IMPORTANT: si on a avancé sur la queue, tail == tête => NE PAS libérer
+        if tail != head_pos:
+            self._occ[tail] = EMPTY
+            self._free(tail)
+            y, x = divmod(tail, self.WIDTH)
+            self._rows[BODY][y] &= ~(1 << x)
+            self._cols[BODY][x] &= ~(1 << y)
+
+
+class LegacyEnvironment(Environment):
+    """
+    Ancien mode "graine globale": rng = module random (random.seed(seed) avant la
+    partie, comme avant) et cases libres tirées par random.choice(tuple(set)) sur
+    un set de (x, y) mis à jour dans le même ordre que l'ancien freeTiles.
+    Mêmes spawns que les versions à set => les anciens replays (replay_min3.json)
+    rejouent à l'identique. Spawn en O(cases libres): seulement pour rejouer.
+    """
+
+    __slots__ = ("_legacy_free",)
+
+    def __init__(self, seed: Optional[int] = None, rng=random, **config) -> None:
+        self._legacy_free: Set[Pos] = set()
+        super().__init__(seed=seed, rng=rng, **config)
+
+    def _occupy(self, p: int) -> None:
+        super()._occupy(p)
+        self._legacy_free.discard(self._pos(p))
+
+    def _free(self, p: int) -> None:
+        super()._free(p)
+        self._legacy_free.add(self._pos(p))
+
+    def _random_free_cell(self) -> int:
+        if not self._legacy_free:
+            return -1
+        x, y = self.rng.choice(tuple(self._legacy_free))
+        return y * self.WIDTH + x
+
+    def _reset_free_tiles(self):
+        # set reconstruit à chaque partie (son ordre décide des spawns)
+        self._rebuild_free_tiles()
 
-            # shrink: pop 1 de plus (uniquement si on n'a pas mangé green)
-            if not ate_green and self.snake:
-                tail2 = self.snake.pop()
-                # Même principe: ne pas retirer/libérer si c'est la nouvelle tête
-                if tail2 != next_pos:
-                    self.snake_set.remove(tail2)
-                    self._free(tail2)
-
-            if len(self.snake) == 0:
-                return Tile.WALL
-
-        return newTile
+    def _rebuild_free_tiles(self):
+        # même historique que l'ancien set: copie de ALL_TILES puis on retire les murs
+        self._legacy_free = set(self.ALL_TILES)
+        for w in self.walls:
+            self._legacy_free.discard(w)
+        super()._rebuild_free_tiles()
+
+    # Pas de snapshot/restore: l'ordre d'itération du set (qui décide des spawns)
+    # ne se reconstruit pas, et random.getstate() seul ne suffit pas. On rejoue
+    # depuis random.seed(seed). Attributs absents (hasattr() -> False).
+    @property
+    def snapshot(self):
+        raise AttributeError("LegacyEnvironment has no snapshot(): replay from random.seed(seed)")
+
+    @property
+    def restore(self):
+        raise AttributeError("LegacyEnvironment has no restore(): replay from random.seed(seed)")
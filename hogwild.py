@@ -0,0 +1,339 @@
+# hogwild.py
+"""
+Hogwild training: N workers, one Q-table, no lock on the Q updates.
+
+Each worker runs its own Environment / Interpreter / Agent (train.py loop, own
+RNG streams) and updates the common table without locks: Q[s, a] writes from
+different workers may overwrite each other, which Hogwild accepts (rare, small
+error). Only the insertion of a new key takes a lock (qtable.ConcurrentQTable),
+so no slot is claimed twice and a key is never stored twice.
+
+Two backends:
+  processes (default)  SharedQTable, arrays in one multiprocessing.shared_memory
+                       block, fixed capacity (no rehash: slots must stay valid
+                       in every process)
+  threads=True         ConcurrentQTable in the process, nothing pickled or
+                       copied. Only useful on a free-threaded build (CPython
+                       3.13t+, GIL disabled); with a GIL it falls back to one
+                       thread (free_threaded()).
+
+Shared block (processes):
+  size:   int64[1]
+  stats:  float64[workers, 6] per worker, cumulative (steps, r_sum, deaths,
+          green, red, len_sum), published every `sync_every` steps
+  keys / q / counts / stamps / dirty: same arrays as QTable
+
+The table cannot grow: size it with capacity (train.py --capacity, slots;
+at most capacity * 0.75 keys). The log line shows fill = keys / that maximum.
+
+Epsilon follows the global step count: every `sync_every` steps a worker sets
+its agent.step_count to the steps published by the other workers plus its own
+local steps (its published row is already counted in the local part). Checkpoints are
+written by the parent from a copy of the table, in the usual format
+(Agent.load / play.py / play_1000.py).
+
+Usage:
+  python train.py --workers 8 [--threads] [--capacity 1048576] [--steps N] [--seed S]
+"""
+import multiprocessing as mp
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from agent import Agent
+from checkpoint import Checkpointer
+from environement import Environment
+from interpreter import Interpreter
+from metrics import MetricsWriter, TrainMetrics
+from qtable import EMPTY, N_ACTIONS, ConcurrentQTable, QTable
+from train import AGENT_ARGS, SAVE_STEPS, RunStats, fmt_duration, run_steps, save_path
+from utils import episode_seed
+
+# colonnes des stats par worker
+STEPS, R_SUM, DEATHS, GREEN, RED, LEN_SUM = range(6)
+N_STATS = 6
+
+
+def free_threaded() -> bool:
+    """True si le GIL est désactivé (build free-threaded 3.13+, PYTHON_GIL=0)."""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+class SharedQTable(ConcurrentQTable):
+    """
+    ConcurrentQTable dans un bloc multiprocessing.shared_memory (+ stats des workers).
+
+    name=None crée le bloc (le créateur appelle unlink() à la fin), sinon
+    s'attache au bloc existant. Se transmet aux process par pickle (nom + lock),
+    ce qui s'attache au même bloc côté worker.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1 << 18,
+        max_load: float = 0.75,
+        workers: int = 1,
+        name: Optional[str] = None,
+        lock=None,
+    ):
+        self.workers = workers
+        self._shm_name = name
+        super().__init__(capacity, max_load, lock if lock is not None else mp.Lock())
+
+    def _alloc(self, capacity: int) -> None:
+        cap = 1 << max(4, (capacity - 1).bit_length())
+        self.capacity = cap
+        self._mask = cap - 1
+        self._shift = 64 - (cap.bit_length() - 1)
+        self._grow_at = int(cap * self.max_load)
+
+        layout = (
+            ("_size", np.int64, (1,)),
+            ("stats", np.float64, (self.workers, N_STATS)),
+            ("keys", np.int64, (cap,)),
+            ("q", np.float32, (cap, N_ACTIONS)),
+            ("counts", np.uint32, (cap,)),
+            ("stamps", np.uint32, (cap,)),
+            ("dirty", np.bool_, (cap,)),
+        )
+        nbytes = sum(np.dtype(dt).itemsize * int(np.prod(shape)) for _, dt, shape in layout)
+
+        create = self._shm_name is None
+        self._shm = shared_memory.SharedMemory(name=self._shm_name, create=create, size=nbytes)
+        self._owner = create
+        offset = 0
+        for attr, dt, shape in layout:
+            arr = np.ndarray(shape, dtype=dt, buffer=self._shm.buf, offset=offset)
+            setattr(self, attr, arr)
+            offset += arr.nbytes
+        if create:  # bloc neuf = zéros
+            self.keys[:] = EMPTY
+
+    def __reduce__(self):
+        return (
+            SharedQTable,
+            (self.capacity, self.max_load, self.workers, self._shm.name, self._lock),
+        )
+
+    @property
+    def size(self) -> int:
+        # QTable.__init__ fait size = 0 avant _alloc: rien à écrire (bloc neuf ou existant)
+        return int(self._size[0]) if hasattr(self, "_size") else 0
+
+    @size.setter
+    def size(self, value: int) -> None:
+        if hasattr(self, "_size"):
+            self._size[0] = value
+
+    def close(self) -> None:
+        """Détache ce process du bloc (les vues numpy deviennent invalides)."""
+        for attr in ("_size", "stats", "keys", "q", "counts", "stamps", "dirty"):
+            setattr(self, attr, None)
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Libère le bloc (créateur seulement, après close())."""
+        if self._owner:
+            self._shm.unlink()
+
+
+def _run(
+    table: ConcurrentQTable,
+    stats: np.ndarray,
+    w: int,
+    steps: int,
+    seed: Optional[int],
+    board: dict,
+    agent_args: dict,
+    sync_every: int,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """
+    Boucle de train.py (run_steps) sur la table commune; publie ses stats dans
+    stats[w] tous les sync_every steps, où elle s'arrête aussi si `stop` est levé.
+    """
+    env = Environment(seed=seed, **board)
+    agent = Agent(seed=seed, **agent_args)
+    agent.registre = table
+    inter = Interpreter(env, use_mirror=agent.use_mirror)
+    mine = stats[w]
+
+    run = RunStats()
+    obs = inter.observe_key()
+    while run.step < steps and not (stop is not None and stop.is_set()):
+        _sync_steps(agent, stats, w, run.step)
+        obs = run_steps(agent, inter, obs, run, min(sync_every, steps - run.step))
+        mine[:] = (run.step, *run.totals())
+
+
+def _sync_steps(agent: Agent, stats: np.ndarray, w: int, local: int) -> None:
+    """
+    Epsilon suit le nombre de steps global: step_count = steps publiés par les
+    autres workers + `local` steps de w (sa ligne publiée n'est pas recomptée).
+    """
+    agent.step_count = int(stats[:, STEPS].sum() - stats[w, STEPS]) + local
+
+
+def _process_worker(table: SharedQTable, w: int, *args) -> None:
+    _run(table, table.stats, w, *args)
+    table.close()
+
+
+def _thread_worker(errors: list, *args) -> None:
+    try:
+        _run(*args)
+    except BaseException as e:  # remonté par train_hogwild
+        errors.append(e)
+
+
+def train_hogwild(
+    total_steps: int = 10_000_000,
+    workers: int = 4,
+    seed: Optional[int] = None,
+    capacity: int = 1 << 18,
+    sync_every: int = 1_000,
+    log_every: int = 100_000,
+    save: bool = True,
+    verbose: bool = True,
+    agent_args: Optional[dict] = None,
+    threads: bool = False,
+    metrics: Optional[MetricsWriter] = None,
+    metrics_every: int = 10_000,
+    **board,
+) -> tuple[Agent, list]:
+    """
+    train.train() sur `workers` process (ou threads). Le worker w a la graine
+    episode_seed(seed, w) (env + agent). Sauvegarde aux SAVE_STEPS comme train.py.
+    metrics: une row (metrics.TrainMetrics) quand les steps globaux passent un
+    multiple de metrics_every, depuis les stats publiées par les workers.
+    Returns (agent avec une copie QTable de la table finale,
+             historique [(steps globaux, avgLen, steps/s)] par fenêtre de log).
+    """
+    agent_args = AGENT_ARGS if agent_args is None else agent_args
+    if threads and workers > 1 and not free_threaded():
+        if verbose:
+            print(f"[hogwild] GIL enabled: {workers} threads -> 1 (needs a free-threaded build)")
+        workers = 1
+
+    # agent du parent: seulement pour les meta des checkpoints
+    agent = Agent(seed=seed, **agent_args)
+    errors: list = []
+    stop = threading.Event()  # threads: arrêt au prochain sync_every (erreur, fin)
+    runners = []
+    if threads:
+        table = ConcurrentQTable(capacity)
+        stats = np.zeros((workers, N_STATS))
+    else:
+        table = SharedQTable(capacity, workers=workers)
+        stats = table.stats
+    agent.registre = table
+
+    ctx = mp.get_context()
+    for w in range(workers):
+        n = total_steps // workers + (w < total_steps % workers)
+        w_seed = None if seed is None else episode_seed(seed, w)
+        job = (w, n, w_seed, board, agent_args, sync_every)
+        if threads:
+            runner = threading.Thread(
+                target=_thread_worker, args=(errors, table, stats, *job, stop), daemon=True
+            )
+        else:
+            runner = ctx.Process(target=_process_worker, args=(table, *job), daemon=True)
+        runners.append(runner)
+
+    ckpt = Checkpointer() if save else None
+    pending = sorted(s for s in SAVE_STEPS if s <= total_steps)
+    history = []
+    start = time.perf_counter()
+    last = np.zeros(N_STATS)
+    next_log = log_every
+    mode = "threads" if threads else "workers"
+    run_metrics = TrainMetrics(metrics_every)
+    next_row = metrics_every
+    row_step = 0
+
+    def poll() -> int:
+        nonlocal last, next_log, next_row, row_step
+        cur = stats.sum(axis=0)
+        total = int(cur[STEPS])
+        agent.step_count = total
+
+        if metrics is not None and (
+            total >= next_row or (total == total_steps and total > row_step)
+        ):
+            totals = (float(cur[R_SUM]), *(int(v) for v in cur[DEATHS:]))
+            elapsed = time.perf_counter() - start
+            metrics.write(
+                run_metrics.row(total, totals, agent.epsilon(), len(table), elapsed)
+            )
+            row_step = total
+            next_row = (total // metrics_every + 1) * metrics_every
+
+        if total >= next_log or (total == total_steps and cur[STEPS] > last[STEPS]):
+            d = cur - last
+            n = max(1.0, d[STEPS])
+            elapsed = time.perf_counter() - start
+            speed = total / elapsed if elapsed > 0 else 0.0
+            history.append((total, d[LEN_SUM] / n, speed))
+            if verbose:
+                eta = (total_steps - total) / speed if speed > 0 else 0.0
+                print(
+                    f"step={total} eps={agent.epsilon():.4f} "
+                    f"states={len(table)} fill={table.fill():.0%} {mode}={workers} "
+                    f"avgR={d[R_SUM] / n:.3f} deaths={int(d[DEATHS])} "
+                    f"green={int(d[GREEN])} red={int(d[RED])} avgLen={d[LEN_SUM] / n:.2f} "
+                    f"| elapsed={fmt_duration(elapsed)} speed={speed:.1f} steps/s "
+                    f"eta={fmt_duration(eta)}"
+                )
+            last = cur
+            next_log = (total // log_every + 1) * log_every
+
+        # save: copie de la table au moment où le compteur global passe le seuil
+        while pending and total >= pending[0]:
+            p = save_path(pending.pop(0))
+            if ckpt is not None:
+                ckpt.submit(p, *agent.snapshot())
+                if verbose:
+                    print(f"[SAVE] {p} (steps={total} states={len(table)})")
+        return total
+
+    try:
+        for r in runners:
+            r.start()
+        while any(r.is_alive() for r in runners) and not errors:
+            time.sleep(0.1)
+            poll()
+        if errors:
+            raise RuntimeError("hogwild: a worker thread failed") from errors[0]
+        failed = [w for w, r in enumerate(runners) if getattr(r, "exitcode", 0) != 0]
+        if failed:
+            raise RuntimeError(f"hogwild: workers {failed} failed (exitcode != 0)")
+        poll()
+        keys, q = table.arrays()
+        counts = table.counts[table.keys != EMPTY].copy()
+    finally:
+        stop.set()
+        for r in runners:
+            if not threads and r.is_alive():
+                r.terminate()
+            if r.ident is not None:  # démarré
+                r.join()
+        if ckpt is not None:
+            ckpt.close()
+        if not threads:
+            table.close()
+            table.unlink()
+
+    agent.registre = QTable.from_arrays(keys, q, counts, **agent._table_options)
+    if verbose:
+        elapsed = time.perf_counter() - start
+        print(
+            f"[DONE] total_steps={agent.step_count} {mode}={workers} "
+            f"total_time={elapsed:.2f}s speed={agent.step_count / elapsed:.1f} steps/s"
+        )
+    return agent, history
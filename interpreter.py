@@ -1,7 +1,8 @@
 # interpreter.py
-from typing import Tuple
+from typing import Optional, Tuple
 
-from environement import Environment
+from agent import TRANSFORM_PARAMS, _canonical_from_digits
+from environement import BODY, EMPTY, GREEN, RED, TILE_TO_CODE, WALL, Environment
 from tile import Tile
 
 # Etat compact: (up, right, down, left)
@@ -9,39 +10,119 @@ from tile import Tile
 DirFeat = Tuple[int, int, int, int]
 StateType = Tuple[DirFeat, DirFeat, DirFeat, DirFeat]
 
+# une direction = un chiffre base 625: d = wall + 5*green + 25*red + 125*body (cf. agent.py)
+DIGIT_FEAT = tuple((d % 5, d // 5 % 5, d // 25 % 5, d // 125) for d in range(625))
+NO_SNAKE_DIGIT = 4  # (4, 0, 0, 0)
+
+# récompenses par code de Environment.move() (EMPTY, BODY, GREEN, RED, WALL), cf. apply_dir
+REWARD_BY_CODE = (-0.01, -100, 10, -10, -100)
+SHAPE = 0.2  # reward shaping: +/- si on se rapproche / s'éloigne de la green
+
+# récompenses réglables par Interpreter(rewards={...}) (sweep.py), défauts ci-dessus
+REWARD_DEFAULTS = {
+    "step": REWARD_BY_CODE[EMPTY],
+    "death": REWARD_BY_CODE[WALL],
+    "green": REWARD_BY_CODE[GREEN],
+    "red": REWARD_BY_CODE[RED],
+    "shape": SHAPE,
+}
+
+_UNKNOWN = -1  # distance à la green pas encore calculée (None = pas de green)
+
 
 def manhattan(a, b) -> int:
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
 
 def closest_green_dist(env) -> int | None:
-    if not env.green_apples or not env.snake:
-        return None
-    h = env.snake[0]
-    return min(manhattan(h, g) for g in env.green_apples)
+    # calculé par l'env sur sa représentation interne (positions int / masques)
+    return env.closest_green_dist()
+
+
+def _ray_fwd(lines, line: int, c: int, border: int, bins) -> int:
+    """
+    Rayon vers les indices croissants depuis c sur `line` (bits = positions le long
+    de la ligne), renvoyé en chiffre de direction (cf. DIGIT_FEAT).
+    """
+    s = c + 1
+    m = lines[WALL][line] >> s
+    wall = (m & -m).bit_length() if m else border
+    m = lines[GREEN][line] >> s
+    green = (m & -m).bit_length()
+    m = lines[RED][line] >> s
+    red = (m & -m).bit_length()
+    m = lines[BODY][line] >> s
+    body = (m & -m).bit_length()
+    # seul ce qui est avant le mur est vu (0 = absent)
+    return (
+        bins[wall]
+        + (5 * bins[green] if green < wall else 0)
+        + (25 * bins[red] if red < wall else 0)
+        + (125 * bins[body] if body < wall else 0)
+    )
+
+
+def _ray_back(lines, line: int, c: int, bins) -> int:
+    """Rayon vers les indices décroissants: le plus proche = bit le plus haut sous c."""
+    below = (1 << c) - 1
+    top = c + 1  # distance = c - j pour le bit j, et c + 1 = le bord
+    wall = top - (lines[WALL][line] & below).bit_length()
+    m = lines[GREEN][line] & below
+    green = top - m.bit_length() if m else 0
+    m = lines[RED][line] & below
+    red = top - m.bit_length() if m else 0
+    m = lines[BODY][line] & below
+    body = top - m.bit_length() if m else 0
+    return (
+        bins[wall]
+        + (5 * bins[green] if green < wall else 0)
+        + (25 * bins[red] if red < wall else 0)
+        + (125 * bins[body] if body < wall else 0)
+    )
 
 
 class Interpreter:
-    def __init__(self, env):
+    def __init__(self, env, use_mirror: bool = True, rewards: Optional[dict] = None):
         self.env: Environment = env
+        # rewards: sous-ensemble de REWARD_DEFAULTS (step/death/green/red/shape)
+        unknown = set(rewards or ()) - set(REWARD_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown reward(s): {sorted(unknown)} ({'/'.join(REWARD_DEFAULTS)})")
+        r = {**REWARD_DEFAULTS, **(rewards or {})}
+        self.rewards = r
+        # indexé par code de Environment.move() (EMPTY, BODY, GREEN, RED, WALL)
+        self.reward_by_code = (r["step"], r["death"], r["green"], r["red"], r["death"])
+        self.shape = r["shape"]
+        # _bin_dist en table (distances 0..max(W, H))
+        self._bins = [self._bin_dist(d) for d in range(max(env.WIDTH, env.HEIGHT) + 1)]
+        # transition(): canonicalisation comme Agent(use_mirror=...)
+        self.use_mirror = use_mirror
+        # distance à la green après le dernier transition() = distance avant le suivant
+        self._green_dist = _UNKNOWN
+        # code du dernier move (EMPTY/BODY/GREEN/RED/WALL): ce qui a été mangé,
+        # indépendant des récompenses (shaping, rewards={...})
+        self.last_code = EMPTY
 
     def apply_dir(self, direction):
+        self._green_dist = _UNKNOWN
         # distance avant le move (vers la green la plus proche)
 
         d0 = closest_green_dist(self.env)
+        reward_by_code = self.reward_by_code
 
         newTile = self.env.step(direction)
+        self.last_code = WALL if newTile is False else TILE_TO_CODE[newTile]
 
         done = False
         if newTile in (Tile.WALL, Tile.BODY):
-            reward = -100
+            reward = reward_by_code[WALL]
             done = True
         elif newTile == Tile.RED:
-            reward = -10
+            reward = reward_by_code[RED]
         elif newTile == Tile.GREEN:
-            reward = 10
+            reward = reward_by_code[GREEN]
         else:
-            reward = -0.01
+            reward = reward_by_code[EMPTY]
 
         # distance après le move
         d1 = closest_green_dist(self.env)
@@ -53,17 +134,79 @@ class Interpreter:
             and (d1 is not None)
             and (newTile != Tile.GREEN)
         ):
-            # réglage: commence petit
-            SHAPE = 0.2
             if d1 < d0:
-                reward += SHAPE
+                reward += self.shape
             elif d1 > d0:
-                reward -= SHAPE
+                reward -= self.shape
 
         return reward, done
 
-    def reset_game(self):
-        self.env.reset_game()
+    def transition(self, action: int) -> Tuple[float, bool, int, int, bool]:
+        """
+        apply_dir(intDir(action)) + get_state() + agent._canonicalize en un appel:
+        (reward, done, next_key, rot_k, mirror), next_key = clé packée canonique de
+        l'état après le move; le code du move (pomme mangée...) reste dans
+        self.last_code. Les features vont directement dans les chiffres de la
+        clé (pas de tuples), et la distance à la green après le move sert de distance
+        avant le move suivant. Suppose que l'env n'avance que via cet Interpreter
+        (transition / apply_dir / reset_game), sinon appeler observe_key() d'abord.
+        """
+        env = self.env
+        d0 = self._green_dist
+        if d0 == _UNKNOWN:
+            d0 = env.closest_green_dist()
+
+        code = self.last_code = env.move(action)
+        reward = self.reward_by_code[code]
+        done = code == WALL or code == BODY
+        if done:
+            self._green_dist = _UNKNOWN
+        else:
+            d1 = env.closest_green_dist()
+            self._green_dist = d1
+            if code != GREEN and d0 is not None and d1 is not None:
+                if d1 < d0:
+                    reward += self.shape
+                elif d1 > d0:
+                    reward -= self.shape
+
+        key, t = self._key()
+        rot_k, mirror = TRANSFORM_PARAMS[t]
+        return reward, done, key, rot_k, mirror
+
+    def observe_key(self) -> Tuple[int, int, bool]:
+        """(key, rot_k, mirror) de l'état courant, sans move (début de partie)."""
+        self._green_dist = _UNKNOWN
+        key, t = self._key()
+        rot_k, mirror = TRANSFORM_PARAMS[t]
+        return key, rot_k, mirror
+
+    def _key(self) -> Tuple[int, int]:
+        """(clé canonique, t) de l'état courant."""
+        env = self.env
+        if not hasattr(env, "ray_state") and hasattr(env, "row_bits"):
+            h = env.head_index()
+            if h < 0:
+                return _canonical_from_digits(4, 4, 4, 4, self.use_mirror)
+            W = env.WIDTH
+            y, x = divmod(h, W)
+            rows = env.row_bits
+            cols = env.col_bits
+            bins = self._bins
+            return _canonical_from_digits(
+                _ray_back(cols, x, y, bins),
+                _ray_fwd(rows, y, x, W - x, bins),
+                _ray_fwd(cols, x, y, env.HEIGHT - y, bins),
+                _ray_back(rows, y, x, bins),
+                self.use_mirror,
+            )
+        # autres envs (BitboardEnvironment...): depuis le tuple d'état
+        digits = [w + 5 * g + 25 * r + 125 * b for w, g, r, b in self.get_state()]
+        return _canonical_from_digits(*digits, self.use_mirror)
+
+    def reset_game(self, seed=None):
+        self._green_dist = _UNKNOWN
+        self.env.reset_game(seed)
 
     # ---------- NEW: binning ----------
     @staticmethod
@@ -89,46 +232,90 @@ class Interpreter:
     def _ray_features(self, dx: int, dy: int) -> DirFeat:
         """
         Calcule distances jusqu'à:
-        - mur (bord ou wall set) [toujours présent]
+        - mur (bord ou case WALL) [toujours présent]
         - green / red / body (0 si absent avant le mur)
         Puis applique binning.
+        Marche sur la grille d'occupation de l'env (un octet par case).
         """
-        if not self.env.snake:
+        env = self.env
+        h = env.head_index()
+        if h < 0:
             return (4, 0, 0, 0)
 
-        hx, hy = self.env.snake[0]
+        W, H = env.WIDTH, env.HEIGHT
+        occ = env.occupancy
+        x, y = h % W, h // W
+        step = dy * W + dx
 
         dist = 0
         seen_green = 0
         seen_red = 0
         seen_body = 0
 
-        x, y = hx, hy
+        p = h
         while True:
             dist += 1
             x += dx
             y += dy
 
             # bord = mur
-            if not self.env.in_bounds(x, y) or (x, y) in self.env.walls:
-                wall_bin = self._bin_dist(dist)
-                return (
-                    wall_bin,
-                    self._bin_dist(seen_green),
-                    self._bin_dist(seen_red),
-                    self._bin_dist(seen_body),
-                )
-
-            pos = (x, y)
+            if not (0 <= x < W and 0 <= y < H):
+                break
+            p += step
+            code = occ[p]
+            if code == WALL:
+                break
+
             # On ne garde que la 1ère occurrence (distance minimale)
-            if seen_green == 0 and pos in self.env.green_apples:
-                seen_green = dist
-            if seen_red == 0 and pos in self.env.red_apples:
-                seen_red = dist
-            if seen_body == 0 and pos in self.env.snake_set:
-                seen_body = dist
+            if code == GREEN:
+                if seen_green == 0:
+                    seen_green = dist
+            elif code == RED:
+                if seen_red == 0:
+                    seen_red = dist
+            elif code == BODY:
+                if seen_body == 0:
+                    seen_body = dist
+
+        return (
+            self._bin_dist(dist),
+            self._bin_dist(seen_green),
+            self._bin_dist(seen_red),
+            self._bin_dist(seen_body),
+        )
+
+    def _indexed_state(self) -> StateType:
+        """
+        Mêmes features que _ray_features x4, lues sur les index ligne/colonne de
+        l'env (env.row_bits / env.col_bits): la case la plus proche dans un sens
+        = bit le plus bas (vers +) ou le plus haut (vers -) du masque décalé. O(1) par rayon.
+        """
+        env = self.env
+        h = env.head_index()
+        if h < 0:
+            return (DIGIT_FEAT[NO_SNAKE_DIGIT],) * 4
+        W = env.WIDTH
+        y, x = divmod(h, W)
+        rows = env.row_bits
+        cols = env.col_bits
+        bins = self._bins
+        return (
+            DIGIT_FEAT[_ray_back(cols, x, y, bins)],
+            DIGIT_FEAT[_ray_fwd(rows, y, x, W - x, bins)],
+            DIGIT_FEAT[_ray_fwd(cols, x, y, env.HEIGHT - y, bins)],
+            DIGIT_FEAT[_ray_back(rows, y, x, bins)],
+        )
 
     def get_state(self) -> StateType:
+        # env bitboard (BitboardEnvironment): rayons par masques
+        ray_state = getattr(self.env, "ray_state", None)
+        if ray_state is not None:
+            return ray_state()
+
+        # Environment: index ligne/colonne maintenus par step()
+        if hasattr(self.env, "row_bits"):
+            return self._indexed_state()
+
         # ordre: up, right, down, left (comme tu avais)
         up = self._ray_features(0, -1)
         right = self._ray_features(1, 0)
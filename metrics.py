@@ -0,0 +1,348 @@
+# metrics.py
+"""
+Training metrics: histograms and window counters, written as rows to JSONL or
+CSV by a background thread.
+
+Hot-loop cost: train.py keeps its plain cumulative counters (reward, deaths,
+green, red, length sums); TrainMetrics only adds three Histogram.add calls per
+episode (steps, final length, reward) and builds one row every `every` steps
+from the counter differences. MetricsWriter formats and writes the rows on
+its own thread and flushes the file every `flush_every` seconds.
+
+Parallel modes (train.py --workers / --threads / --actors) write the same rows
+from the parent, out of the counters the workers already publish (Hogwild
+stats block, actor batch stats): one row when the global step count passes a
+multiple of `every`. Episodes are not sent back, so the ep_* histogram fields
+stay empty (_n = 0) there.
+
+Row fields: step, elapsed, steps_s, eps, states, avgR, avgLen, deaths, green,
+red, then for ep_steps / ep_len / ep_reward: _n, _mean, _p50, _p90, _max
+(percentiles from the histogram buckets: exact for small ints, ~20% above).
+
+CLI (runs = .jsonl or .csv files, several side by side):
+  python metrics.py tail train/metrics-v6.jsonl [--follow] [--fields avgLen,steps_s]
+  python metrics.py plot runA.jsonl runB.csv [--fields avgLen,steps_s] [--out plot.png]
+plot uses matplotlib if installed, otherwise prints text sparklines.
+"""
+import argparse
+import csv
+import json
+import math
+import queue
+import sys
+import threading
+import time
+from bisect import bisect_right
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_FIELDS = ("avgLen", "avgR", "steps_s", "states")
+
+
+def int_edges(max_value: int = 1 << 20, per_octave: int = 4) -> list:
+    """Bornes de buckets: chaque entier jusqu'à 16, puis per_octave buckets par doublement."""
+    edges = list(range(17))
+    k = 1
+    while edges[-1] < max_value:
+        e = round(16 * 2 ** (k / per_octave))
+        if e > edges[-1]:
+            edges.append(e)
+        k += 1
+    return edges
+
+
+class Histogram:
+    """
+    Histogramme à buckets fixes: add() = une bissection + 4 mises à jour.
+    Le bucket j couvre [edges[j-1], edges[j]); moyenne et max exacts.
+    """
+
+    __slots__ = ("edges", "counts", "n", "total", "max")
+
+    def __init__(self, edges):
+        self.edges = list(edges)
+        self.counts = [0] * (len(self.edges) + 1)
+        self.n = 0
+        self.total = 0.0
+        self.max = -math.inf
+
+    def add(self, value) -> None:
+        self.counts[bisect_right(self.edges, value)] += 1
+        self.n += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float):
+        """Borne basse du bucket qui contient le quantile q (None si vide)."""
+        if not self.n:
+            return None
+        rank = q * self.n
+        seen = 0
+        for j, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                low = self.edges[j - 1] if j > 0 else self.edges[0]
+                return min(low, self.max)
+        return self.max
+
+    def summary(self, name: str) -> dict:
+        n = self.n
+        return {
+            f"{name}_n": n,
+            f"{name}_mean": round(self.total / n, 3) if n else None,
+            f"{name}_p50": self.quantile(0.5),
+            f"{name}_p90": self.quantile(0.9),
+            f"{name}_max": round(self.max, 3) if n else None,
+        }
+
+    def reset(self) -> None:
+        self.counts = [0] * len(self.counts)
+        self.n = 0
+        self.total = 0.0
+        self.max = -math.inf
+
+
+class TrainMetrics:
+    """
+    Métriques de train.py: histogrammes par épisode + fenêtre des compteurs.
+    Picklable (fait partie de l'état --resume); le writer reste à part.
+    """
+
+    def __init__(self, every: int = 10_000):
+        self.every = every
+        self.ep_steps = Histogram(int_edges())
+        self.ep_len = Histogram(int_edges())
+        self.ep_reward = Histogram(range(-200, 2001, 10))
+        self._mark = (0, 0.0, 0, 0, 0, 0)  # (step, r, deaths, green, red, len) au dernier row
+        self._t_mark = 0.0
+
+    def episode(self, steps: int, length: int, reward: float) -> None:
+        self.ep_steps.add(steps)
+        self.ep_len.add(length)
+        self.ep_reward.add(reward)
+
+    def row(self, step: int, totals: tuple, eps: float, states: int, elapsed: float) -> dict:
+        """Row de la fenêtre depuis le row précédent; totals = (r, deaths, green, red, len) cumulés."""
+        cur = (step, *totals)
+        d_step, d_r, d_deaths, d_green, d_red, d_len = (a - b for a, b in zip(cur, self._mark))
+        d_t = elapsed - self._t_mark
+        n = max(1, d_step)
+        row = {
+            "step": step,
+            "elapsed": round(elapsed, 3),
+            "steps_s": round(d_step / d_t, 1) if d_t > 0 else None,
+            "eps": round(eps, 5),
+            "states": states,
+            "avgR": round(d_r / n, 4),
+            "avgLen": round(d_len / n, 3),
+            "deaths": d_deaths,
+            "green": d_green,
+            "red": d_red,
+        }
+        for name in ("ep_steps", "ep_len", "ep_reward"):
+            hist = getattr(self, name)
+            row.update(hist.summary(name))
+            hist.reset()
+        self._mark = cur
+        self._t_mark = elapsed
+        return row
+
+
+class MetricsWriter:
+    """
+    Écrit les rows (dicts plats) sur un thread: .csv -> CSV (colonnes du premier
+    row), sinon JSONL. write() ne fait qu'un put dans une queue.
+    append=True (reprise): ajoute au fichier existant.
+    """
+
+    def __init__(self, path: str | Path, flush_every: float = 5.0, append: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+        self._csv = self.path.suffix == ".csv"
+        self._columns: Optional[list] = None
+        if append and self._csv and self.path.exists() and self.path.stat().st_size:
+            with self.path.open(newline="") as f:
+                self._columns = next(csv.reader(f))
+        self._file = self.path.open("a" if append else "w", newline="")
+        self._queue: queue.Queue = queue.Queue()
+        self.error: Exception | None = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, row: dict) -> None:
+        if self.error is not None:
+            raise self.error
+        self._queue.put(row)
+
+    def _format(self, row: dict) -> str:
+        if not self._csv:
+            return json.dumps(row) + "\n"
+        if self._columns is None:
+            self._columns = list(row)
+            self._file.write(",".join(self._columns) + "\n")
+        return ",".join("" if row.get(c) is None else str(row.get(c)) for c in self._columns) + "\n"
+
+    def _run(self) -> None:
+        last_flush = time.monotonic()
+        while True:
+            try:
+                row = self._queue.get(timeout=self.flush_every)
+            except queue.Empty:
+                row = False
+            try:
+                if row is None:
+                    self._file.flush()
+                    return
+                if row:
+                    self._file.write(self._format(row))
+                if time.monotonic() - last_flush >= self.flush_every:
+                    self._file.flush()
+                    last_flush = time.monotonic()
+            except Exception as e:  # reported on next write/close
+                self.error = e
+
+    def close(self) -> None:
+        """Écrit les rows en attente et ferme le fichier."""
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        if self.error is not None:
+            raise self.error
+
+
+# ---------- lecture / CLI ----------
+def _number(text: str):
+    if text == "":
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+
+def load_rows(path: str | Path) -> list:
+    """Rows d'un run (.jsonl ou .csv), un par step (le dernier gagne: reprise --resume)."""
+    path = Path(path)
+    with path.open(newline="") as f:
+        if path.suffix == ".csv":
+            rows = [{k: _number(v) for k, v in r.items()} for r in csv.DictReader(f)]
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    by_step = {r["step"]: r for r in rows}
+    return [by_step[s] for s in sorted(by_step)]
+
+
+def _cell(v) -> str:
+    if v is None:
+        return "-"
+    if isinstance(v, float):
+        return f"{v:.4g}" if abs(v) < 1e4 else f"{v:,.0f}"
+    return str(v)
+
+
+def tail(path: str, fields: list, n: int = 20, follow: bool = False, interval: float = 2.0) -> None:
+    """Dernières rows d'un run; follow=True: affiche les nouvelles au fil de l'eau."""
+    cols = ["step", *fields]
+    print("  ".join(f"{c:>12}" for c in cols))
+    shown = -1
+    while True:
+        rows = load_rows(path) if Path(path).exists() else []
+        new = [r for r in rows if r["step"] > shown]
+        for r in new if shown >= 0 else new[-n:]:
+            print("  ".join(f"{_cell(r.get(c)):>12}" for c in cols))
+        if rows:
+            shown = rows[-1]["step"]
+        if not follow:
+            return
+        sys.stdout.flush()
+        time.sleep(interval)
+
+
+_SPARK = "▁▂▃▄▅▆▇█"
+
+
+def _sparkline(values: list, width: int = 60) -> str:
+    values = [v for v in values if isinstance(v, (int, float))]
+    if not values:
+        return ""
+    if len(values) > width:  # moyenne par paquets
+        k = len(values) / width
+        chunks = [values[int(i * k) : int((i + 1) * k)] for i in range(width)]
+        values = [sum(c) / len(c) for c in chunks if c]
+    lo, hi = min(values), max(values)
+    span = hi - lo or 1.0
+    return "".join(_SPARK[int((v - lo) / span * (len(_SPARK) - 1))] for v in values)
+
+
+def plot(paths: list, fields: list, out: Optional[str] = None) -> None:
+    """Runs côte à côte, un graphe par champ (matplotlib), sinon sparklines texte."""
+    runs = {p: load_rows(p) for p in paths}
+    try:
+        import matplotlib
+
+        if out:
+            matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        plt = None
+
+    if plt is None:
+        print("[metrics] matplotlib not installed: text mode")
+        width = max(len(name) for name in runs)
+        for field in fields:
+            print(f"{field}:")
+            for name, rows in runs.items():
+                values = [r.get(field) for r in rows]
+                last = next((v for v in reversed(values) if v is not None), None)
+                print(f"  {name:<{width}} {_sparkline(values)} last={_cell(last)}")
+        return
+
+    fig, axes = plt.subplots(len(fields), 1, figsize=(10, 3 * len(fields)), sharex=True, squeeze=False)
+    for ax, field in zip(axes[:, 0], fields):
+        for name, rows in runs.items():
+            pts = [(r["step"], r.get(field)) for r in rows if r.get(field) is not None]
+            if pts:
+                ax.plot(*zip(*pts), label=name)
+        ax.set_ylabel(field)
+        ax.grid(True, alpha=0.3)
+    axes[0, 0].legend()
+    axes[-1, 0].set_xlabel("step")
+    fig.tight_layout()
+    if out:
+        fig.savefig(out)
+        print(f"[metrics] plot -> {out}")
+    else:
+        plt.show()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Training metrics (train.py --metrics)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_tail = sub.add_parser("tail", help="dernières rows d'un run")
+    p_tail.add_argument("run")
+    p_tail.add_argument("-n", type=int, default=20)
+    p_tail.add_argument("--follow", "-f", action="store_true")
+    p_tail.add_argument("--fields", default=",".join(DEFAULT_FIELDS))
+    p_plot = sub.add_parser("plot", help="runs côte à côte")
+    p_plot.add_argument("runs", nargs="+")
+    p_plot.add_argument("--fields", default=",".join(DEFAULT_FIELDS))
+    p_plot.add_argument("--out", default=None, help="image (sinon fenêtre)")
+    args = ap.parse_args()
+
+    fields = args.fields.split(",")
+    if args.cmd == "tail":
+        try:
+            tail(args.run, fields, args.n, args.follow)
+        except KeyboardInterrupt:
+            pass
+    else:
+        plot(args.runs, fields, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# planner.py
+"""
+Dyna-Q planning with prioritized sweeping (Agent(plan_steps=...)).
+
+The learned model is a compact, append-only table indexed by m = key*4 + action:
+  succ_keys[row*K:(row+1)*K]    up to K distinct next keys seen after (key, action)
+  succ_counts[row*K:(row+1)*K]  how often each was seen (0 = free slot)
+  reward_sum[row]  sum of the observed rewards  -> mean reward
+  done_count[row]  number of terminal outcomes  -> done rate
+  count[row]       number of observations
+Transitions between canonical keys are stochastic (apple spawns), so a backup
+uses the expected next value over the successor histogram, not one sample.
+When all K slots are taken, a new next key replaces the least seen one.
+Predecessors (next key -> model rows leading to it) drive the sweeping:
+after a backup of state s, every (s_pred, a_pred) -> s gets its Bellman error
+re-evaluated and is queued if it is above theta.
+"""
+import heapq
+from array import array
+from typing import Dict, List
+
+
+class PrioritizedSweeping:
+    def __init__(
+        self,
+        gamma: float,
+        theta: float = 1e-3,
+        alpha: float = 1.0,
+        max_preds: int = 8,
+        max_succ: int = 8,
+    ):
+        self.gamma = gamma
+        self.theta = theta
+        self.alpha = alpha  # 1.0: the model target is already an expectation
+        self.max_preds = max_preds
+        self.max_succ = max_succ
+
+        self.index: Dict[int, int] = {}  # key*4 + action -> row
+        self.pairs = array("q")  # row -> key*4 + action
+        self.succ_keys = array("q")
+        self.succ_counts = array("L")
+        self.reward_sum = array("d")
+        self.done_count = array("L")
+        self.count = array("L")
+
+        self.preds: Dict[int, List[int]] = {}  # next key -> rows (most recent last)
+        self.heap: list = []  # (-priority, row)
+        self.queued: Dict[int, float] = {}  # row -> priority currently in the heap
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    # ---------- model ----------
+    def observe(self, key: int, action: int, reward: float, next_key: int, done: bool) -> int:
+        """Records a real transition; returns its model row."""
+        m = key * 4 + action
+        row = self.index.get(m)
+        if row is None:
+            row = len(self.pairs)
+            self.index[m] = row
+            self.pairs.append(m)
+            self.succ_keys.extend([0] * self.max_succ)
+            self.succ_counts.extend([0] * self.max_succ)
+            self.reward_sum.append(reward)
+            self.done_count.append(int(done))
+            self.count.append(1)
+        else:
+            self.reward_sum[row] += reward
+            self.done_count[row] += int(done)
+            self.count[row] += 1
+
+        if not done:
+            self._add_successor(row, next_key)
+            preds = self.preds.get(next_key)
+            if preds is None:
+                self.preds[next_key] = [row]
+            elif row not in preds:
+                preds.append(row)
+                if len(preds) > self.max_preds:
+                    del preds[0]
+        return row
+
+    def _add_successor(self, row: int, next_key: int) -> None:
+        keys, counts = self.succ_keys, self.succ_counts
+        base = row * self.max_succ
+        least = base
+        for s in range(base, base + self.max_succ):
+            if counts[s] and keys[s] == next_key:
+                counts[s] += 1
+                return
+            if counts[s] < counts[least]:
+                least = s
+        keys[least] = next_key
+        counts[least] = 1
+
+    def _target(self, table, row: int) -> float:
+        """Mean reward + gamma * expected max Q over the observed successors."""
+        n = self.count[row]
+        base = row * self.max_succ
+        total = 0
+        value = 0.0
+        for s in range(base, base + self.max_succ):
+            c = self.succ_counts[s]
+            if c:
+                j = table.find(self.succ_keys[s])
+                if j >= 0:
+                    value += c * table.max_value(j)
+                total += c
+        next_value = value / total if total else 0.0
+        alive = 1.0 - self.done_count[row] / n
+        return self.reward_sum[row] / n + self.gamma * alive * next_value
+
+    # ---------- priority queue ----------
+    def push(self, row: int, priority: float) -> None:
+        if priority > self.theta and priority > self.queued.get(row, 0.0):
+            self.queued[row] = priority
+            heapq.heappush(self.heap, (-priority, row))
+            if len(self.heap) > 4 * len(self.queued) + 1024:
+                # too many stale entries: rebuild from the live priorities
+                self.heap = [(-p, r) for r, p in self.queued.items()]
+                heapq.heapify(self.heap)
+
+    def _priority(self, table, row: int) -> float:
+        m = self.pairs[row]
+        i = table.find(m >> 2)
+        q_sa = table.value(i, m & 3) if i >= 0 else 0.0
+        return abs(self._target(table, row) - q_sa)
+
+    def real_backup(self, table, row: int) -> None:
+        """After a real backup of (key, action) = row: queue it and the predecessors of key."""
+        self.push(row, self._priority(table, row))
+        for pred in self.preds.get(self.pairs[row] >> 2, ()):
+            self.push(pred, self._priority(table, pred))
+
+    def plan(self, table, n_steps: int) -> int:
+        """Up to n_steps simulated backups, highest Bellman error first. Returns backups done."""
+        done = 0
+        while self.heap and done < n_steps:
+            neg_p, row = heapq.heappop(self.heap)
+            if self.queued.get(row) != -neg_p:
+                continue  # stale entry (re-queued with a higher priority)
+            del self.queued[row]
+
+            m = self.pairs[row]
+            key = m >> 2
+            i = table.slot(key)
+            q_sa = table.value(i, m & 3)
+            table.set_value(i, m & 3, q_sa + self.alpha * (self._target(table, row) - q_sa))
+            done += 1
+
+            for pred in self.preds.get(key, ()):
+                self.push(pred, self._priority(table, pred))
+        return done
@@ -9,96 +9,59 @@ from typing import List, Tuple, Optional
 
 import pygame
 
-from environement import Environment
+from environement import Environment, LegacyEnvironment
 from interpreter import Interpreter
 from agent import Agent
 
 # IMPORTANT: v6 Agent stores Q-table with packed+canonical int keys.
-# So play.py must canonicalize+pack the state before reading Q-values.
-from agent import _canonical_pack_key, _transform_state, _canon_to_env_action
+# Evaluation goes through a CompiledPolicy (policy.py): canonicalize+pack the
+# state, then one lookup gives the argmax actions for the current safe mask.
+from policy import CompiledPolicy, compile_policy
 
-from utils import intDir
+from utils import add_board_args, board_config, intDir
 
 Action = int  # 0..3 (UP, RIGHT, DOWN, LEFT) in ENV frame
 
 
-def allowed_actions_no_suicide_from_state(state_urdl) -> List[int]:
+def make_env(seed: int, legacy: bool, board: Optional[dict] = None) -> Environment:
     """
-    state_urdl = (up, right, down, left)
-    DirFeat = (wall_bin, green_bin, red_bin, body_bin)
-    Interdit si wall_bin==1 ou body_bin==1, sauf si obligé.
-    IMPORTANT: this must be computed in the SAME frame as the Q-values we use.
+    Partie reproductible via seed, avec son propre flux (env.rng, aussi utilisé
+    pour le tie-break de la policy). legacy: ancien mode random.seed(seed) global
+    + spawns de l'ancien freeTiles (replays enregistrés avant les flux par partie).
+    board: kwargs de Environment (height/width/n_green/n_red/snake_start_len).
     """
-    allowed = []
-    for a, dirfeat in enumerate(state_urdl):
-        wall_bin, green_bin, red_bin, body_bin = dirfeat
-        if wall_bin == 1 or body_bin == 1:
-            continue
-        allowed.append(a)
-    return allowed if allowed else [0, 1, 2, 3]
-
-
-def greedy_action_env(
-    agent: Agent, state_env, deterministic_tiebreak: bool = False
-) -> Action:
-    """
-    Returns an action in ENV frame (0..3), using the trained Q-table.
-    Works with v6 Agent (canonicalization + packed int keys).
-    """
-    # canonicalize & pack (same as training)
-    key, (rot_k, mirror) = _canonical_pack_key(
-        state_env, use_mirror=getattr(agent, "use_mirror", False)
-    )
-    state_can = _transform_state(state_env, rot_k, mirror)
-
-    # fetch Q-values for this canonical key
-    # NOTE: agent.registre is a defaultdict, so agent.registre[key] always exists.
-    qvals = agent.registre.get(key)
-    if qvals is None:
-        # unseen state -> default action
-        return 0
-
-    # allowed actions must be computed in CANONICAL frame
-    allowed_can = allowed_actions_no_suicide_from_state(state_can)
-
-    # greedy in canonical frame
-    best_v = max(qvals[a] for a in allowed_can)
-    best = [a for a in allowed_can if qvals[a] == best_v]
-
-    a_can = best[0] if deterministic_tiebreak else random.choice(best)
-
-    # map canonical action back to env action (Option A, direct mapping)
-    a_env = _canon_to_env_action(a_can, rot_k, mirror)
-    return a_env
+    if legacy:
+        random.seed(seed)
+        return LegacyEnvironment(**(board or {}))
+    return Environment(seed=seed, **(board or {}))
 
 
 def run_episode_headless(
-    agent: Agent,
+    policy: CompiledPolicy,
     seed: int,
     max_steps: int,
     deterministic_tiebreak: bool,
+    legacy: bool = False,
+    board: Optional[dict] = None,
 ) -> Tuple[int, List[Action]]:
     """
     Lance 1 partie SANS affichage, renvoie (taille_finale, actions_env).
     Reproductible via seed.
     """
-    random.seed(seed)
-
-    env = Environment()
-    inter = Interpreter(env)
-    env.reset_game()
+    env = make_env(seed, legacy, board)
+    inter = Interpreter(env, use_mirror=policy.use_mirror)
+    inter.reset_game()
+    key, rot_k, mirror = inter.observe_key()
 
     actions_env: List[Action] = []
 
     for _ in range(max_steps):
-        state = inter.get_state()
-        a_env = greedy_action_env(
-            agent, state, deterministic_tiebreak=deterministic_tiebreak
+        a_env = policy.act_key(
+            key, rot_k, mirror, deterministic=deterministic_tiebreak, rng=env.rng
         )
         actions_env.append(a_env)
 
-        direction = intDir(a_env)
-        reward, done = inter.apply_dir(direction)
+        reward, done, key, rot_k, mirror = inter.transition(a_env)
         if done:
             break
 
@@ -106,23 +69,24 @@ def run_episode_headless(
 
 
 def replay_episode_pygame(
-    agent: Agent,
+    policy: CompiledPolicy,
     seed: int,
     actions: Optional[List[Action]],
     fps: int,
     step_per_frame: int,
     deterministic_tiebreak: bool,
+    legacy: bool = False,
+    board: Optional[dict] = None,
 ):
     """
     Rejoue en Pygame.
     - Si actions est fourni: rejoue EXACTEMENT cette suite (actions en repère ENV).
     - Sinon: calcule l'action greedy à chaque step (avec seed pour reproduc).
     """
-    random.seed(seed)
-
-    env = Environment()
-    inter = Interpreter(env)
-    env.reset_game()
+    env = make_env(seed, legacy, board)
+    inter = Interpreter(env, use_mirror=policy.use_mirror)
+    inter.reset_game()
+    obs = inter.observe_key()  # (key, rot_k, mirror) de l'état courant
 
     pygame.init()
     screen_w = env.SQUARE * env.WIDTH + (env.WIDTH + 1) * env.LINE
@@ -133,12 +97,60 @@ def replay_episode_pygame(
     clock = pygame.time.Clock()
     running = True
     paused = False
+    done = False
 
     step_i = 0
     max_steps = 10_000_000  # sécurité
 
+    # seeking: snapshot (RNG compris) tous les SEEK_EVERY steps, ←/→ = -/+ SEEK_EVERY
+    # (legacy: pas de snapshot/restore, on rejoue depuis la graine)
+    SEEK_EVERY = 100
+    checkpoints = [] if legacy else [env.snapshot()]
+
     font = pygame.font.SysFont(None, 22)
 
+    def advance(n: int) -> None:
+        """Joue au plus n steps (s'arrête en fin d'actions ou à la mort)."""
+        nonlocal step_i, done, paused, obs
+        for _ in range(n):
+            if done or step_i >= max_steps:
+                paused = True
+                return
+
+            # action du replay (ENV frame)
+            if actions is not None:
+                if step_i >= len(actions):
+                    paused = True
+                    return
+                a_env = actions[step_i]
+            else:
+                a_env = policy.act_key(*obs, deterministic=deterministic_tiebreak, rng=env.rng)
+
+            reward, done, *obs = inter.transition(a_env)
+            step_i += 1
+            if not legacy and step_i % SEEK_EVERY == 0 and step_i // SEEK_EVERY == len(checkpoints):
+                checkpoints.append(env.snapshot())
+
+            if done:
+                paused = True
+                return
+
+    def seek(target: int) -> None:
+        """Va au step target: restore du dernier checkpoint <= target puis re-simule le reste."""
+        nonlocal env, inter, step_i, done, obs
+        target = max(0, target)
+        k = 0 if legacy else min(target // SEEK_EVERY, len(checkpoints) - 1)
+        if legacy:
+            env = make_env(seed, legacy, board)
+            inter = Interpreter(env, use_mirror=policy.use_mirror)
+            inter.reset_game()
+        else:
+            env.restore(checkpoints[k])
+        obs = inter.observe_key()
+        step_i = k * SEEK_EVERY
+        done = False
+        advance(target - step_i)
+
     while running:
         # events
         for event in pygame.event.get():
@@ -152,39 +164,18 @@ def replay_episode_pygame(
                     paused = not paused
                 elif event.key == pygame.K_r:
                     # reset et recommence le replay
-                    random.seed(seed)
-                    env.reset_game()
-                    step_i = 0
+                    seek(0)
+                elif event.key == pygame.K_LEFT:
+                    seek(step_i - SEEK_EVERY)
+                elif event.key == pygame.K_RIGHT:
+                    seek(step_i + SEEK_EVERY)
                 elif event.key == pygame.K_n:
                     # step unique si paused
                     if paused:
                         step_per_frame = 1
 
         if not paused:
-            for _ in range(step_per_frame):
-                if step_i >= max_steps:
-                    paused = True
-                    break
-
-                # action du replay (ENV frame)
-                if actions is not None:
-                    if step_i >= len(actions):
-                        paused = True
-                        break
-                    a_env = actions[step_i]
-                else:
-                    state = inter.get_state()
-                    a_env = greedy_action_env(
-                        agent, state, deterministic_tiebreak=deterministic_tiebreak
-                    )
-
-                direction = intDir(a_env)
-                reward, done = inter.apply_dir(direction)
-                step_i += 1
-
-                if done:
-                    paused = True
-                    break
+            advance(step_per_frame)
 
         # draw
         env.draw_board(screen)
@@ -202,7 +193,7 @@ def replay_episode_pygame(
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("model", help="ex: train/10000000-v6.pkl")
+    ap.add_argument("model", help="ex: train/10000000-v6.qbin (ou .pkl)")
     ap.add_argument("--fps", type=int, default=60)
     ap.add_argument(
         "--spf", type=int, default=1, help="steps per frame (autoplay speed)"
@@ -233,21 +224,33 @@ def main():
         help="tie-break déterministe (pas de random sur égalités)",
     )
 
+    # Ancien mode RNG: random.seed(seed) global + spawns de l'ancien freeTiles
+    ap.add_argument(
+        "--legacy-seed",
+        action="store_true",
+        help="graine globale (ancien comportement); auto pour les replays sans champ 'rng'",
+    )
+
+    # Plateau (le modèle ne dépend pas de la taille: features binnées)
+    add_board_args(ap)
+
     # Record/replay file
     ap.add_argument("--save-replay", type=str, default="replay_min3.json")
     ap.add_argument("--load-replay", type=str, default=None)
 
     args = ap.parse_args()
+    board = board_config(args)
 
     p = Path(args.model)
     if not p.exists():
         raise FileNotFoundError(f"Modèle introuvable: {p}")
 
     agent = Agent(eps_start=0.0, eps_end=0.0, eps_decay_steps=1)
-    agent.load(p)
+    agent.load(p, readonly=True)
     print(f"[LOAD] {p} | packed_states={len(agent.registre)}")
     print(f"[MAP CHECK] intDir(0..3) = {[intDir(i) for i in range(4)]}")
     print(f"[AGENT] use_mirror={getattr(agent, 'use_mirror', False)}")
+    policy = compile_policy(agent.registre, agent.use_mirror)
 
     # 1) Load replay file
     if args.load_replay:
@@ -255,14 +258,19 @@ def main():
         data = json.loads(rp.read_text())
         seed = int(data["seed"])
         actions = list(map(int, data.get("actions", [])))
-        print(f"[REPLAY LOAD] {rp} seed={seed} actions={len(actions)}")
+        # replays enregistrés avant les flux par partie: pas de champ "rng"
+        legacy = args.legacy_seed or data.get("rng", "legacy") == "legacy"
+        board = data.get("board", board)
+        print(f"[REPLAY LOAD] {rp} seed={seed} actions={len(actions)} legacy={legacy}")
         replay_episode_pygame(
-            agent,
+            policy,
             seed=seed,
             actions=actions,
             fps=args.fps,
             step_per_frame=args.spf,
             deterministic_tiebreak=args.deterministic,
+            legacy=legacy,
+            board=board,
         )
         return
 
@@ -274,10 +282,12 @@ def main():
         for k in range(args.tries):
             seed = args.start_seed + k
             final_len, actions = run_episode_headless(
-                agent,
+                policy,
                 seed=seed,
                 max_steps=args.max_steps,
                 deterministic_tiebreak=args.deterministic,
+                legacy=args.legacy_seed,
+                board=board,
             )
             if final_len == 3:
                 best_seed = seed
@@ -292,42 +302,56 @@ def main():
         # save replay (actions are ENV actions 0..3)
         out = Path(args.save_replay)
         out.write_text(
-            json.dumps({"seed": best_seed, "actions": best_actions}, indent=2)
+            json.dumps(
+                {
+                    "seed": best_seed,
+                    "rng": "legacy" if args.legacy_seed else "env",
+                    "board": board,
+                    "actions": best_actions,
+                },
+                indent=2,
+            )
         )
         print(f"[REPLAY SAVE] {out}")
 
         # visualize
         replay_episode_pygame(
-            agent,
+            policy,
             seed=best_seed,
             actions=best_actions,
             fps=args.fps,
             step_per_frame=args.spf,
             deterministic_tiebreak=args.deterministic,
+            legacy=args.legacy_seed,
+            board=board,
         )
         return
 
     # 3) Replay a specific seed (compute actions live)
     if args.seed is not None:
         replay_episode_pygame(
-            agent,
+            policy,
             seed=args.seed,
             actions=None,  # calcule en live (mais reproductible via seed)
             fps=args.fps,
             step_per_frame=args.spf,
             deterministic_tiebreak=args.deterministic,
+            legacy=args.legacy_seed,
+            board=board,
         )
         return
 
     # 4) Default: just run a random seed replay
     seed = random.randint(0, 10**9)
     replay_episode_pygame(
-        agent,
+        policy,
         seed=seed,
         actions=None,
         fps=args.fps,
         step_per_frame=args.spf,
         deterministic_tiebreak=args.deterministic,
+        legacy=args.legacy_seed,
+        board=board,
     )
 
 
@@ -1,57 +1,21 @@
 # play_1000.py
 from pathlib import Path
-import sys
+import argparse
 import math
 import random
 import time
 
-from environement import Environment
+from environement import GREEN, RED, Environment, LegacyEnvironment
 from interpreter import Interpreter
 from agent import Agent
-from utils import intDir
+from utils import add_board_args, board_config, episode_seed, intDir
 
 # IMPORTANT (v6):
 # Agent.registre is keyed by packed+canonical INT, not by the raw state tuple.
-# So evaluation must canonicalize+pack the state and read Q-values with that key.
-from agent import _canonical_pack_key, _transform_state, _canon_to_env_action
-
-
-def greedy_action_no_suicide(agent: Agent, state_env) -> int:
-    """
-    Returns an ENV action (0..3) using the v6 packed+canonical Q-table.
-    Also applies the "no suicide at 1 step" filter in the CANONICAL frame.
-    """
-    use_mirror = getattr(agent, "use_mirror", True)
-
-    # canonicalize+pack (same as training)
-    key, (rot_k, mirror) = _canonical_pack_key(state_env, use_mirror=use_mirror)
-    state_can = _transform_state(state_env, rot_k, mirror)
-
-    # Q-values for canonical key
-    values = agent.registre.get(key)
-    if values is None:
-        return 0
-
-    # actions autorisées = pas mur/body à 1 case (computed in CANONICAL frame)
-    allowed_can = []
-    for a_can, dirfeat in enumerate(
-        state_can
-    ):  # (up,right,down,left) in CANONICAL frame
-        wall_bin, green_bin, red_bin, body_bin = dirfeat
-        if wall_bin == 1 or body_bin == 1:
-            continue
-        allowed_can.append(a_can)
-
-    if not allowed_can:
-        allowed_can = [0, 1, 2, 3]  # obligé
-
-    best_v = max(values[a] for a in allowed_can)
-    best = [a for a in allowed_can if values[a] == best_v]
-    a_can = random.choice(best)  # or best[0] if you want deterministic
-
-    # map canonical action back to ENV action
-    a_env = _canon_to_env_action(a_can, rot_k, mirror)
-    return a_env
+# Evaluation compiles it into a CompiledPolicy (policy.py): canonicalize+pack
+# the state, then one lookup gives the argmax actions for the "no suicide at
+# 1 step" mask (computed in the CANONICAL frame), tie broken by env.rng.choice.
+from policy import compile_policy
 
 
 def evaluate(
@@ -60,24 +24,38 @@ def evaluate(
     max_steps_per_ep: int = 10_000,
     seed: int | None = 0,
     render_progress_every: int = 100,
+    legacy: bool = False,
+    **board,
 ):
+    """
+    Episode ep joue avec la graine episode_seed(seed, ep) (flux propre à l'env):
+    chaque partie est reproductible seule, quel que soit l'ordre d'évaluation.
+    legacy: ancien mode, random.seed(seed) global une fois pour tout le run.
+    board: height/width/n_green/n_red/snake_start_len (Environment).
+    """
     p = Path(model_path)
     if not p.exists():
         raise FileNotFoundError(f"Modèle introuvable: {p}")
 
-    if seed is not None:
-        random.seed(seed)
-
-    env = Environment()
-    inter = Interpreter(env)
+    if legacy:
+        if seed is not None:
+            random.seed(seed)
+        env = LegacyEnvironment(**board)
+    else:
+        env = Environment(**board)
 
     # Agent en mode "evaluation": pas d'epsilon, pas d'update
     agent = Agent(eps_start=0.0, eps_end=0.0, eps_decay_steps=1, seed=seed)
-    agent.load(p)
+    if legacy and seed is not None:
+        # l'ancien Agent(seed=...) refaisait random.seed(seed) après l'env
+        random.seed(seed)
+    agent.load(p, readonly=True)
 
     print(f"[LOAD] {p} | packed_states={len(agent.registre)}")
     print(f"[MAP CHECK] intDir(0..3) = {[intDir(i) for i in range(4)]}")
     print(f"[AGENT] use_mirror={getattr(agent, 'use_mirror', True)}")
+    policy = compile_policy(agent.registre, agent.use_mirror)
+    inter = Interpreter(env, use_mirror=agent.use_mirror)
 
     results = []
     greens = []
@@ -87,19 +65,17 @@ def evaluate(
     start = time.perf_counter()
 
     for ep in range(1, episodes + 1):
-        env.reset_game()
+        inter.reset_game(None if legacy or seed is None else episode_seed(seed, ep))
+        key, rot_k, mirror = inter.observe_key()
         ep_green = 0
         ep_red = 0
 
         for _ in range(max_steps_per_ep):
-            state = inter.get_state()
-            action_env = greedy_action_no_suicide(agent, state)
-            direction = intDir(action_env)
-
-            reward, done = inter.apply_dir(direction)
-            if reward == 10:
+            action_env = policy.act_key(key, rot_k, mirror, rng=env.rng)
+            reward, done, key, rot_k, mirror = inter.transition(action_env)
+            if inter.last_code == GREEN:
                 ep_green += 1
-            elif reward == -10:
+            elif inter.last_code == RED:
                 ep_red += 1
 
             if done:
@@ -143,12 +119,22 @@ def evaluate(
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python play_1000.py train/10000000-v6.pkl [episodes] [max_steps]")
-        sys.exit(1)
-
-    model = sys.argv[1]
-    episodes = int(sys.argv[2]) if len(sys.argv) >= 3 else 1000
-    max_steps = int(sys.argv[3]) if len(sys.argv) >= 4 else 10_000
-
-    evaluate(model, episodes=episodes, max_steps_per_ep=max_steps)
+    ap = argparse.ArgumentParser(
+        usage="python play_1000.py train/10000000-v6.qbin [episodes] [max_steps] [options]"
+    )
+    ap.add_argument("model")
+    ap.add_argument("episodes", type=int, nargs="?", default=1000)
+    ap.add_argument("max_steps", type=int, nargs="?", default=10_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--legacy-seed", action="store_true", help="ancien mode random.seed global")
+    add_board_args(ap)
+    args = ap.parse_args()
+
+    evaluate(
+        args.model,
+        episodes=args.episodes,
+        max_steps_per_ep=args.max_steps,
+        seed=args.seed,
+        legacy=args.legacy_seed,
+        **board_config(args),
+    )
@@ -0,0 +1,91 @@
+# policy.py
+"""
+Compiled greedy policy: a trained Q-table frozen into a per-key lookup.
+
+For every canonical key we store, for each of the 16 canonical safe-action
+masks, the bitmask of argmax actions. Evaluation is then one dict lookup,
+two tuple lookups and the action remap: no Q-values read, no max, no ties list.
+"""
+import random
+from typing import Dict
+
+import numpy as np
+
+from agent import (
+    CANON_TO_ENV,
+    SAFE_CAN_MASK,
+    StateType,
+    _canonicalize,
+    _safe_can_mask,
+    _safe_mask,
+)
+
+# BITS_TO_ACTIONS[bits] = actions (ascending) set in a 4-bit mask
+BITS_TO_ACTIONS = tuple(tuple(a for a in range(4) if bits >> a & 1) for bits in range(16))
+
+
+def best_action_bits(q: np.ndarray) -> np.ndarray:
+    """(n, 4) Q-values -> (n, 16) uint8: argmax bitmask for each allowed mask."""
+    q = np.asarray(q, dtype=np.float32)
+    out = np.zeros((len(q), 16), dtype=np.uint8)
+    weights = np.array([1, 2, 4, 8], dtype=np.uint8)
+    for mask in range(16):
+        allowed = np.array([mask >> a & 1 for a in range(4)], dtype=bool)
+        qm = np.where(allowed, q, -np.inf)
+        best = qm == qm.max(axis=1, keepdims=True)
+        out[:, mask] = (best & allowed) @ weights
+    return out
+
+
+class CompiledPolicy:
+    """
+    Frozen greedy policy (read-only). Same choices as the Q-table greedy
+    evaluation in play.py / play_1000.py, including random tie-breaking
+    (same rng.choice on the same ascending ties list).
+    """
+
+    def __init__(self, keys: np.ndarray, bits: np.ndarray, use_mirror: bool):
+        self.keys = keys
+        self.bits = bits
+        self.use_mirror = use_mirror
+        # key -> 16 bytes (bits per canonical mask)
+        self._rows: Dict[int, bytes] = dict(
+            zip(keys.tolist(), (row.tobytes() for row in bits))
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def act(self, state_env: StateType, deterministic: bool = False, rng=None) -> int:
+        """
+        Action in ENV frame; 0 for an unseen state (like the old evaluators).
+        rng: tie-break stream (e.g. env.rng); None = global random module.
+        """
+        key, t = _canonicalize(state_env, self.use_mirror)
+        row = self._rows.get(key)
+        if row is None:
+            return 0
+        best = BITS_TO_ACTIONS[row[SAFE_CAN_MASK[t][_safe_mask(state_env)]]]
+        a_can = best[0] if deterministic else (rng or random).choice(best)
+        return CANON_TO_ENV[t][a_can]
+
+    def act_key(
+        self, key: int, rot_k: int, mirror: bool, deterministic: bool = False, rng=None
+    ) -> int:
+        """act() for a packed canonical key (Interpreter.transition / observe_key)."""
+        row = self._rows.get(key)
+        if row is None:
+            return 0
+        # mask 0 (nothing safe) reads column 0 = column 15, like SAFE_CAN
+        best = BITS_TO_ACTIONS[row[_safe_can_mask(key)]]
+        a_can = best[0] if deterministic else (rng or random).choice(best)
+        return CANON_TO_ENV[rot_k + 4 * mirror][a_can]
+
+
+def compile_policy(table, use_mirror: bool) -> CompiledPolicy:
+    """QTable / FrozenQTable -> CompiledPolicy."""
+    keys, q = table.arrays()
+    # mask 0 (no safe action) means "all actions allowed", like SAFE_CAN
+    bits = best_action_bits(q)
+    bits[:, 0] = bits[:, 15]
+    return CompiledPolicy(keys, bits, use_mirror)
@@ -0,0 +1,545 @@
+# qtable.py
+import math
+import random
+import threading
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+N_ACTIONS = 4
+
+# stockage des Q-values (q_dtype)
+Q_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+# slot libre dans `keys` (les clés packées base-5 sont toujours >= 0)
+EMPTY = -1
+
+# Fibonacci hashing: (key * 2^64/phi) mod 2^64, on garde les bits de poids fort
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+class QTable:
+    """
+    Q-table compacte en adressage ouvert (linear probing).
+
+    - keys:   int64 (capacity,), EMPTY pour une case libre
+    - q:      (capacity, 4) en float32, float16 ou int8 (q_dtype, voir plus bas)
+    - dirty:  bool, slots modifiés/insérés depuis le dernier take_dirty()
+              (checkpoints incrémentaux, voir checkpoint.py)
+    - counts: uint32, nombre de mises à jour par clé (visites)
+    - stamps: uint32, horloge de la dernière mise à jour (self.clock)
+    - _tombstones: clés évincées depuis le dernier take_dirty() (les deltas les
+              écrivent avec une ligne NaN, checkpoint.compact les retire)
+
+    Même sémantique que l'ancien defaultdict(lambda: array("f", [0.0] * 4)):
+    table[key] / slot(key) créent une ligne à zéro si la clé est absente,
+    find(key) / get(key) ne créent rien (une clé absente vaut 0 partout).
+    Les index de slot restent valides jusqu'à la prochaine insertion
+    (croissance ou éviction = rehash).
+
+    Mémoire bornée: max_entries fixe la capacité une fois pour toutes; quand
+    la table est pleine, une insertion évince d'abord evict_frac des entrées,
+    les moins visitées (evict="visits", compteurs divisés par 2 ensuite) ou
+    les moins récemment mises à jour (evict="lru").
+
+    q_dtype="int8": valeur = q * q_scale, arrondi stochastique à l'écriture
+    (sans biais, sinon les petites mises à jour alpha * td disparaissent).
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1024,
+        max_load: float = 0.6,
+        max_entries: Optional[int] = None,
+        evict: str = "visits",
+        evict_frac: float = 0.1,
+        q_dtype: str = "float32",
+        q_scale: float = 1.0,
+        seed: Optional[int] = None,
+    ):
+        if q_dtype not in Q_DTYPES:
+            raise ValueError(f"q_dtype inconnu: {q_dtype} ({'/'.join(Q_DTYPES)})")
+        if evict not in ("visits", "lru"):
+            raise ValueError(f"evict inconnu: {evict} (visits/lru)")
+
+        self.max_load = max_load
+        self.max_entries = max_entries
+        self.evict = evict
+        self.evict_frac = evict_frac
+        self.q_dtype = q_dtype
+        self.q_scale = q_scale
+        self._int8 = q_dtype == "int8"
+        # arrondi stochastique int8 (scalaire / vectorisé)
+        self._rng = random.Random(seed)
+        self._np_rng = np.random.default_rng(seed)
+
+        self.size = 0
+        self.clock = 0
+        self.evicted = 0
+        self.generation = 0  # +1 à chaque rehash (les slots en cache deviennent invalides)
+        self._tombstones = np.empty(0, dtype=np.int64)
+        if max_entries is not None:
+            capacity = int(max_entries / max_load) + 1
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int) -> None:
+        cap = 1 << max(4, (capacity - 1).bit_length())
+        self.capacity = cap
+        self._mask = cap - 1
+        self._shift = 64 - (cap.bit_length() - 1)
+        self._grow_at = int(cap * self.max_load)
+        self.keys = np.full(cap, EMPTY, dtype=np.int64)
+        self.q = np.zeros((cap, N_ACTIONS), dtype=Q_DTYPES[self.q_dtype])
+        self.dirty = np.zeros(cap, dtype=bool)
+        self.counts = np.zeros(cap, dtype=np.uint32)
+        self.stamps = np.zeros(cap, dtype=np.uint32)
+
+    # ---------- hashing ----------
+    def _hash(self, key: int) -> int:
+        return ((key * _GOLDEN) & _MASK64) >> self._shift
+
+    def _hash_many(self, keys: np.ndarray) -> np.ndarray:
+        h = keys.astype(np.uint64) * np.uint64(_GOLDEN)  # wrap mod 2^64
+        return (h >> np.uint64(self._shift)).astype(np.int64)
+
+    # ---------- stockage (float32 / float16 / int8) ----------
+    def _decode(self, raw: np.ndarray) -> np.ndarray:
+        if self._int8:
+            return raw.astype(np.float32) * np.float32(self.q_scale)
+        return raw.astype(np.float32)
+
+    def _encode(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        if self._int8:
+            noise = self._np_rng.random(values.shape)
+            return np.clip(np.floor(values / self.q_scale + noise), -127, 127).astype(
+                np.int8
+            )
+        return values.astype(self.q.dtype)
+
+    # ---------- scalar access (hot path) ----------
+    def find(self, key: int) -> int:
+        """Slot de `key`, ou -1 si absente (n'insère rien)."""
+        keys = self.keys
+        mask = self._mask
+        i = self._hash(key)
+        while True:
+            k = keys[i]
+            if k == key:
+                return i
+            if k == EMPTY:
+                return -1
+            i = (i + 1) & mask
+
+    def slot(self, key: int) -> int:
+        """Slot de `key`, en insérant une ligne à zéro si absente."""
+        keys = self.keys
+        mask = self._mask
+        i = self._hash(key)
+        while True:
+            k = keys[i]
+            if k == key:
+                return i
+            if k == EMPTY:
+                break
+            i = (i + 1) & mask
+
+        if self.max_entries is not None and self.size >= self.max_entries:
+            self._evict()
+            return self.slot(key)
+        if self.size + 1 > self._grow_at:
+            self._grow()
+            return self.slot(key)
+
+        keys[i] = key
+        self.dirty[i] = True
+        self.size += 1
+        return i
+
+    def values(self, slot: int) -> list:
+        """Les 4 Q-values d'un slot en floats Python."""
+        if self._int8:
+            s = self.q_scale
+            return [v * s for v in self.q[slot].tolist()]
+        return self.q[slot].tolist()
+
+    def value(self, slot: int, action: int) -> float:
+        if self._int8:
+            return int(self.q[slot, action]) * self.q_scale
+        return float(self.q[slot, action])
+
+    def max_value(self, slot: int) -> float:
+        return max(self.values(slot))
+
+    def set_value(self, slot: int, action: int, value: float) -> None:
+        if self._int8:
+            value = min(127, max(-127, math.floor(value / self.q_scale + self._rng.random())))
+        self.q[slot, action] = value
+        self.dirty[slot] = True
+        self.counts[slot] += 1
+        self.stamps[slot] = self.clock
+        self.clock += 1
+
+    # ---------- vectorized access ----------
+    def find_many(self, keys: np.ndarray) -> np.ndarray:
+        """Slots de `keys` (int64), -1 pour les absentes."""
+        keys = np.asarray(keys, dtype=np.int64)
+        out = np.full(keys.shape, -1, dtype=np.int64)
+        pos = self._hash_many(keys)
+        idx = np.arange(keys.size)
+        while idx.size:
+            k = self.keys[pos[idx]]
+            hit = k == keys[idx]
+            out[idx[hit]] = pos[idx[hit]]
+            idx = idx[~hit & (k != EMPTY)]
+            pos[idx] = (pos[idx] + 1) & self._mask
+        return out
+
+    def values_many(self, keys: np.ndarray) -> np.ndarray:
+        """(N, 4) float32 Q-values de `keys`, 0 pour les absentes (n'insère rien)."""
+        slots = self.find_many(keys)
+        out = self._decode(self.q[slots])
+        out[slots < 0] = 0.0
+        return out
+
+    def slot_many(self, keys: np.ndarray) -> np.ndarray:
+        """Slots de `keys` (int64), en insérant les absentes à zéro."""
+        keys = np.asarray(keys, dtype=np.int64)
+        slots = self.find_many(keys)
+        missing = slots < 0
+        if missing.any():
+            new_keys = np.unique(keys[missing])
+            if self.max_entries is not None and self.size + new_keys.size > self.max_entries:
+                # les clés du batch ne sont jamais évincées: elles doivent tenir ensemble
+                n_batch = np.unique(keys).size
+                if n_batch > self.max_entries:
+                    raise ValueError(
+                        f"Batch de {n_batch} clés distinctes > max_entries={self.max_entries}"
+                    )
+                while self.size + new_keys.size > self.max_entries:
+                    self._evict(protect=keys)
+            while self.size + new_keys.size > self._grow_at:
+                self._grow()
+            new_slots = self._place(new_keys)
+            self.dirty[new_slots] = True
+            self.size += new_keys.size
+            slots = self.find_many(keys)
+        return slots
+
+    def backup_many(
+        self, slots: np.ndarray, actions: np.ndarray, targets: np.ndarray, alpha: float
+    ) -> None:
+        """
+        Q[s, a] += alpha * (target - Q[s, a]) pour tout le batch d'un coup.
+        Paires (slot, action) en double: on prend la moyenne de leurs targets.
+        """
+        flat = slots * N_ACTIONS + actions
+        q_flat = self.q.reshape(-1)
+        uniq, inv = np.unique(flat, return_inverse=True)
+        mean_target = np.bincount(inv, weights=targets) / np.bincount(inv)
+        q_sa = self._decode(q_flat[uniq]).astype(np.float64)
+        q_flat[uniq] = self._encode(q_sa + alpha * (mean_target - q_sa))
+
+        touched = uniq // N_ACTIONS
+        self.dirty[touched] = True
+        self.counts[touched] += 1
+        self.stamps[touched] = self.clock
+        self.clock += 1
+
+    def add_many(self, slots: np.ndarray, actions: np.ndarray, deltas: np.ndarray) -> None:
+        """Q[s, a] += delta, paires (slot, action) distinctes."""
+        flat = slots * N_ACTIONS + actions
+        q_flat = self.q.reshape(-1)
+        q_flat[flat] = self._encode(self._decode(q_flat[flat]).astype(np.float64) + deltas)
+
+        self.dirty[slots] = True
+        self.counts[slots] += 1
+        self.stamps[slots] = self.clock
+        self.clock += 1
+
+    # ---------- placement / croissance / éviction ----------
+    def _place(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Réserve un slot pour chaque clé (distinctes et absentes, la capacité
+        doit suffire). Écrit keys, remet la ligne à zéro, renvoie les slots.
+        """
+        pos = self._hash_many(keys)
+        out = np.empty(keys.size, dtype=np.int64)
+        idx = np.arange(keys.size)
+        taken = np.zeros(keys.size, dtype=bool)
+        while idx.size:
+            p = pos[idx]
+            free = self.keys[p] == EMPTY
+            # plusieurs candidates pour la même case vide: la première gagne
+            _, first = np.unique(p[free], return_index=True)
+            win = idx[free][first]
+            self.keys[pos[win]] = keys[win]
+            out[win] = pos[win]
+            taken[win] = True
+            idx = idx[~taken[idx]]
+            pos[idx] = (pos[idx] + 1) & self._mask
+        self.q[out] = 0
+        self.counts[out] = 0
+        self.stamps[out] = 0
+        return out
+
+    def _rebuild(self, keep: np.ndarray, capacity: int) -> None:
+        """Réalloue à `capacity` et réinsère les slots `keep` (rehash)."""
+        keys = self.keys[keep]
+        q = self.q[keep]
+        dirty = self.dirty[keep]
+        counts = self.counts[keep]
+        stamps = self.stamps[keep]
+        self._alloc(capacity)
+        slots = self._place(keys)
+        self.q[slots] = q
+        self.dirty[slots] = dirty
+        self.counts[slots] = counts
+        self.stamps[slots] = stamps
+        self.size = keys.size
+        self.generation += 1
+
+    def _grow(self) -> None:
+        self._rebuild(np.flatnonzero(self.keys != EMPTY), self.capacity * 2)
+
+    def _evict(self, protect: Optional[np.ndarray] = None) -> None:
+        """
+        Retire evict_frac des entrées (moins visitées / plus anciennes), au moins
+        une. Les clés `protect` (batch en cours) ne sont jamais évincées.
+        """
+        occupied = np.flatnonzero(self.keys != EMPTY)
+        if protect is not None:
+            occupied = occupied[~np.isin(self.keys[occupied], protect)]
+        if not occupied.size:
+            raise ValueError(f"Rien à évincer: toutes les clés sont protégées ({self.size})")
+        score = (self.counts if self.evict == "visits" else self.stamps)[occupied]
+        n_drop = min(occupied.size, max(1, int(self.size * self.evict_frac)))
+        drop = np.argpartition(score, n_drop - 1)[:n_drop]
+        self._tombstones = np.concatenate((self._tombstones, self.keys[occupied[drop]]))
+        keep = np.flatnonzero(self.keys != EMPTY)
+        keep = keep[~np.isin(keep, occupied[drop])]
+        self._rebuild(keep, self.capacity)
+        self.evicted += n_drop
+        if self.evict == "visits":
+            self.counts >>= 1  # vieillissement: les vieux gros compteurs finissent par céder
+
+    # ---------- dict-like API (save/load, play scripts) ----------
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, key: int) -> bool:
+        return self.find(key) >= 0
+
+    def __getitem__(self, key: int) -> np.ndarray:
+        i = self.slot(key)  # avant de lire self.q: une insertion peut réallouer
+        return self._decode(self.q[i])
+
+    def __setitem__(self, key: int, values) -> None:
+        i = self.slot(key)
+        self.q[i] = self._encode(values)
+        self.dirty[i] = True
+        self.counts[i] += 1
+        self.stamps[i] = self.clock
+        self.clock += 1
+
+    def get(self, key: int, default=None) -> Optional[np.ndarray]:
+        i = self.find(key)
+        return default if i < 0 else self._decode(self.q[i])
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.keys[self.keys != EMPTY].tolist())
+
+    def items(self) -> Iterator[Tuple[int, np.ndarray]]:
+        for i in np.flatnonzero(self.keys != EMPTY).tolist():
+            yield int(self.keys[i]), self._decode(self.q[i])
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Copie compacte (keys, q float32) des entrées occupées."""
+        occupied = self.keys != EMPTY
+        return self.keys[occupied].copy(), self._decode(self.q[occupied])
+
+    def take_dirty(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Copie (keys, q float32) des entrées modifiées depuis l'appel précédent, puis reset.
+        Les clés évincées entre-temps (et pas réinsérées) suivent avec une ligne NaN.
+        """
+        idx = np.flatnonzero(self.dirty)
+        self.dirty[idx] = False
+        keys, q = self.keys[idx], self._decode(self.q[idx])
+        gone = np.unique(self._tombstones)
+        gone = gone[self.find_many(gone) < 0]
+        self._tombstones = np.empty(0, dtype=np.int64)
+        if gone.size:
+            keys = np.concatenate((keys, gone))
+            q = np.concatenate((q, np.full((gone.size, N_ACTIONS), np.nan, dtype=np.float32)))
+        return keys, q
+
+    def clear_dirty(self) -> None:
+        self.dirty[:] = False
+        self._tombstones = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_arrays(
+        cls, keys: np.ndarray, q: np.ndarray, counts: Optional[np.ndarray] = None, **options
+    ) -> "QTable":
+        """
+        Table remplie avec (keys distinctes, q float); options = kwargs de QTable.
+        counts: visites par clé (reprises). Plus de clés que max_entries: on garde
+        les max_entries plus visitées (ValueError sans counts pour choisir).
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        max_entries = options.get("max_entries")
+        n_drop = 0
+        if max_entries is not None and keys.size > max_entries:
+            if counts is None:
+                raise ValueError(
+                    f"{keys.size} clés > max_entries={max_entries} (sans visites pour choisir)"
+                )
+            n_drop = keys.size - max_entries
+            keep = np.argpartition(counts, n_drop)[n_drop:]
+            keys, q, counts = keys[keep], np.asarray(q)[keep], np.asarray(counts)[keep]
+        max_load = options.get("max_load", 0.6)
+        options.setdefault("capacity", int(keys.size / max_load) + 1)
+        table = cls(**options)
+        while keys.size > table._grow_at:
+            table._alloc(table.capacity * 2)
+        slots = table._place(keys)
+        table.q[slots] = table._encode(q)
+        if counts is not None:
+            table.counts[slots] = counts
+        table.size = keys.size
+        table.evicted = n_drop
+        return table
+
+    def nbytes(self) -> int:
+        return (
+            self.keys.nbytes
+            + self.q.nbytes
+            + self.dirty.nbytes
+            + self.counts.nbytes
+            + self.stamps.nbytes
+        )
+
+
+class ConcurrentQTable(QTable):
+    """
+    QTable float32 à capacité fixe, partagée entre plusieurs écrivains (hogwild.py).
+
+    Lectures et mises à jour Q sans lock (courses bénignes sur les float32:
+    une mise à jour peut en écraser une autre). Seule l'insertion d'une
+    nouvelle clé prend `lock`, donc une clé n'est jamais stockée deux fois.
+    Pas de rehash (il invaliderait les slots des autres écrivains): une table
+    pleine lève RuntimeError.
+    """
+
+    def __init__(self, capacity: int = 1 << 18, max_load: float = 0.75, lock=None):
+        super().__init__(capacity, max_load)
+        self._lock = lock if lock is not None else threading.Lock()
+
+    def slot(self, key: int) -> int:
+        """QTable.slot: lecture sans lock, insertion sous lock."""
+        keys = self.keys
+        mask = self._mask
+        i = self._hash(key)
+        while True:
+            k = keys[i]
+            if k == key:
+                return i
+            if k == EMPTY:
+                break
+            i = (i + 1) & mask
+        with self._lock:
+            return self._insert(key)
+
+    def _insert(self, key: int) -> int:
+        # re-sonde: un autre écrivain a pu insérer entre-temps
+        keys = self.keys
+        i = self._hash(key)
+        while True:
+            k = keys[i]
+            if k == key:
+                return i
+            if k == EMPTY:
+                break
+            i = (i + 1) & self._mask
+        if self.size + 1 > self._grow_at:
+            self._grow()
+        # ligne déjà à zéro (les slots ne sont jamais réutilisés)
+        keys[i] = key
+        self.dirty[i] = True
+        self.size += 1
+        return i
+
+    def slot_many(self, keys: np.ndarray) -> np.ndarray:
+        with self._lock:
+            return super().slot_many(keys)
+
+    def fill(self) -> float:
+        """Remplissage: clés / clés max (capacity * max_load, au-delà: RuntimeError)."""
+        return self.size / self._grow_at
+
+    def _grow(self) -> None:
+        raise RuntimeError(
+            f"{type(self).__name__} pleine ({self.size} clés, capacity={self.capacity}): "
+            "augmenter capacity (train.py --capacity)"
+        )
+
+    def _evict(self, protect: Optional[np.ndarray] = None) -> None:
+        self._grow()
+
+
+class FrozenQTable:
+    """
+    Q-table lecture seule: keys triées (int64) + q (n, 4) float32.
+
+    Pensée pour des np.memmap (checkpoint.py): aucune copie au chargement,
+    lookup par recherche dichotomique. Même API de lecture que QTable.
+    """
+
+    def __init__(self, keys: np.ndarray, q: np.ndarray):
+        self.keys = keys
+        self.q = q
+        self.size = len(keys)
+
+    def find(self, key: int) -> int:
+        i = int(self.keys.searchsorted(key))
+        if i < self.size and self.keys[i] == key:
+            return i
+        return -1
+
+    def find_many(self, keys: np.ndarray) -> np.ndarray:
+        keys = np.asarray(keys, dtype=np.int64)
+        idx = self.keys.searchsorted(keys)
+        idx[idx >= self.size] = 0
+        hit = self.keys[idx] == keys if self.size else np.zeros(keys.shape, bool)
+        return np.where(hit, idx, -1)
+
+    def values(self, slot: int) -> list:
+        return self.q[slot].tolist()
+
+    def max_value(self, slot: int) -> float:
+        return max(self.q[slot].tolist())
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, key: int) -> bool:
+        return self.find(key) >= 0
+
+    def get(self, key: int, default=None) -> Optional[np.ndarray]:
+        i = self.find(key)
+        return default if i < 0 else self.q[i]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.keys.tolist())
+
+    def items(self) -> Iterator[Tuple[int, np.ndarray]]:
+        for i, k in enumerate(self.keys.tolist()):
+            yield k, self.q[i]
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        return np.array(self.keys), np.array(self.q)
+
+    def nbytes(self) -> int:
+        return self.keys.nbytes + self.q.nbytes
@@ -0,0 +1,59 @@
+# replay.py
+"""
+Experience replay: preallocated NumPy ring buffer of packed transitions
+(key, canonical action, reward, next key, done).
+
+Keys are stored (not table slots): slots move when the Q-table rehashes or
+evicts, keys don't.
+"""
+import numpy as np
+
+
+class ReplayBuffer:
+    def __init__(self, capacity: int, seed=None):
+        self.capacity = max(1, capacity)
+        self.keys = np.zeros(self.capacity, dtype=np.int64)
+        self.actions = np.zeros(self.capacity, dtype=np.int8)
+        self.rewards = np.zeros(self.capacity, dtype=np.float64)
+        self.next_keys = np.zeros(self.capacity, dtype=np.int64)
+        self.dones = np.zeros(self.capacity, dtype=bool)
+        self.head = 0  # next write position
+        self.size = 0
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def push(self, key: int, action: int, reward: float, next_key: int, done: bool) -> None:
+        i = self.head
+        self.keys[i] = key
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_keys[i] = next_key
+        self.dones[i] = done
+        self.head = (i + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def push_many(self, keys, actions, rewards, next_keys, dones) -> None:
+        """Batch push (register_batch / update_batch path)."""
+        n = len(keys)
+        idx = (self.head + np.arange(n)) % self.capacity
+        self.keys[idx] = keys
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_keys[idx] = next_keys
+        self.dones[idx] = dones
+        self.head = int((self.head + n) % self.capacity)
+        self.size = min(self.capacity, self.size + n)
+
+    def sample(self, batch: int):
+        """Uniform minibatch (with replacement): (keys, actions, rewards, next_keys, dones)."""
+        idx = self.rng.integers(0, self.size, size=batch)
+        return (
+            self.keys[idx],
+            self.actions[idx].astype(np.int64),
+            self.rewards[idx].astype(np.float64),
+            self.next_keys[idx],
+            self.dones[idx],
+        )
@@ -0,0 +1,282 @@
+# sweep.py
+"""
+Hyperparameter sweep over Agent arguments and Interpreter rewards.
+
+Each parameter is given as name=spec:
+  name=0.2               fixed value
+  name=0.1,0.2,0.3       list (grid axis, or uniform choice with --random)
+  name=0.05:0.5          uniform range (--random only; ints if both bounds are ints)
+  name=1e5:5e6:log       log-uniform range (--random only)
+Names are Agent constructor arguments (alpha, gamma, eps_start, eps_end,
+eps_decay_steps, use_mirror, learner, n_step, ...) or rewards of
+Interpreter(rewards=...): step, death, green, red, shape. Anything not given
+keeps the train.py value (train.AGENT_ARGS, interpreter.REWARD_DEFAULTS).
+
+Runs go to a process pool, all with the same seed (same games for every
+config). Successive halving: with --rungs R and --eta E, every config first
+trains steps / E^(R-1) steps; only the best 1/E (avgLen over the last
+--window steps) continue to the next budget, E times larger, and so on up to
+--steps. A run resumes where it stopped (its Agent/Interpreter are pickled
+between rungs). --time caps the wall-clock seconds of a run at full budget
+(scaled down for the earlier rungs).
+
+Results: one table (stdout + CSV) of avgLen, steps/s, states and the rung at
+which each run was stopped.
+
+Usage:
+  python sweep.py alpha=0.1,0.2,0.4 gamma=0.9,0.95 --steps 2000000 --rungs 3
+  python sweep.py alpha=0.05:0.5 eps_decay_steps=1e5:4e6:log shape=0,0.2 --random 27
+"""
+import argparse
+import csv
+import inspect
+import itertools
+import math
+import multiprocessing as mp
+import os
+import pickle
+import random
+import time
+from pathlib import Path
+from typing import Optional
+
+from agent import Agent
+from environement import Environment
+from interpreter import REWARD_DEFAULTS, Interpreter
+from train import AGENT_ARGS, RunStats, run_steps
+from utils import add_board_args, board_config
+
+# arguments d'Agent réglables (seed / rng: fixés par le sweep)
+AGENT_PARAMS = tuple(p for p in inspect.signature(Agent).parameters if p not in ("seed", "rng"))
+
+
+def _parse_value(text: str):
+    low = text.lower()
+    if low in ("true", "false"):
+        return low == "true"
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_space(specs: list) -> dict:
+    """["alpha=0.1,0.2", "gamma=0.9:0.99"] -> {name: list | ("uniform"|"log", lo, hi)}."""
+    space = {}
+    for spec in specs:
+        name, sep, value = spec.partition("=")
+        if not sep:
+            raise ValueError(f"Bad parameter {spec!r}: expected name=values")
+        if name not in AGENT_PARAMS and name not in REWARD_DEFAULTS:
+            raise ValueError(
+                f"Unknown parameter {name!r}: Agent ({', '.join(AGENT_PARAMS)}) "
+                f"or reward ({', '.join(REWARD_DEFAULTS)})"
+            )
+        if ":" in value:
+            lo, hi, *scale = value.split(":")
+            kind = scale[0] if scale else "uniform"
+            if kind not in ("uniform", "log"):
+                raise ValueError(f"Bad range scale {kind!r} in {spec!r} (uniform/log)")
+            space[name] = (kind, _parse_value(lo), _parse_value(hi))
+        else:
+            space[name] = [_parse_value(v) for v in value.split(",")]
+    return space
+
+
+def _sample(rng: random.Random, dim):
+    if isinstance(dim, list):
+        return rng.choice(dim)
+    kind, lo, hi = dim
+    if kind == "log":
+        v = math.exp(rng.uniform(math.log(lo), math.log(hi)))
+    else:
+        v = rng.uniform(lo, hi)
+    if isinstance(lo, int) and isinstance(hi, int):
+        return int(round(v))
+    return v
+
+
+def configs_from_space(space: dict, n_random: int = 0, seed: int = 0) -> list:
+    """Grille complète (n_random=0, listes seulement) ou n_random tirages."""
+    names = list(space)
+    if n_random <= 0:
+        ranges = [n for n in names if not isinstance(space[n], list)]
+        if ranges:
+            raise ValueError(f"Ranges need --random N: {', '.join(ranges)}")
+        return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+    rng = random.Random(seed)
+    return [{n: _sample(rng, space[n]) for n in names} for _ in range(n_random)]
+
+
+def _split(config: dict) -> tuple[dict, dict]:
+    """config -> (kwargs Agent, rewards Interpreter)."""
+    rewards = {k: v for k, v in config.items() if k in REWARD_DEFAULTS}
+    agent_args = {**AGENT_ARGS, **{k: v for k, v in config.items() if k not in REWARD_DEFAULTS}}
+    return agent_args, rewards
+
+
+def _advance(task: tuple) -> tuple:
+    """
+    Entraîne un run jusqu'à `steps` steps (ou `time_budget` s cumulées).
+    task = (run_id, config, steps, time_budget, window, seed, board, state, keep_state)
+    Returns (run_id, metrics, state) avec state = pickle de la partie en cours (ou None).
+    """
+    run_id, config, steps, time_budget, window, seed, board, state, keep_state = task
+    if state is None:
+        agent_args, rewards = _split(config)
+        env = Environment(seed=seed, **board)
+        agent = Agent(seed=seed, **agent_args)
+        inter = Interpreter(env, use_mirror=agent.use_mirror, rewards=rewards)
+        obs = inter.observe_key()
+        run = RunStats(window=window)  # longueurs des `window` derniers steps
+        elapsed = 0.0
+    else:
+        agent, inter, obs, run, elapsed = pickle.loads(state)
+
+    # boucle de train.py (run_steps), par tranches de 1_000 steps (budget de temps)
+    start = time.perf_counter()
+    while run.step < steps:
+        n = min(1_000 - run.step % 1_000, steps - run.step)
+        obs = run_steps(agent, inter, obs, run, n)
+        if (
+            time_budget
+            and run.step % 1_000 == 0
+            and elapsed + time.perf_counter() - start >= time_budget
+        ):
+            break
+    elapsed += time.perf_counter() - start
+
+    i = run.step
+    metrics = {
+        "steps": i,
+        "avgLen": run.window_avg_len(),
+        "steps_s": i / elapsed if elapsed > 0 else 0.0,
+        "states": len(agent.registre),
+        "seconds": elapsed,
+    }
+    state = None
+    if keep_state:
+        state = pickle.dumps(
+            (agent, inter, obs, run, elapsed),
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    return run_id, metrics, state
+
+
+def sweep(
+    configs: list,
+    steps: int = 2_000_000,
+    rungs: int = 1,
+    eta: int = 3,
+    time_budget: Optional[float] = None,
+    window: int = 50_000,
+    jobs: Optional[int] = None,
+    seed: int = 0,
+    board: Optional[dict] = None,
+    verbose: bool = True,
+) -> list:
+    """
+    Successive halving sur `configs` (rungs=1: chaque config va jusqu'à `steps`).
+    Returns une ligne par run: {"run", **config, **metrics, "stopped"} (stopped =
+    budget de steps du rung où le run a été coupé, None s'il est allé au bout).
+    """
+    board = board or {}
+    budgets = [max(1, round(steps / eta ** (rungs - 1 - r))) for r in range(rungs)]
+    window = min(window, budgets[0])
+    runs = [{"run": i, **c, "stopped": None} for i, c in enumerate(configs)]
+    states: dict = {}
+    alive = list(range(len(configs)))
+
+    with mp.get_context().Pool(jobs or os.cpu_count()) as pool:
+        for r, budget in enumerate(budgets):
+            last = r == rungs - 1
+            run_time = time_budget * budget / steps if time_budget else None
+            tasks = [
+                (i, configs[i], budget, run_time, window, seed, board, states.pop(i, None), not last)
+                for i in alive
+            ]
+            start = time.perf_counter()
+            for run_id, metrics, state in pool.imap_unordered(_advance, tasks):
+                runs[run_id].update(metrics)
+                if state is not None:
+                    states[run_id] = state
+            if verbose:
+                best = max(runs[i]["avgLen"] for i in alive)
+                print(
+                    f"[sweep] rung {r + 1}/{rungs} budget={budget} runs={len(alive)} "
+                    f"best avgLen={best:.2f} ({time.perf_counter() - start:.1f}s)"
+                )
+            if not last:
+                alive.sort(key=lambda i: runs[i]["avgLen"], reverse=True)
+                keep = max(1, math.ceil(len(alive) / eta))
+                for i in alive[keep:]:
+                    runs[i]["stopped"] = budget
+                    states.pop(i, None)
+                alive = alive[:keep]
+    return runs
+
+
+def results_table(runs: list, names: list) -> str:
+    """Tableau texte trié (runs allés le plus loin, puis avgLen)."""
+    cols = ["run", *names, "steps", "avgLen", "steps_s", "states", "stopped"]
+    ordered = sorted(runs, key=lambda row: (-row["steps"], -row["avgLen"]))
+
+    def cell(v) -> str:
+        if isinstance(v, float):
+            return f"{v:.4g}" if abs(v) < 1e4 else f"{v:,.0f}"
+        return "-" if v is None else str(v)
+
+    rows = [cols] + [[cell(row.get(c)) for c in cols] for row in ordered]
+    widths = [max(len(row[j]) for row in rows) for j in range(len(cols))]
+    return "\n".join("  ".join(v.rjust(w) for v, w in zip(row, widths)) for row in rows)
+
+
+def write_csv(path: str | Path, runs: list, names: list) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cols = ["run", *names, "steps", "avgLen", "steps_s", "states", "seconds", "stopped"]
+    with path.open("w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=cols, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(runs)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sweep Agent args / rewards (see module doc)")
+    ap.add_argument("params", nargs="+", help="name=values (a,b,c | lo:hi | lo:hi:log)")
+    ap.add_argument("--random", type=int, default=0, help="N tirages au lieu de la grille")
+    ap.add_argument("--steps", type=int, default=2_000_000, help="budget final par run")
+    ap.add_argument("--time", type=float, default=None, help="secondes max par run (budget final)")
+    ap.add_argument("--rungs", type=int, default=1, help="successive halving: nombre de budgets")
+    ap.add_argument("--eta", type=int, default=3, help="successive halving: garde 1/eta par rung")
+    ap.add_argument("--window", type=int, default=50_000, help="steps pour avgLen")
+    ap.add_argument("--jobs", type=int, default=None, help="process (défaut: nb de CPU)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=str, default="sweep/results.csv")
+    add_board_args(ap)
+    args = ap.parse_args()
+
+    space = parse_space(args.params)
+    configs = configs_from_space(space, args.random, args.seed)
+    print(f"[sweep] {len(configs)} configs, rungs={args.rungs} eta={args.eta} steps={args.steps}")
+    runs = sweep(
+        configs,
+        steps=args.steps,
+        rungs=args.rungs,
+        eta=args.eta,
+        time_budget=args.time,
+        window=args.window,
+        jobs=args.jobs,
+        seed=args.seed,
+        board=board_config(args),
+    )
+    names = list(space)
+    print(results_table(runs, names))
+    write_csv(args.out, runs, names)
+    print(f"[sweep] results -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# tests/test_actor_learner.py
+import queue
+
+import numpy as np
+
+from actor_learner import _COLUMNS, _actor, _empty_policy
+from agent import Agent
+from environement import Environment
+from interpreter import Interpreter
+from train import AGENT_ARGS
+
+
+def test_actor_rewards_reach_the_learner_unrounded():
+    out_q, policy_q = queue.Queue(), queue.Queue()
+    _actor(0, 500, 7, {}, AGENT_ARGS, 200, out_q, policy_q)
+    rewards = []
+    while True:
+        _, cols, _, _ = out_q.get_nowait()
+        if cols is None:
+            break
+        rewards += np.frombuffer(cols[2], dtype=_COLUMNS[2][1]).tolist()
+
+    # même partie en série: récompenses en floats Python (Agent.update_key)
+    env = Environment(seed=7)
+    agent = Agent(seed=7, **AGENT_ARGS)
+    agent.registre = _empty_policy()
+    inter = Interpreter(env, use_mirror=agent.use_mirror)
+    obs = inter.observe_key()
+    expected = []
+    for _ in range(500):
+        reward, done, *obs = inter.transition(agent.register_key(*obs))
+        expected.append(reward)
+        if done:
+            inter.reset_game()
+            obs = inter.observe_key()
+    assert rewards == expected
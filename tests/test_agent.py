@@ -0,0 +1,104 @@
+# tests/test_agent.py
+import random
+
+import numpy as np
+import pytest
+
+from agent import (
+    TRANSFORM_PARAMS,
+    Agent,
+    _canonical_pack_key,
+    _canonical_pack_key_loop,
+    _canonicalize,
+    _canonicalize_batch,
+)
+from environement import BODY, WALL, Environment
+from interpreter import Interpreter
+
+
+def _random_states(n, seed, values=5):
+    # peu de valeurs possibles par direction -> beaucoup d'égalités entre symétries
+    rng = random.Random(seed)
+    dirs = [
+        (rng.randint(1, 4), rng.randrange(5), rng.randrange(5), rng.randrange(5))
+        for _ in range(values)
+    ]
+    return [tuple(rng.choice(dirs) for _ in range(4)) for _ in range(n)]
+
+
+@pytest.mark.parametrize("use_mirror", [False, True])
+def test_canonicalize_matches_reference_loop(use_mirror):
+    states = _random_states(2_000, seed=1) + [((1, 0, 0, 0),) * 4, ((4, 0, 0, 0),) * 4]
+    expected = [_canonical_pack_key_loop(s, use_mirror) for s in states]
+
+    for s, (key, params) in zip(states, expected):
+        k, t = _canonicalize(s, use_mirror)
+        assert (k, TRANSFORM_PARAMS[t]) == (key, params)
+        assert _canonical_pack_key(s, use_mirror) == (key, params)
+
+    keys, t = _canonicalize_batch(np.array(states, dtype=np.int64), use_mirror)
+    assert keys.tolist() == [key for key, _ in expected]
+    assert [TRANSFORM_PARAMS[i] for i in t.tolist()] == [params for _, params in expected]
+
+
+def _game_states(n, seed):
+    """n états (env URDL) pris dans des parties aléatoires."""
+    env = Environment(seed=seed, n_green=3, n_red=2)
+    inter = Interpreter(env)
+    rng = random.Random(seed)
+    states = []
+    while len(states) < n:
+        states.append(inter.get_state())
+        if env.move(rng.randrange(4)) in (BODY, WALL):
+            inter.reset_game()
+    return states
+
+
+@pytest.mark.parametrize("use_mirror", [False, True])
+def test_register_batch_greedy_matches_register(use_mirror):
+    states = _game_states(500, seed=3)
+    agent = Agent(eps_start=0.0, eps_end=0.0, seed=0, use_mirror=use_mirror)
+    rng = np.random.default_rng(0)
+    for s in states:  # Q-values distinctes: pas d'égalité à départager
+        agent.registre[_canonicalize(s, use_mirror)[0]] = rng.normal(size=4)
+
+    actions = agent.register_batch(states)
+    assert actions.tolist() == [agent.register(s) for s in states]
+
+
+def test_update_batch_averages_targets_of_repeated_pairs():
+    agent = Agent(alpha=0.5, gamma=0.9, eps_start=0.0, eps_end=0.0, seed=0)
+    states = _game_states(200, seed=4)
+    rng = np.random.default_rng(1)
+    for s in states:
+        agent.registre[_canonicalize(s, agent.use_mirror)[0]] = rng.normal(size=4)
+    before = {k: v.tolist() for k, v in agent.registre.items()}
+
+    batch = states[:100] + states[:20]  # 20 paires répétées
+    agent.register_batch(batch)
+    keys, actions = agent.lastKeys.tolist(), agent.lastChoices_can.tolist()
+    next_states = states[100:200] + states[150:170]
+    rewards = rng.normal(size=len(batch))
+    dones = rng.random(len(batch)) < 0.2
+    agent.update_batch(rewards, next_states, dones)
+
+    targets: dict = {}
+    for k, a, r, s2, d in zip(keys, actions, rewards, next_states, dones):
+        next_max = 0.0 if d else max(before[_canonicalize(s2, agent.use_mirror)[0]])
+        targets.setdefault((k, a), []).append(r + 0.9 * next_max)
+    for (k, a), ts in targets.items():
+        q = before[k][a]
+        assert agent.registre[k][a] == pytest.approx(q + 0.5 * (np.mean(ts) - q), abs=1e-5)
+    assert agent.step_count == len(batch)
+
+
+@pytest.mark.parametrize("args", [dict(learner="nstep"), dict(learner="qlambda"), dict(plan_steps=5)])
+def test_batch_api_refuses_what_it_would_skip(args):
+    agent = Agent(seed=0, **args)
+    states = _game_states(4, seed=0)
+    agent.register_batch(states)
+    with pytest.raises(ValueError):
+        agent.update_batch([0.0] * 4, states, [False] * 4)
+    zeros = np.zeros(4, dtype=np.int64)
+    with pytest.raises(ValueError):
+        agent.learn_batch(zeros, zeros, [0.0] * 4, zeros, zeros.astype(bool))
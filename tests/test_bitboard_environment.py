@@ -0,0 +1,62 @@
+# tests/test_bitboard_environment.py
+import random
+from array import array
+
+import pytest
+
+from bitboard_environment import BitboardEnvironment
+from environement import Environment
+from interpreter import Interpreter
+
+URDL = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+
+def _plain_copy(bb: BitboardEnvironment, env: Environment) -> None:
+    """Met dans `env` (Environment) le plateau courant de `bb`."""
+    W = bb.WIDTH
+    cells = lambda s: [y * W + x for x, y in s]  # noqa: E731
+    env._occ[:] = bb.occupancy
+    body = cells(bb.snake)
+    env._body[: len(body)] = array("i", body)
+    env._head, env._len = 0, len(body)
+    env._greens[:] = cells(bb.green_apples)
+    env._reds[:] = cells(bb.red_apples)
+    env._walls = cells(bb.walls)
+    env._rebuild_index()
+    env._rebuild_free_tiles()
+
+
+def test_ray_features_match_plain_environment_while_stepping():
+    bb = BitboardEnvironment(seed=3)
+    env = Environment(seed=3)
+    bb_inter, env_inter = Interpreter(bb), Interpreter(env)
+    rng = random.Random(0)
+    for _ in range(2_000):
+        if bb.move(rng.randrange(4)) in (1, 4):  # BODY / WALL: partie finie
+            bb.reset_game()
+        _plain_copy(bb, env)
+        expected = tuple(env_inter._ray_features(dx, dy) for dx, dy in URDL)
+        assert tuple(bb_inter._ray_features(dx, dy) for dx, dy in URDL) == expected
+        assert bb_inter._indexed_state() == env_inter._indexed_state() == expected
+        assert bb.ray_state() == expected
+
+
+@pytest.mark.parametrize("cls", [Environment, BitboardEnvironment])
+@pytest.mark.parametrize(
+    "board",
+    [
+        dict(snake_start_len=1),
+        dict(height=3, width=3, snake_start_len=6),
+        dict(n_green=98),
+    ],
+)
+def test_unplayable_board_raises(cls, board):
+    with pytest.raises(ValueError):
+        cls(**board)
+
+
+@pytest.mark.parametrize("cls", [Environment, BitboardEnvironment])
+@pytest.mark.parametrize("height, width, length", [(4, 4, 3), (3, 3, 2), (5, 5, 4), (4, 4, 4)])
+def test_straight_snake_that_fits_is_accepted(cls, height, width, length):
+    env = cls(height=height, width=width, snake_start_len=length, n_green=1, n_red=0)
+    assert len(env.snake) == length
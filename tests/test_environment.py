@@ -0,0 +1,83 @@
+# tests/test_environment.py
+import random
+from copy import deepcopy
+
+import pytest
+
+from environement import BODY, EMPTY, GREEN, RED, WALL, Environment
+
+URDL = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+
+def _reference_move(env, dx, dy):
+    """Règles de _move sur des tuples (x, y): (code, serpent après, pomme mangée)."""
+    snake = list(env.snake)
+    hx, hy = snake[0]
+    head = (hx + dx, hy + dy)
+    if not env.in_bounds(*head) or head in env.walls:
+        return WALL, snake, None
+    if head in snake[:-1]:
+        return BODY, snake, None
+    if head in env.green_apples:
+        return GREEN, [head] + snake, head
+    moved = [head] + snake[:-1]
+    if head in env.red_apples:
+        moved = moved[:-1]
+        return (RED if moved else WALL), moved, head
+    return EMPTY, moved, None
+
+
+def _check_internal_state(env):
+    """Grille, index ligne/colonne et pool de cases libres cohérents avec le plateau."""
+    W, n = env.WIDTH, env.WIDTH * env.HEIGHT
+    expected = bytearray(n)
+    for cells, code in (
+        (env.walls, WALL),
+        (env.green_apples, GREEN),
+        (env.red_apples, RED),
+        (env.snake, BODY),
+    ):
+        for x, y in cells:
+            expected[y * W + x] = code
+    assert env.occupancy == expected
+
+    rows, cols = deepcopy(env.row_bits), deepcopy(env.col_bits)
+    env._rebuild_index()
+    assert (env.row_bits, env.col_bits) == (rows, cols)
+
+    free = env._free_cells[: env.free_count()].tolist()
+    assert sorted(free) == [p for p in range(n) if expected[p] == EMPTY]
+    assert [env._free_index[p] for p in free] == list(range(len(free)))
+    assert all(env._free_index[p] == -1 for p in range(n) if expected[p] != EMPTY)
+
+
+@pytest.mark.parametrize(
+    "board",
+    [dict(), dict(height=5, width=5, n_green=4, n_red=4, snake_start_len=2)],
+)
+def test_move_matches_reference_rules(board):
+    env = Environment(seed=5, **board)
+    rng = random.Random(1)
+    seen = set()
+    for _ in range(3_000):
+        action = rng.randrange(4)
+        greens, reds = env.green_apples, env.red_apples
+        code, snake, eaten = _reference_move(env, *URDL[action])
+
+        assert env.move(action) == code
+        seen.add(code)
+        assert list(env.snake) == snake
+        if eaten is None:
+            assert (env.green_apples, env.red_apples) == (greens, reds)
+        else:
+            # la pomme mangée est remplacée ailleurs, les autres restent
+            before, after = (greens, env.green_apples) if code == GREEN else (reds, env.red_apples)
+            assert before - {eaten} <= after and eaten not in after
+            assert len(after) == len(before)
+        if snake:
+            _check_internal_state(env)
+        # (mort par red à longueur 0: la tête reste BODY sur la grille, comme avant)
+        if code in (WALL, BODY):
+            env.reset_game()
+            _check_internal_state(env)
+    assert seen == {EMPTY, BODY, GREEN, RED, WALL}
@@ -0,0 +1,26 @@
+# tests/test_hogwild.py
+import numpy as np
+
+from agent import Agent
+from environement import Environment
+from hogwild import N_STATS, STEPS, _sync_steps
+from interpreter import Interpreter
+from train import AGENT_ARGS, RunStats, run_steps
+
+
+def test_step_count_is_others_plus_own_local_steps():
+    stats = np.zeros((3, N_STATS))
+    stats[:, STEPS] = (4_000, 1_000, 2_500)  # worker 1 a publié 1_000 steps
+    agent = Agent(seed=0, **AGENT_ARGS)
+    inter = Interpreter(Environment(seed=0), use_mirror=agent.use_mirror)
+    run = RunStats(step=1_000)
+
+    _sync_steps(agent, stats, 1, run.step)
+    assert agent.step_count == 4_000 + 2_500 + 1_000
+
+    # entre deux syncs, les steps locaux s'ajoutent sans recompter la ligne publiée
+    run_steps(agent, inter, inter.observe_key(), run, 300)
+    assert agent.step_count == 4_000 + 2_500 + 1_300
+    stats[1, STEPS] = run.step
+    _sync_steps(agent, stats, 1, run.step)
+    assert agent.step_count == 4_000 + 2_500 + 1_300
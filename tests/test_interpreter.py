@@ -0,0 +1,58 @@
+# tests/test_interpreter.py
+import random
+
+import pytest
+
+from agent import TRANSFORM_PARAMS, _canonicalize
+from environement import BODY, WALL, Environment
+from interpreter import Interpreter
+from utils import intDir
+
+URDL = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+
+@pytest.mark.parametrize("use_mirror", [False, True])
+@pytest.mark.parametrize(
+    "board", [dict(), dict(height=7, width=13, n_green=5, n_red=3, snake_start_len=4)]
+)
+def test_indexed_rays_match_walked_rays(board, use_mirror):
+    env = Environment(seed=2, **board)
+    inter = Interpreter(env, use_mirror=use_mirror)
+    rng = random.Random(4)
+
+    def check():
+        expected = tuple(inter._ray_features(dx, dy) for dx, dy in URDL)
+        assert inter._indexed_state() == inter.get_state() == expected
+        assert inter._key() == _canonicalize(expected, use_mirror)
+
+    check()
+    for _ in range(3_000):
+        code = env.move(rng.randrange(4))
+        check()  # y compris après la mort (serpent vide après une red à longueur 1)
+        if code in (BODY, WALL):
+            inter.reset_game()
+            check()
+
+
+@pytest.mark.parametrize("use_mirror", [False, True])
+@pytest.mark.parametrize("rewards", [None, dict(step=-0.5, green=3, red=-7, death=-50, shape=0.3)])
+def test_transition_matches_apply_dir_and_get_state(use_mirror, rewards):
+    # deux envs jumeaux: transition() sur l'un, apply_dir() + get_state() sur l'autre
+    fast = Interpreter(Environment(seed=8, n_green=3), use_mirror=use_mirror, rewards=rewards)
+    ref = Interpreter(Environment(seed=8, n_green=3), use_mirror=use_mirror, rewards=rewards)
+    rng = random.Random(6)
+
+    def ref_obs():
+        key, t = _canonicalize(ref.get_state(), use_mirror)
+        return key, *TRANSFORM_PARAMS[t]
+
+    assert fast.observe_key() == ref_obs()
+    for _ in range(3_000):
+        action = rng.randrange(4)
+        reward, done, *obs = fast.transition(action)
+        assert (reward, done) == ref.apply_dir(intDir(action))
+        assert tuple(obs) == ref_obs()
+        assert fast.last_code == ref.last_code
+        if done:
+            fast.reset_game()
+            ref.reset_game()
@@ -0,0 +1,50 @@
+# tests/test_planner.py
+import pytest
+
+from agent import Agent
+from planner import PrioritizedSweeping
+from qtable import QTable
+
+
+def test_model_target_is_the_expected_backup():
+    ps = PrioritizedSweeping(gamma=0.5)
+    table = QTable()
+    table[2] = [4.0, 0.0, 0.0, 0.0]
+    table[3] = [1.0, 0.0, -2.0, 0.0]
+    outcomes = ((1.0, 2, False), (3.0, 3, False), (2.0, 2, False), (2.0, 9, True))
+    for reward, next_key, done in outcomes:
+        row = ps.observe(1, 0, reward, next_key, done)
+    assert len(ps) == 1 and ps.count[row] == 4
+    # récompense moyenne 2, fin 1 fois sur 4, successeurs 2 (x2, max 4) et 3 (x1, max 1)
+    assert ps._target(table, row) == pytest.approx(2.0 + 0.5 * 0.75 * (2 * 4.0 + 1.0) / 3)
+    assert ps.preds == {2: [row], 3: [row]}
+
+
+def test_sweeping_propagates_a_terminal_reward_backwards():
+    ps = PrioritizedSweeping(gamma=0.5, theta=1e-3, alpha=1.0)
+    table = QTable()
+    ps.observe(1, 0, 0.0, 2, False)
+    ps.observe(2, 0, 0.0, 3, False)
+    last = ps.observe(3, 0, 10.0, 0, True)
+
+    ps.real_backup(table, last)
+    assert ps.plan(table, 10) == 3  # 3, puis ses prédécesseurs 2 et 1
+    assert [table[k][0] for k in (3, 2, 1)] == [10.0, 5.0, 2.5]
+    assert ps.plan(table, 10) == 0  # plus d'erreur de Bellman au-dessus de theta
+
+
+def test_successor_slots_replace_the_least_seen():
+    ps = PrioritizedSweeping(gamma=0.5, max_succ=2)
+    for next_key in (5, 5, 6, 7):
+        row = ps.observe(1, 0, 0.0, next_key, False)
+    slots = dict(zip(ps.succ_keys[: ps.max_succ], ps.succ_counts[: ps.max_succ]))
+    assert slots == {5: 2, 7: 1}  # 6 (vu une fois) a cédé sa place à 7
+
+
+def test_agent_plans_after_each_real_backup():
+    agent = Agent(alpha=1.0, gamma=0.5, eps_start=0.0, plan_steps=5)
+    for key, next_key, reward, done in ((1, 2, 0.0, False), (2, 3, 0.0, False), (3, 4, 10.0, True)):
+        agent.lastKey, agent.lastChoice_can = key, 0
+        agent.update_key(reward, next_key, done)
+    # le backup réel de 3 se propage aussitôt à 2 puis 1 par le modèle
+    assert [agent.registre[k][0] for k in (3, 2, 1)] == [10.0, 5.0, 2.5]
@@ -0,0 +1,25 @@
+# tests/test_play_1000.py
+from pathlib import Path
+
+from play_1000 import evaluate
+
+MODEL = Path(__file__).resolve().parent.parent / "train" / "100000-v6.pkl"
+
+# play_1000.py du commit initial (random global), 50 parties, seed 0. Mêmes
+# parties; seules les red sont comptées d'après le move (le commit initial
+# comparait la récompense à -10 et ratait les red avec shaping: 0.020)
+BASELINE_50 = [
+    "Taille moyenne fin: 8.580",
+    "Min: 2",
+    "Max: 22",
+    "Std: 5.430",
+    "Moyenne green/partie: 5.680",
+    "Moyenne red/partie: 0.100",
+    "Deaths: 29",
+]
+
+
+def test_legacy_seed_reproduces_baseline(capsys):
+    evaluate(str(MODEL), episodes=50, seed=0, render_progress_every=0, legacy=True)
+    out = capsys.readouterr().out.splitlines()
+    assert out[-len(BASELINE_50) :] == BASELINE_50
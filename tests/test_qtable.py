@@ -0,0 +1,170 @@
+# tests/test_qtable.py
+import numpy as np
+import pytest
+
+from agent import Agent
+from checkpoint import compact, read_model, write_model
+from environement import Environment
+from interpreter import Interpreter
+from qtable import QTable
+from train import AGENT_ARGS, RunStats, run_steps
+
+META = dict(alpha=0.2, gamma=0.9, eps_start=0.2, eps_end=0.02, eps_decay_steps=1, step_count=0, use_mirror=True)
+
+
+def _trained_agent(steps):
+    agent = Agent(seed=0, **AGENT_ARGS)
+    inter = Interpreter(Environment(seed=0), use_mirror=agent.use_mirror)
+    run_steps(agent, inter, inter.observe_key(), RunStats(), steps)
+    return agent
+
+
+def _as_dict(table):
+    return {k: v.tolist() for k, v in table.items()}
+
+
+@pytest.mark.parametrize("evict", ["visits", "lru"])
+def test_slot_many_batch_larger_than_max_entries_raises(evict):
+    table = QTable(max_entries=4, evict=evict)
+    with pytest.raises(ValueError, match="max_entries"):
+        table.slot_many(np.arange(1, 10))
+
+
+def test_slot_many_evicts_only_outside_the_batch():
+    table = QTable(max_entries=4, evict="lru")
+    table.slot_many(np.array([1, 2, 3, 4]))
+    slots = table.slot_many(np.array([3, 4, 5, 6]))
+    assert len(table) == 4
+    assert sorted(table) == [3, 4, 5, 6]
+    assert (table.keys[slots] == [3, 4, 5, 6]).all()
+
+
+def test_setitem_counts_as_a_visit():
+    table = QTable(max_entries=4, evict="lru", evict_frac=0.25)
+    for k in (1, 2, 3, 4):
+        table[k] = [k, 0, 0, 0]
+    table[1] = [1, 1, 1, 1]  # 1 redevient la plus récente
+    table[5] = [5, 0, 0, 0]
+    assert 1 in table and 2 not in table
+
+
+def test_delta_compact_drops_evicted_keys(tmp_path):
+    table = QTable(max_entries=4, evict="lru", evict_frac=0.25)
+    for k in (1, 2, 3, 4):
+        table[k] = [k, 0, 0, 0]
+    write_model(tmp_path / "base.qbin", *table.arrays(), META)
+    table.clear_dirty()
+
+    table[5] = [5, 0, 0, 0]  # évince 1
+    keys, q = table.take_dirty()
+    write_model(tmp_path / "d1.qbin", keys, q, META, delta=True)
+
+    compact(tmp_path / "out.qbin", tmp_path / "base.qbin", [tmp_path / "d1.qbin"])
+    _, out_keys, out_q = read_model(tmp_path / "out.qbin", mmap=False)
+    live_keys, live_q = table.arrays()
+    order = np.argsort(live_keys)
+    assert out_keys.tolist() == live_keys[order].tolist() == [2, 3, 4, 5]
+    assert np.array_equal(out_q, live_q[order])
+
+
+def test_delta_skips_tombstone_of_reinserted_key():
+    table = QTable(max_entries=2, evict="lru", evict_frac=0.5)
+    table[1] = [1, 0, 0, 0]
+    table[2] = [2, 0, 0, 0]
+    table.clear_dirty()
+    table[3] = [3, 0, 0, 0]  # évince 1
+    table[1] = [9, 0, 0, 0]  # évince 2, 1 revient
+    keys, q = table.take_dirty()
+    rows = dict(zip(keys.tolist(), q.tolist()))
+    assert rows[1][0] == 9 and np.isnan(rows[2]).all()
+
+
+def test_from_arrays_over_max_entries_keeps_most_visited():
+    keys = np.arange(1, 11)
+    q = np.tile(keys[:, None], (1, 4)).astype(np.float32)
+    table = QTable.from_arrays(keys, q, counts=keys[::-1].astype(np.uint32), max_entries=4)
+    assert len(table) == 4 and sorted(table) == [1, 2, 3, 4]
+    assert table[2][0] == 2
+    table[11] = [0, 0, 0, 0]
+    assert len(table) <= 4
+    with pytest.raises(ValueError, match="max_entries"):
+        QTable.from_arrays(keys, q, max_entries=4)
+
+
+def test_matches_dict_of_rows_through_growth():
+    # même sémantique que l'ancien defaultdict(lambda: [0.0] * 4), à travers les rehash
+    rng = np.random.default_rng(0)
+    table = QTable(capacity=16)
+    ref: dict = {}
+    keys = rng.integers(0, 625**4, size=500)  # clés packées, avec des doublons
+    for _ in range(5_000):
+        key = int(rng.choice(keys))
+        op = rng.integers(4)
+        if op == 0:  # écriture scalaire (chemin de Agent.update_key)
+            a, v = int(rng.integers(4)), float(np.float32(rng.normal()))
+            table.set_value(table.slot(key), a, v)
+            ref.setdefault(key, [0.0] * 4)[a] = v
+        elif op == 1:  # lecture sans insertion
+            assert (key in table) == (key in ref)
+            i = table.find(key)
+            assert (table.values(i) if i >= 0 else None) == ref.get(key)
+        elif op == 2:  # lecture avec insertion (table[key] du defaultdict)
+            assert table[key].tolist() == ref.setdefault(key, [0.0] * 4)
+        else:  # batch: absentes = 0 sans insertion
+            batch = rng.choice(keys, size=8)
+            expected = [ref.get(int(k), [0.0] * 4) for k in batch]
+            assert table.values_many(batch).tolist() == expected
+    assert len(table) == len(ref) and sorted(table) == sorted(ref)
+    assert {k: v.tolist() for k, v in table.items()} == ref
+    out_keys, out_q = table.arrays()
+    assert dict(zip(out_keys.tolist(), out_q.tolist())) == ref
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+@pytest.mark.parametrize("n", [0, 1, 300])
+def test_write_read_model_round_trip(tmp_path, mmap, n):
+    rng = np.random.default_rng(n)
+    keys = rng.permutation(10 * n + 1)[:n].astype(np.int64)
+    q = rng.normal(size=(n, 4)).astype(np.float32)
+    meta = {**META, "step_count": 1234, "use_mirror": False}
+    write_model(tmp_path / "m.qbin", keys, q, meta)
+
+    got_meta, got_keys, got_q = read_model(tmp_path / "m.qbin", mmap=mmap)
+    order = np.argsort(keys)
+    assert got_meta == {**meta, "delta": False}
+    assert got_keys.tolist() == keys[order].tolist()
+    assert np.array_equal(got_q, q[order])
+
+
+@pytest.mark.parametrize("suffix", [".qbin", ".pkl"])
+def test_agent_save_load_round_trip(tmp_path, suffix):
+    agent = _trained_agent(2_000)
+    agent.save(tmp_path / f"m{suffix}")
+    loaded = Agent()
+    loaded.load(tmp_path / f"m{suffix}", strict=True)
+    assert loaded._meta() == agent._meta()
+    assert _as_dict(loaded.registre) == _as_dict(agent.registre)
+    if suffix == ".qbin":
+        frozen = Agent()
+        frozen.load(tmp_path / "m.qbin", readonly=True)
+        assert _as_dict(frozen.registre) == _as_dict(agent.registre)
+
+
+def test_compact_base_and_deltas_equals_full_table(tmp_path):
+    agent = _trained_agent(1_000)
+    write_model(tmp_path / "base.qbin", *agent.snapshot())
+    inter = Interpreter(Environment(seed=1), use_mirror=agent.use_mirror)
+    obs, run = inter.observe_key(), RunStats()
+    deltas = []
+    for i in range(4):  # deltas de steps d'entraînement (nouvelles clés + mises à jour)
+        obs = run_steps(agent, inter, obs, run, 500)
+        deltas.append(tmp_path / f"d{i}.qbin")
+        write_model(deltas[-1], *agent.snapshot(delta=True), delta=True)
+
+    compact(tmp_path / "out.qbin", tmp_path / "base.qbin", deltas)
+    meta, keys, q = read_model(tmp_path / "out.qbin", mmap=False)
+    assert dict(zip(keys.tolist(), q.tolist())) == _as_dict(agent.registre)
+    assert meta["step_count"] == agent.step_count and not meta["delta"]
+    with pytest.raises(ValueError):
+        compact(tmp_path / "bad.qbin", deltas[0], deltas[1:])
+
@@ -0,0 +1,45 @@
+# tests/test_replay.py
+import numpy as np
+import pytest
+
+from agent import Agent
+from replay import ReplayBuffer
+
+
+def test_ring_keeps_the_last_capacity_transitions():
+    buf = ReplayBuffer(4, seed=0)
+    for k in range(3):
+        buf.push(k, k % 4, k + 0.19, k + 100, k == 2)
+    more = np.arange(3, 6)
+    buf.push_many(more, more % 4, more + 0.19, more + 100, [False] * 3)
+    assert len(buf) == 4 and buf.head == 2
+    keys, actions, rewards, next_keys, dones = buf.sample(200)
+    assert set(keys.tolist()) == {2, 3, 4, 5}
+    for k, a, r, k2, d in zip(keys, actions, rewards, next_keys, dones):
+        # les récompenses reviennent exactement (floats Python du chemin série)
+        assert (a, r, k2, d) == (k % 4, k + 0.19, k + 100, k == 2)
+
+
+def test_replayed_backups_match_hand_computed_values():
+    agent = Agent(alpha=0.5, gamma=0.5, eps_start=0.0, replay_size=4, replay_batch=2)
+    for _ in range(3):  # la même transition: chaque minibatch la rejoue
+        agent.lastKey, agent.lastChoice_can = 1, 0
+        agent.update_key(1.19, 5, False)
+    q = 0.5 * 1.19  # step 1: backup réel, buffer < replay_batch
+    q += 0.5 * (1.19 - q)  # step 2: backup réel, crédit 1 < replay_batch
+    q += 0.5 * (1.19 - q)  # step 3: backup réel
+    q += 0.5 * (1.19 - q)  # puis un minibatch de 2 copies = un seul pas vers la cible
+    assert agent.registre[1][0] == pytest.approx(q)
+
+
+@pytest.mark.parametrize("ratio, expected", [(1.0, 10), (0.5, 5), (2.0, 20)])
+def test_replay_ratio_sets_backups_per_real_step(ratio, expected):
+    agent = Agent(eps_start=0.0, replay_size=64, replay_batch=2, replay_ratio=ratio)
+    batches = []
+    backup = agent._backup_batch
+    agent._backup_batch = lambda *t: (batches.append(len(t[0])), backup(*t))
+    for k in range(21):
+        agent.lastKey, agent.lastChoice_can = k, 0
+        agent.update_key(1.0, k + 1, False)
+    # crédit accumulé dès que le buffer atteint replay_batch (step 2): 20 steps réels
+    assert sum(batches) == expected * 2 and set(batches) == {2}
@@ -0,0 +1,54 @@
+# tests/test_traces.py
+import pytest
+
+from agent import Agent
+
+# épisode à la main: clés 1 -> 2 -> 3 -> (fin), action 0, récompenses 1, 2, 10
+EPISODE = ((1, 2, 1.0, False), (2, 3, 2.0, False), (3, 4, 10.0, True))
+
+
+def _play(agent, episode=EPISODE):
+    for key, next_key, reward, done in episode:
+        agent.lastKey, agent.lastChoice_can = key, 0
+        agent.update_key(reward, next_key, done)
+
+
+def _q(agent, key):
+    return agent.registre.get(key, [0.0] * 4)[0]
+
+
+def test_nstep_backups_match_hand_computed_returns():
+    agent = Agent(alpha=0.5, gamma=0.5, learner="nstep", n_step=2)
+    _play(agent)
+    # Q(1) <- 1 + .5*2 = 2 ; Q(2) <- 2 + .5*10 = 7 ; Q(3) <- 10 (fin: flush sans bootstrap)
+    assert [_q(agent, k) for k in (1, 2, 3)] == [0.5 * 2, 0.5 * 7, 0.5 * 10]
+    assert agent.nstep.size == 0
+
+
+def test_nstep_cut_bootstraps_from_the_cut_state():
+    agent = Agent(alpha=0.5, gamma=0.5, learner="nstep", n_step=3)
+    agent.registre[2] = [4.0, 0.0, 0.0, 0.0]
+    _play(agent, EPISODE[:1])
+    agent._cut_traces(2)  # action exploratoire depuis 2: retour 1 + .5 * max Q(2)
+    assert _q(agent, 1) == 0.5 * (1 + 0.5 * 4)
+    assert agent.nstep.size == 0
+
+
+def test_qlambda_backups_match_hand_computed_traces():
+    agent = Agent(alpha=0.5, gamma=0.5, learner="qlambda", lam=0.5, trace_len=4)
+    _play(agent)
+    # deltas 1, 2, 10; traces décroissent de gamma*lambda = .25 par step
+    q1 = 0.5 * 1 + 0.5 * 2 * 0.25 + 0.5 * 10 * 0.25**2
+    q2 = 0.5 * 2 + 0.5 * 10 * 0.25
+    q3 = 0.5 * 10
+    assert [_q(agent, k) for k in (1, 2, 3)] == pytest.approx([q1, q2, q3])
+    assert not agent.trace.elig.any()  # fin d'épisode: traces effacées
+
+
+def test_qlambda_trace_is_replacing():
+    agent = Agent(alpha=0.5, gamma=0.5, learner="qlambda", lam=0.5, trace_len=4)
+    # 1 -> 1 -> fin: la 2e visite remet e(1) à 1 au lieu d'ajouter 1
+    _play(agent, ((1, 1, 1.0, False), (1, 2, 0.0, True)))
+    q = 0.5 * 1  # après le 1er step
+    q += 0.5 * (0.0 - q) * 1.0  # delta = 0 - Q(1), e(1) = 1 (pas 1.25)
+    assert _q(agent, 1) == pytest.approx(q)
@@ -0,0 +1,60 @@
+# tests/test_train.py
+import train
+from agent import Agent
+from checkpoint import read_state
+from environement import GREEN, RED, Environment
+from interpreter import Interpreter
+from train import AGENT_ARGS, RunStats, run_steps
+
+
+def test_run_steps_counts_apples_from_the_move_not_the_reward():
+    env = Environment(seed=4)
+    agent = Agent(seed=4, **AGENT_ARGS)
+    # récompenses qui ne valent ni 10 ni -10 (sweep.py), shaping actif
+    inter = Interpreter(env, use_mirror=agent.use_mirror, rewards={"green": 3.0, "red": -4.0})
+    eaten = {GREEN: 0, RED: 0}
+    transition = inter.transition
+
+    def counted(action):
+        out = transition(action)
+        eaten[inter.last_code] = eaten.get(inter.last_code, 0) + 1
+        return out
+
+    inter.transition = counted
+    run = RunStats()
+    run_steps(agent, inter, inter.observe_key(), run, 20_000)
+    assert run.step == 20_000
+    assert eaten[RED] > 0
+    assert (run.green, run.red) == (eaten[GREEN], eaten[RED])
+
+
+def _final_state(tmp_path, monkeypatch, name, *runs):
+    """Enchaîne des train(steps, **kwargs) dans tmp_path/name; renvoie le dernier état."""
+    monkeypatch.setattr(train, "SAVE_DIR", tmp_path / name)
+    for steps, kwargs in runs:
+        train.train(steps, state_every=1_000, **kwargs)
+    return read_state(train.state_path())
+
+
+def test_resume_continues_the_uninterrupted_run(tmp_path, monkeypatch):
+    board = dict(height=8, width=9, n_green=3)
+    straight = _final_state(tmp_path, monkeypatch, "a", (3_500, dict(seed=5, **board)))
+    resumed = _final_state(
+        tmp_path,
+        monkeypatch,
+        "b",
+        (2_000, dict(seed=5, **board)),
+        (3_500, dict(resume=tmp_path / "b" / train.state_path().name)),
+    )
+
+    assert resumed["step"] == straight["step"] == 3_500
+    assert resumed["obs"] == straight["obs"]
+    assert resumed["stats"]["totals"] == straight["stats"]["totals"]
+    assert resumed["stats"]["episode"] == straight["stats"]["episode"]
+    a, b = straight["agent"], resumed["agent"]
+    assert b.step_count == a.step_count
+    assert b.rng.getstate() == a.rng.getstate()
+    assert {k: v.tolist() for k, v in b.registre.items()} == {
+        k: v.tolist() for k, v in a.registre.items()
+    }
+    assert resumed["inter"].env.snapshot() == straight["inter"].env.snapshot()
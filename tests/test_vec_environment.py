@@ -0,0 +1,25 @@
+# tests/test_vec_environment.py
+import numpy as np
+
+from interpreter import REWARD_DEFAULTS
+from vec_environment import VecEnvironment
+
+
+def _rewards(venv, steps=200):
+    rng = np.random.default_rng(0)
+    seen = []
+    for _ in range(steps):
+        _, rewards, _ = venv.step(rng.integers(0, 4, venv.n))
+        seen.append(rewards)
+    return np.concatenate(seen)
+
+
+def test_rewards_follow_interpreter_defaults_and_overrides():
+    default = set(_rewards(VecEnvironment(32, seed=1)).round(6))
+    r = REWARD_DEFAULTS
+    assert {r["death"], r["green"], r["step"]} <= default
+
+    custom = {"step": -1.0, "death": -7.0, "shape": 0.0}
+    seen = set(_rewards(VecEnvironment(32, seed=1, rewards=custom)).round(6))
+    assert seen <= {-1.0, -7.0, r["green"], r["red"]}
+    assert {-1.0, -7.0} <= seen
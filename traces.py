@@ -0,0 +1,98 @@
+# traces.py
+"""
+Multi-step learners for Agent (learner="nstep" / "qlambda").
+
+Both keep a small, bounded, array-backed window of the recent (key, action)
+pairs and are cut (flushed / cleared) by the Agent on exploratory actions and
+at the end of an episode, as in Watkins's Q(lambda).
+"""
+from array import array
+
+import numpy as np
+
+
+class NStepBuffer:
+    """
+    n-step Q-learning: ring of the last n (key, action, reward).
+    The oldest pair is backed up toward r_0 + g r_1 + ... + g^(n-1) r_(n-1) + g^n max Q(s_n).
+    """
+
+    def __init__(self, n: int, gamma: float):
+        self.n = max(1, n)
+        self.gamma = gamma
+        self.keys = array("q", [0] * self.n)
+        self.actions = array("b", [0] * self.n)
+        self.rewards = array("d", [0.0] * self.n)
+        self.head = 0  # index of the oldest pair
+        self.size = 0
+
+    def push(self, key: int, action: int, reward: float) -> bool:
+        """Adds a transition; True when the window is full (oldest can be backed up)."""
+        i = (self.head + self.size) % self.n
+        self.keys[i] = key
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.size += 1
+        return self.size == self.n
+
+    def backup_oldest(self, table, alpha: float, bootstrap: float) -> None:
+        """Backs up the oldest pair with the truncated return over the window, then drops it."""
+        g = bootstrap
+        for j in range(self.size - 1, -1, -1):
+            g = self.rewards[(self.head + j) % self.n] + self.gamma * g
+
+        i = table.slot(self.keys[self.head])
+        a = self.actions[self.head]
+        q_sa = table.value(i, a)
+        table.set_value(i, a, q_sa + alpha * (g - q_sa))
+
+        self.head = (self.head + 1) % self.n
+        self.size -= 1
+
+    def flush(self, table, alpha: float, bootstrap: float) -> None:
+        """Backs up every pending pair (end of episode: bootstrap=0, cut: max Q(s))."""
+        while self.size:
+            self.backup_oldest(table, alpha, bootstrap)
+
+
+class EligibilityTrace:
+    """
+    Watkins Q(lambda) with replacing traces, bounded to `length` pairs (ring).
+    Eligibilities decay by gamma*lambda per step; the oldest pair is overwritten
+    when the ring is full (its eligibility is (gamma*lambda)^length by then).
+    Slots are cached and re-resolved when the table rehashes (table.generation).
+    """
+
+    def __init__(self, length: int, gamma: float, lam: float):
+        self.length = max(1, length)
+        self.decay = gamma * lam
+        self.keys = np.zeros(self.length, dtype=np.int64)
+        self.actions = np.zeros(self.length, dtype=np.int64)
+        self.slots = np.full(self.length, -1, dtype=np.int64)
+        self.elig = np.zeros(self.length, dtype=np.float64)
+        self.head = 0
+        self._generation = -1
+
+    def push(self, table, key: int, action: int, slot: int) -> None:
+        """Sets e(key, action) = 1 (replacing: an older copy of the pair is dropped)."""
+        if self._generation != table.generation:
+            self.slots[:] = table.find_many(self.keys)
+            self.slots[self.elig == 0.0] = -1
+            self._generation = table.generation
+        self.elig[(self.keys == key) & (self.actions == action)] = 0.0
+
+        i = self.head
+        self.keys[i] = key
+        self.actions[i] = action
+        self.slots[i] = slot
+        self.elig[i] = 1.0
+        self.head = (i + 1) % self.length
+
+    def backup(self, table, alpha: float, delta: float) -> None:
+        """Q += alpha * delta * e for every live pair, then e *= gamma*lambda."""
+        live = (self.elig > 0.0) & (self.slots >= 0)
+        table.add_many(self.slots[live], self.actions[live], alpha * delta * self.elig[live])
+        self.elig *= self.decay
+
+    def clear(self) -> None:
+        self.elig[:] = 0.0
@@ -1,80 +1,331 @@
 # train.py
+import argparse
+from array import array
 from pathlib import Path
-from environement import Environment
+from environement import GREEN, RED, Environment
 from interpreter import Interpreter
 from agent import Agent
+from checkpoint import Checkpointer, dump_state, read_state
+from metrics import MetricsWriter, TrainMetrics
 import time
-from utils import intDir
+from utils import add_board_args, board_config
 
 SAVE_DIR = Path("train")
 VERSION = "v6"
-EXT = "pkl"
+EXT = "qbin"  # binary checkpoint (checkpoint.py); "pkl" = legacy pickle
 
 SAVE_STEPS = {1_000, 100_000, 1_000_000, 5_000_000, 10_000_000, 50_000_000, 100_000_000}
 
+# incremental checkpoint (only changed entries) every N steps between full saves
+# (0 = off, the default; --delta-every). Rebuild a full model:
+# python checkpoint.py compact out base deltas...
+DELTA_EVERY = 0
+
+# état complet (Q-table, RNG, partie en cours, compteurs) pour --resume, tous
+# les N steps et en fin de run, dans un seul fichier réécrit (0 = off)
+STATE_EVERY = 1_000_000
+
+# use_mirror=False => rotations only (recommended first)
+# set use_mirror=True to also merge reflections
+AGENT_ARGS = dict(
+    eps_start=0.2,
+    eps_end=0.02,
+    eps_decay_steps=2_000_000,
+    use_mirror=True,
+)
+
 
 def save_path(step: int) -> Path:
     return SAVE_DIR / f"{step}-{VERSION}.{EXT}"
 
 
-def train(total_steps: int = 10_000_000):
-    SAVE_DIR.mkdir(parents=True, exist_ok=True)
-    start_time = time.perf_counter()
-
-    env = Environment()
-    inter = Interpreter(env)
-
-    # use_mirror=False => rotations only (recommended first)
-    # set use_mirror=True to also merge reflections
-    agent = Agent(
-        eps_start=0.2,
-        eps_end=0.02,
-        eps_decay_steps=2_000_000,
-        use_mirror=True,
+def delta_path(step: int) -> Path:
+    return SAVE_DIR / f"{step}-{VERSION}.delta.{EXT}"
+
+
+def state_path() -> Path:
+    return SAVE_DIR / f"state-{VERSION}.pkl"
+
+
+def metrics_path() -> Path:
+    return SAVE_DIR / f"metrics-{VERSION}.jsonl"
+
+
+def fmt_duration(sec: float) -> str:
+    sec = int(sec)
+    h = sec // 3600
+    m = (sec % 3600) // 60
+    s = sec % 60
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+
+class RunStats:
+    """
+    Totaux cumulés d'un run (train.py, hogwild.py, sweep.py): les fenêtres (log,
+    metrics, stats publiées) sont des différences de totals(). ep_r0 / ep_start:
+    r_sum et step au début de l'épisode en cours. window > 0: garde aussi les
+    longueurs des `window` derniers steps (window_avg_len, sweep.py).
+    """
+
+    __slots__ = (
+        "step",
+        "r_sum",
+        "deaths",
+        "green",
+        "red",
+        "len_sum",
+        "ep_r0",
+        "ep_start",
+        "lens",
+        "win_len_sum",
     )
 
-    state = inter.get_state()
+    def __init__(
+        self, step: int = 0, totals=(0.0, 0, 0, 0, 0), episode=(0.0, 0), window: int = 0
+    ):
+        self.step = step
+        self.r_sum, self.deaths, self.green, self.red, self.len_sum = totals
+        self.ep_r0, self.ep_start = episode
+        # anneau indexé par step % window (None = off)
+        self.lens = array("i", bytes(4 * window)) if window else None
+        self.win_len_sum = 0
 
-    # --- stats ---
-    log_every = 100_000
-    r_sum = 0.0
-    deaths = 0
-    green = 0
-    red = 0
-    len_sum = 0
+    def totals(self) -> tuple:
+        return (self.r_sum, self.deaths, self.green, self.red, self.len_sum)
 
-    def fmt(sec: float) -> str:
-        sec = int(sec)
-        h = sec // 3600
-        m = (sec % 3600) // 60
-        s = sec % 60
-        return f"{h:02d}:{m:02d}:{s:02d}"
+    def window_avg_len(self) -> float:
+        """Longueur moyenne sur les `window` derniers steps (moins au début du run)."""
+        return self.win_len_sum / min(len(self.lens), self.step) if self.step else 0.0
 
-    for i in range(1, total_steps + 1):
-        action_int = agent.register(state)
-        direction = intDir(action_int)
 
-        reward, done = inter.apply_dir(direction)
-        next_state = inter.get_state()  # observe after step (even if done)
+def run_steps(agent, inter, obs, run: RunStats, n: int, on_episode=None) -> tuple:
+    """
+    n steps de la boucle d'entraînement depuis obs = (key, rot_k, mirror):
+    choix, transition, backup, stats dans `run`, nouvelle partie à la mort.
+    Renvoie l'obs du step suivant. on_episode(steps, longueur, reward) à
+    chaque fin de partie. Boucle commune à train() et aux workers Hogwild.
+    """
+    env = inter.env
+    register, transition, update = agent.register_key, inter.transition, agent.update_key
+    key, rot_k, mirror = obs
+    r_sum, deaths, green, red, len_sum = run.totals()
+    ep_r0, ep_start = run.ep_r0, run.ep_start
+    lens, win_len_sum = run.lens, run.win_len_sum
+    window = len(lens) if lens is not None else 0
 
-        agent.changeLast(reward, next_state, done)
+    for i in range(run.step + 1, run.step + n + 1):
+        action_int = register(key, rot_k, mirror)
 
-        # --- stats ---
+        # move + reward + état suivant (observé même si done), en un appel
+        reward, done, next_key, next_rot_k, next_mirror = transition(action_int)
+
+        update(reward, next_key, done)
+
+        # --- stats (pommes d'après le code du move, pas la récompense) ---
         r_sum += reward
-        if reward == 10:
+        code = inter.last_code
+        if code == GREEN:
             green += 1
-        elif reward == -10:
+        elif code == RED:
             red += 1
-        if done:
-            deaths += 1
-        len_sum += len(env.snake)
+        length = env.snake_length
+        len_sum += length
+        if lens is not None:
+            j = i % window
+            win_len_sum += length - lens[j]
+            lens[j] = length
 
         # transition / reset
         if done:
+            deaths += 1
+            if on_episode is not None:
+                on_episode(i - ep_start, length, r_sum - ep_r0)
+            ep_r0 = r_sum
+            ep_start = i
             inter.reset_game()
-            state = inter.get_state()
+            key, rot_k, mirror = inter.observe_key()
         else:
-            state = next_state
+            key, rot_k, mirror = next_key, next_rot_k, next_mirror
+
+    run.step += n
+    run.r_sum, run.deaths, run.green, run.red, run.len_sum = r_sum, deaths, green, red, len_sum
+    run.ep_r0, run.ep_start = ep_r0, ep_start
+    run.win_len_sum = win_len_sum
+    return key, rot_k, mirror
+
+
+def _state(step, agent, inter, obs, stats, start_time, seed, board) -> dict:
+    """État complet après `step` steps (checkpoint.dump_state, train(resume=...))."""
+    return {
+        "step": step,
+        "agent": agent,  # Q-table, step_count, rng, buffers des learners
+        "inter": inter,  # + env (partie en cours, env.rng)
+        "obs": obs,  # (key, rot_k, mirror) à jouer au step suivant
+        "stats": stats,  # totaux cumulés, marques des fenêtres, TrainMetrics
+        "elapsed": time.perf_counter() - start_time,
+        "seed": seed,
+        "board": board,
+    }
+
+
+def train(
+    total_steps: int = 10_000_000,
+    seed=None,
+    workers: int = 1,
+    threads: bool = False,
+    actors: int = 0,
+    batch: int = 1_024,
+    refresh: int = 50_000,
+    resume=None,
+    state_every: int = STATE_EVERY,
+    delta_every: int = DELTA_EVERY,
+    metrics=None,
+    metrics_every: int = 10_000,
+    metrics_flush: float = 5.0,
+    capacity: int = 1 << 18,
+    **board,
+):
+    """
+    board: height/width/n_green/n_red/snake_start_len (Environment).
+    workers > 1: Hogwild sur une Q-table partagée (hogwild.py), en process
+    ou en threads (threads=True, build free-threaded; sinon 1 thread).
+    capacity: slots de la Q-table partagée (Hogwild, taille fixe).
+    actors > 0: actors + un learner (actor_learner.py), batches de `batch`
+    transitions, snapshot de la policy tous les `refresh` steps appris.
+    resume: chemin d'un état (state_path()) -> reprend exactement où il s'est
+    arrêté (seed et board de l'état: autre seed = ValueError, autre board ou
+    metrics_every = avertissement); un run coupé puis repris donne le même
+    résultat qu'un run d'une traite. Entraînement série seulement.
+    delta_every: checkpoint delta (entrées modifiées depuis le précédent) tous les
+    N steps entre les saves complets (0 = off).
+    metrics: fichier .jsonl / .csv des métriques (metrics.py), une ligne tous les
+    `metrics_every` steps, écrit en tâche de fond (flush toutes les metrics_flush s).
+    Aussi en --workers / --actors (histogrammes par épisode vides, cf. metrics.py).
+    """
+    if resume is not None and (actors > 0 or workers > 1 or threads):
+        raise ValueError("--resume: entraînement série seulement (pas --workers/--actors)")
+    if actors > 0 or workers > 1 or threads:
+        # mêmes rows de métriques, construites par le parent depuis les compteurs des workers
+        writer = MetricsWriter(metrics, metrics_flush) if metrics else None
+        try:
+            if actors > 0:
+                from actor_learner import train_actor_learner
+
+                train_actor_learner(
+                    total_steps,
+                    actors,
+                    seed,
+                    metrics=writer,
+                    metrics_every=metrics_every,
+                    batch=batch,
+                    refresh_every=refresh,
+                    **board,
+                )
+            else:
+                from hogwild import train_hogwild
+
+                train_hogwild(
+                    total_steps,
+                    workers,
+                    seed,
+                    capacity=capacity,
+                    threads=threads,
+                    metrics=writer,
+                    metrics_every=metrics_every,
+                    **board,
+                )
+        finally:
+            if writer is not None:
+                writer.close()
+        return
+
+    SAVE_DIR.mkdir(parents=True, exist_ok=True)
+    log_every = 100_000
+
+    if resume is None:
+        env = Environment(seed=seed, **board)
+
+        agent = Agent(seed=seed, **AGENT_ARGS)
+        inter = Interpreter(env, use_mirror=agent.use_mirror)
+
+        # état = clé packée canonique (Interpreter.transition), pas de tuples
+        obs = inter.observe_key()
+
+        # --- stats: totaux cumulés, les fenêtres (log, metrics) sont des différences ---
+        step = 0
+        run = RunStats()
+        log_mark = (0.0, 0, 0, 0, 0)
+        run_metrics = TrainMetrics(metrics_every)
+        elapsed = 0.0
+    else:
+        state = read_state(resume)
+        agent, inter = state["agent"], state["inter"]
+        obs = state["obs"]
+        step = state["step"]
+        stats = state["stats"]
+        run = RunStats(step, stats["totals"], stats["episode"])
+        log_mark = stats["log_mark"]
+        run_metrics = stats["metrics"]
+        elapsed = state["elapsed"]
+        # la partie et la Q-table en cours imposent la graine et le plateau de l'état
+        if seed is not None and seed != state["seed"]:
+            raise ValueError(f"--resume: seed={seed} != seed de l'état ({state['seed']})")
+        if board and board != state["board"]:
+            print(f"[RESUME] warning: board {board} ignored, using the saved {state['board']}")
+        if metrics_every != run_metrics.every:
+            print(
+                f"[RESUME] warning: metrics_every={metrics_every} ignored, "
+                f"using the saved {run_metrics.every}"
+            )
+        seed, board = state["seed"], state["board"]
+        print(f"[RESUME] {resume} step={step} states={len(agent.registre)}")
+
+    # temps déjà passé avant la reprise (speed / eta sur tout le run)
+    start_time = time.perf_counter() - elapsed
+
+    # checkpoints are written by a background thread from a snapshot
+    ckpt = Checkpointer()
+    # metrics rows too (reprise: ajout au même fichier)
+    writer = MetricsWriter(metrics, metrics_flush, append=resume is not None) if metrics else None
+    metrics_every = run_metrics.every
+    on_episode = run_metrics.episode if writer is not None else None
+
+    def save_state(i: int) -> None:
+        """État --resume après le step i: sérialisé ici (copie figée), écrit par ckpt."""
+        stats = {
+            "totals": run.totals(),
+            "log_mark": log_mark,
+            "episode": (run.ep_r0, run.ep_start),
+            "metrics": run_metrics,
+        }
+        state = _state(i, agent, inter, obs, stats, start_time, seed, board)
+        ckpt.submit_state(state_path(), dump_state(state))
+
+    # run_steps jusqu'au prochain step où il se passe quelque chose (log, save...)
+    periods = [p for p in (log_every, delta_every, state_every) if p]
+    if writer is not None:
+        periods.append(metrics_every)
+    saves = sorted(SAVE_STEPS)
+
+    while run.step < total_steps:
+        i = run.step
+        i = min(
+            [total_steps]
+            + [(i // p + 1) * p for p in periods]
+            + [s for s in saves if s > i][:1]
+        )
+        obs = run_steps(agent, inter, obs, run, i - run.step, on_episode)
+
+        if writer is not None and i % metrics_every == 0:
+            writer.write(
+                run_metrics.row(
+                    i,
+                    run.totals(),
+                    agent.epsilon(),
+                    len(agent.registre),
+                    time.perf_counter() - start_time,
+                )
+            )
 
         # logging
         if i % log_every == 0:
@@ -85,31 +336,107 @@ def train(total_steps: int = 10_000_000):
             remaining = total_steps - i
             eta_sec = remaining / steps_per_sec if steps_per_sec > 0 else 0.0
 
-            avg_r = r_sum / log_every
-            avg_len = len_sum / log_every
+            totals = run.totals()
+            w_r, w_deaths, w_green, w_red, w_len = (a - b for a, b in zip(totals, log_mark))
+            log_mark = totals
+            avg_r = w_r / log_every
+            avg_len = w_len / log_every
 
             print(
                 f"step={i} eps={agent.epsilon():.4f} "
                 f"states={len(agent.registre)} "
-                f"avgR={avg_r:.3f} deaths={deaths} green={green} red={red} avgLen={avg_len:.2f} "
-                f"| elapsed={fmt(elapsed)} speed={steps_per_sec:.1f} steps/s eta={fmt(eta_sec)}"
+                f"avgR={avg_r:.3f} deaths={w_deaths} green={w_green} red={w_red} avgLen={avg_len:.2f} "
+                f"| elapsed={fmt_duration(elapsed)} speed={steps_per_sec:.1f} steps/s eta={fmt_duration(eta_sec)}"
             )
 
-            r_sum = 0.0
-            deaths = 0
-            green = 0
-            red = 0
-            len_sum = 0
-
         # save
         if i in SAVE_STEPS:
             p = save_path(i)
-            agent.save(p)
+            ckpt.submit(p, *agent.snapshot())
             print(f"[SAVE] {p} (states={len(agent.registre)})")
+        elif delta_every and i % delta_every == 0:
+            p = delta_path(i)
+            keys, q, meta = agent.snapshot(delta=True)
+            ckpt.submit(p, keys, q, meta, delta=True)
+            print(f"[DELTA] {p} (changed={len(keys)})")
 
+        if state_every and i % state_every == 0:
+            save_state(i)
+
+    if state_every and total_steps > step and total_steps % state_every:
+        save_state(total_steps)
+    ckpt.close()
+    if writer is not None:
+        writer.close()
     total_elapsed = time.perf_counter() - start_time
     print(f"[DONE] total_steps={total_steps} total_time={total_elapsed:.2f}s")
 
 
 if __name__ == "__main__":
-    train(total_steps=10_000_000)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--steps", type=int, default=10_000_000)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument(
+        "--workers", type=int, default=1, help="process Hogwild (Q-table partagée)"
+    )
+    ap.add_argument(
+        "--threads",
+        action="store_true",
+        help="--workers en threads (build free-threaded, sinon 1 seul thread)",
+    )
+    ap.add_argument(
+        "--capacity",
+        type=int,
+        default=1 << 18,
+        help="slots de la Q-table partagée (--workers/--threads, taille fixe: 0.75 x en clés)",
+    )
+    ap.add_argument(
+        "--actors", type=int, default=0, help="process actors + 1 learner (0 = off)"
+    )
+    ap.add_argument("--batch", type=int, default=1_024, help="transitions par envoi (--actors)")
+    ap.add_argument(
+        "--refresh", type=int, default=50_000, help="steps entre snapshots de policy (--actors)"
+    )
+    ap.add_argument(
+        "--resume",
+        nargs="?",
+        const=str(state_path()),
+        default=None,
+        help=f"reprend depuis un état complet (défaut: {state_path()})",
+    )
+    ap.add_argument(
+        "--state-every", type=int, default=STATE_EVERY, help="steps entre états --resume (0 = off)"
+    )
+    ap.add_argument(
+        "--delta-every",
+        type=int,
+        default=DELTA_EVERY,
+        help="steps entre checkpoints delta (.delta.qbin) entre les saves (0 = off)",
+    )
+    ap.add_argument(
+        "--metrics",
+        default=str(metrics_path()),
+        help="métriques .jsonl ou .csv (python metrics.py tail|plot)",
+    )
+    ap.add_argument("--no-metrics", action="store_true")
+    ap.add_argument("--metrics-every", type=int, default=10_000, help="steps par ligne de métriques")
+    ap.add_argument("--metrics-flush", type=float, default=5.0, help="secondes entre flushs")
+    add_board_args(ap)
+    args = ap.parse_args()
+    train(
+        total_steps=args.steps,
+        seed=args.seed,
+        workers=args.workers,
+        threads=args.threads,
+        actors=args.actors,
+        batch=args.batch,
+        refresh=args.refresh,
+        resume=args.resume,
+        state_every=args.state_every,
+        delta_every=args.delta_every,
+        metrics=None if args.no_metrics else args.metrics,
+        metrics_every=args.metrics_every,
+        metrics_flush=args.metrics_flush,
+        capacity=args.capacity,
+        **board_config(args),
+    )
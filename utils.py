@@ -1,4 +1,7 @@
 # utils.py
+import numpy as np
+
+from environement import check_board
 
 
 def intDir(direction: int):
@@ -12,3 +15,36 @@ def intDir(direction: int):
     if direction == 3:
         return (-1, 0)  # left
     raise ValueError(f"Invalid direction int: {direction}")
+
+
+def episode_seed(seed: int, episode: int) -> int:
+    """
+    Graine de l'épisode `episode` d'un run de graine `seed` (SeedSequence numpy):
+    chaque épisode a son propre flux, indépendant de l'ordre d'exécution, donc
+    une évaluation parallèle rejoue les mêmes parties qu'en série.
+    """
+    return int(np.random.SeedSequence([seed, episode]).generate_state(1, np.uint64)[0])
+
+
+def add_board_args(ap) -> None:
+    """Options de plateau communes (train.py / play.py / play_1000.py), cf. board_config."""
+    ap.add_argument("--height", type=int, default=10)
+    ap.add_argument("--width", type=int, default=10)
+    ap.add_argument("--green", type=int, default=2, help="nombre de pommes vertes")
+    ap.add_argument("--red", type=int, default=1, help="nombre de pommes rouges")
+    ap.add_argument(
+        "--start-len", type=int, default=3, help="longueur initiale du serpent (>= 2)"
+    )
+
+
+def board_config(args) -> dict:
+    """argparse.Namespace -> kwargs de Environment(...), vérifiés (environement.check_board)."""
+    board = dict(
+        height=args.height,
+        width=args.width,
+        n_green=args.green,
+        n_red=args.red,
+        snake_start_len=args.start_len,
+    )
+    check_board(**board)
+    return board
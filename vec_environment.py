@@ -0,0 +1,245 @@
+# vec_environment.py
+"""
+N snake games stepped in lockstep on NumPy arrays.
+
+Same rules as Environment.step (green: +1, red: -1 on top of the move, moving
+onto the tail cell being vacated is allowed, no border walls) and the same
+rewards / observations as Interpreter.apply_dir / Interpreter.get_state, but
+for all games at once. Finished games are reset automatically. Rewards can be
+overridden like Interpreter(rewards=...) (interpreter.REWARD_DEFAULTS).
+
+Board state per game:
+  grid[n, y*W + x]  EMPTY / BODY / GREEN / RED
+  body[n, :]        snake cells as a ring buffer, head at body[n, head[n]],
+                    tail at body[n, (head[n] + length[n] - 1) % (W*H)]
+"""
+from typing import Optional
+
+import numpy as np
+
+from environement import check_board
+from interpreter import REWARD_DEFAULTS
+
+EMPTY, BODY, GREEN, RED = 0, 1, 2, 3
+
+# URDL, same as utils.intDir
+DX = np.array([0, 1, 0, -1], dtype=np.int64)
+DY = np.array([-1, 0, 1, 0], dtype=np.int64)
+
+
+def _bin_table(max_dist: int) -> np.ndarray:
+    """Interpreter._bin_dist as a lookup table over 0..max_dist."""
+    d = np.arange(max_dist + 1)
+    return np.select([d <= 0, d == 1, d == 2, d <= 5], [0, 1, 2, 3], 4).astype(np.int64)
+
+
+class VecEnvironment:
+    def __init__(
+        self,
+        n: int,
+        height: int = 10,
+        width: int = 10,
+        n_green: int = 2,
+        n_red: int = 1,
+        snake_start_len: int = 3,
+        seed: Optional[int] = None,
+        rewards: Optional[dict] = None,
+    ):
+        # rewards: sous-ensemble de REWARD_DEFAULTS, comme Interpreter
+        unknown = set(rewards or ()) - set(REWARD_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown reward(s): {sorted(unknown)} ({'/'.join(REWARD_DEFAULTS)})")
+        self.rewards = {**REWARD_DEFAULTS, **(rewards or {})}
+
+        check_board(height, width, n_green, n_red, snake_start_len)
+        self.n = n
+        self.HEIGHT, self.WIDTH = height, width
+        self.N_GREEN, self.N_RED = n_green, n_red
+        self.SNAKE_START_LEN = snake_start_len
+        self.n_cells = height * width
+        self.rng = np.random.default_rng(seed)
+
+        self.grid = np.zeros((n, self.n_cells), dtype=np.int8)
+        self.body = np.zeros((n, self.n_cells), dtype=np.int64)
+        self.head = np.zeros(n, dtype=np.int64)
+        self.length = np.zeros(n, dtype=np.int64)
+        self._rows = np.arange(n)
+
+        cells = np.arange(self.n_cells)
+        self._cx = cells % width
+        self._cy = cells // width
+        self._bins = _bin_table(max(height, width) + 1)
+        self._rays = self._build_rays()
+
+        self.reset()
+
+    # ----------------------------
+    # Precomputed rays
+    # ----------------------------
+    def _build_rays(self) -> np.ndarray:
+        """rays[cell, d, k] = k+1-th cell from `cell` in direction d, or -1 past the border."""
+        W, H = self.WIDTH, self.HEIGHT
+        L = max(W, H) - 1
+        rays = np.full((self.n_cells, 4, max(L, 1)), -1, dtype=np.int64)
+        for d in range(4):
+            for k in range(L):
+                x = self._cx + DX[d] * (k + 1)
+                y = self._cy + DY[d] * (k + 1)
+                ok = (0 <= x) & (x < W) & (0 <= y) & (y < H)
+                rays[ok, d, k] = (y * W + x)[ok]
+        return rays
+
+    # ----------------------------
+    # Reset / spawn
+    # ----------------------------
+    def reset(self) -> np.ndarray:
+        self._reset(self._rows)
+        return self.observe()
+
+    def _reset(self, games: np.ndarray) -> None:
+        """
+        Same placement as Environment.reset_game, for all `games` at once:
+        random head, directions in random order, first one whose body fits.
+        """
+        W, H, L = self.WIDTH, self.HEIGHT, self.SNAKE_START_LEN
+        todo = games
+        while todo.size:
+            k = todo.size
+            head = self.rng.integers(self.n_cells, size=k)
+            order = np.argsort(self.rng.random((k, 4)), axis=1)
+            # body goes opposite to the direction: tail at head - (L-1) * (dx, dy)
+            tx = (head % W)[:, None] - DX[order] * (L - 1)
+            ty = (head // W)[:, None] - DY[order] * (L - 1)
+            fits = (0 <= tx) & (tx < W) & (0 <= ty) & (ty < H)
+            ok = fits.any(axis=1)  # Environment.reset_game retries below length 2
+            first = fits.argmax(axis=1)[ok]
+            d = order[ok, first]
+            g = todo[ok]
+
+            offsets = np.arange(L)
+            cells = head[ok, None] - (DX[d] + DY[d] * W)[:, None] * offsets
+            self.grid[g] = EMPTY
+            self.head[g] = 0
+            self.length[g] = L
+            self.body[g[:, None], offsets] = cells
+            self.grid[g[:, None], cells] = BODY
+            todo = todo[~ok]
+
+        for _ in range(self.N_GREEN):
+            self._spawn(games, GREEN)
+        for _ in range(self.N_RED):
+            self._spawn(games, RED)
+
+    def _spawn(self, games: np.ndarray, kind: int) -> None:
+        """One apple of `kind` on a uniform random free cell, for each game (if any free)."""
+        if games.size == 0:
+            return
+        free = self.grid[games] == EMPTY
+        score = np.where(free, self.rng.random(free.shape), -1.0)
+        cell = score.argmax(axis=1)
+        ok = free.any(axis=1)
+        self.grid[games[ok], cell[ok]] = kind
+
+    # ----------------------------
+    # Step
+    # ----------------------------
+    def _green_dist(self, games: np.ndarray) -> np.ndarray:
+        """closest_green_dist per game (-1 if no green)."""
+        h = self.body[games, self.head[games]]
+        d = np.abs(self._cx - (h % self.WIDTH)[:, None]) + np.abs(
+            self._cy - (h // self.WIDTH)[:, None]
+        )
+        d = np.where(self.grid[games] == GREEN, d, np.iinfo(np.int64).max)
+        m = d.min(axis=1)
+        return np.where(m == np.iinfo(np.int64).max, -1, m)
+
+    def _pop_tail(self, games: np.ndarray, new_head: np.ndarray) -> None:
+        """Removes the tail segment; its cell is freed unless it is the new head."""
+        tail_idx = (self.head[games] + self.length[games] - 1) % self.n_cells
+        tail = self.body[games, tail_idx]
+        self.length[games] -= 1
+        free = tail != new_head
+        self.grid[games[free], tail[free]] = EMPTY
+
+    def step(self, actions) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        actions: (N,) env-frame actions 0..3.
+        Returns (obs (N, 4, 4), rewards (N,), dones (N,)); obs of finished games
+        is already the first observation of their next game.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        rows = self._rows
+        W, H, C = self.WIDTH, self.HEIGHT, self.n_cells
+
+        d0 = self._green_dist(rows)
+
+        h = self.body[rows, self.head]
+        nx = h % W + DX[actions]
+        ny = h // W + DY[actions]
+        oob = (nx < 0) | (nx >= W) | (ny < 0) | (ny >= H)
+        npos = np.where(oob, 0, ny * W + nx)
+        cell = np.where(oob, EMPTY, self.grid[rows, npos])
+
+        ate_green = cell == GREEN
+        ate_red = cell == RED
+        # body: allowed only onto the tail cell that this move frees
+        tail = self.body[rows, (self.head + self.length - 1) % C]
+        hit_body = (cell == BODY) & (npos != tail)
+        dead = oob | hit_body
+        alive = np.flatnonzero(~dead)
+
+        # --- move head in ---
+        self.head[alive] = (self.head[alive] - 1) % C
+        self.body[alive, self.head[alive]] = npos[alive]
+        self.length[alive] += 1
+        self.grid[alive, npos[alive]] = BODY
+
+        # --- green: grow + respawn / otherwise: pop tail ---
+        green = alive[ate_green[alive]]
+        self._spawn(green, GREEN)
+        moved = alive[~ate_green[alive]]
+        self._pop_tail(moved, npos[moved])
+
+        # --- red: respawn, then shrink one more ---
+        red = alive[ate_red[alive]]
+        self._spawn(red, RED)
+        self._pop_tail(red, npos[red])
+        dead[red[self.length[red] == 0]] = True
+
+        # --- rewards (Interpreter.apply_dir) ---
+        r = self.rewards
+        rewards = np.full(self.n, float(r["step"]))
+        rewards[ate_green] = r["green"]
+        rewards[ate_red] = r["red"]
+        rewards[dead] = r["death"]
+        shaped = np.flatnonzero(~dead & ~ate_green & (d0 >= 0))
+        d1 = self._green_dist(shaped)
+        ok = d1 >= 0
+        shaped, d1 = shaped[ok], d1[ok]
+        rewards[shaped] += np.sign(d0[shaped] - d1) * r["shape"]
+
+        self._reset(np.flatnonzero(dead))
+        return self.observe(), rewards, dead
+
+    # ----------------------------
+    # Observations
+    # ----------------------------
+    def observe(self) -> np.ndarray:
+        """(N, 4, 4) = Interpreter.get_state for every game (URDL x wall/green/red/body)."""
+        rows = self._rows
+        h = self.body[rows, self.head]
+        hx = h % self.WIDTH
+        hy = h // self.WIDTH
+
+        obs = np.empty((self.n, 4, 4), dtype=np.int64)
+        wall = np.stack([hy + 1, self.WIDTH - hx, self.HEIGHT - hy, hx + 1], axis=1)
+        obs[:, :, 0] = self._bins[wall]
+
+        rays = self._rays[h]  # (N, 4, L)
+        valid = rays >= 0
+        cells = np.where(valid, self.grid[rows[:, None, None], np.maximum(rays, 0)], -1)
+        for f, kind in ((1, GREEN), (2, RED), (3, BODY)):
+            hit = cells == kind
+            first = hit.argmax(axis=2) + 1
+            obs[:, :, f] = self._bins[np.where(hit.any(axis=2), first, 0)]
+        return obs